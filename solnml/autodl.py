@@ -15,6 +15,7 @@ from solnml.components.evaluators.base_dl_evaluator import get_estimator_with_pa
 from solnml.components.models.img_classification.nn_utils.nn_aug.aug_hp_space import get_aug_hyperparameter_space, \
     get_test_transforms, get_transforms
 from solnml.components.utils.config_parser import ConfigParser
+from solnml.components.computation.sandbox_pool import shutdown_worker_pool
 from .autodl_base import AutoDLBase
 
 # rlimit = resource.getrlimit(resource.RLIMIT_NOFILE)
@@ -51,6 +52,13 @@ class AutoDL(AutoDLBase):
         self.see_optimizer = None
 
     def fit(self, train_data: DLDataset, **kwargs):
+        try:
+            self._fit(train_data, **kwargs)
+        finally:
+            # The workers are reused across brackets and architectures; stop them once the search is done.
+            shutdown_worker_pool(logger=self.logger)
+
+    def _fit(self, train_data: DLDataset, **kwargs):
         _start_time = time.time()
         if 'opt_method' in kwargs:
             self.optalgo = kwargs['opt_method']
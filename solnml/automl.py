@@ -1,6 +1,7 @@
 import os
 import sys
 import traceback
+import numpy as np
 from solnml.utils.logging_utils import setup_logger, get_logger
 from solnml.components.metrics.metric import get_metric
 from solnml.components.utils.constants import CLS_TASKS, RGS_TASKS, IMG_CLS, TEXT_CLS
@@ -9,8 +10,10 @@ from solnml.components.feature_engineering.transformation_graph import DataNode
 from solnml.components.models.regression import _regressors
 from solnml.components.models.classification import _classifiers
 from solnml.components.models.imbalanced_classification import _imb_classifiers
-from solnml.components.meta_learning.algorithm_recomendation.ranknet_advisor_torch import RankNetAdvisor
 from solnml.bandits.first_layer_bandit import FirstLayerBandit
+from solnml.components.computation.sandbox_pool import shutdown_worker_pool
+from solnml.components.computation.thread_budget import limit_thread_budget
+from solnml.components.computation.batch_predict import batch_predict
 
 classification_algorithms = _classifiers.keys()
 imb_classication_algorithms = _imb_classifiers.keys()
@@ -34,7 +37,9 @@ class AutoML(object):
                  output_dir="logs",
                  logging_config=None,
                  random_state=1,
-                 n_jobs=1):
+                 n_jobs=1,
+                 parallel_arms=False,
+                 dtype=None):
         self.metric_id = metric
         self.metric = get_metric(self.metric_id)
 
@@ -56,6 +61,12 @@ class AutoML(object):
         self.enable_fe = enable_fe
         self.task_type = task_type
         self.n_jobs = n_jobs
+        self.parallel_arms = parallel_arms
+        # Float dtype of the numerical data: 'float32' halves the memory of the data, the transformed features
+        # and the ensemble predictions; the estimators and metrics that require float64 upcast by themselves.
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        if self.dtype is not None and self.dtype not in (np.float32, np.float64):
+            raise ValueError('Unsupported dtype: %s!' % dtype)
         self.solver = None
 
         # Disable meta learning
@@ -97,6 +108,7 @@ class AutoML(object):
         #     self.logger.info('Input dataset is imbalanced!')
         #     train_data = DataBalancer().operate(train_data)
 
+        train_data = self._cast_data(train_data)
         dataset_id = kwargs.get('dataset_id', None)
         inner_opt_algorithm = kwargs.get('opt_strategy', 'alter_hpo')
         self.logger.info('Optimization algorithm in 2rd bandit: %s' % inner_opt_algorithm)
@@ -106,6 +118,9 @@ class AutoML(object):
                 n_algo_recommended = 5
                 meta_datasets = kwargs.get('meta_datasets', None)
                 self.logger.info('Executing Meta-Learning based Algorithm Recommendation.')
+                # The advisor imports torch: load it only when the meta-learning is enabled.
+                from solnml.components.meta_learning.algorithm_recomendation.ranknet_advisor_torch import \
+                    RankNetAdvisor
                 alad = RankNetAdvisor(task_type=self.task_type, n_algorithm=n_algo_recommended,
                                       metric=self.metric_id)
                 alad.fit()
@@ -141,17 +156,39 @@ class AutoML(object):
                                        seed=self.seed,
                                        time_limit=self.time_limit,
                                        eval_type=self.evaluation_type,
-                                       output_dir=self.output_dir)
-        self.solver.optimize()
+                                       output_dir=self.output_dir,
+                                       n_jobs=self.n_jobs,
+                                       parallel_arms=self.parallel_arms)
+        try:
+            # n_jobs bounds the threads of the whole search; each busy worker gets its share.
+            with limit_thread_budget(self.n_jobs):
+                self.solver.optimize()
+        finally:
+            # The workers are reused across the whole search; stop them once it is done.
+            shutdown_worker_pool(logger=self.logger)
+
+    def _cast_data(self, data: DataNode):
+        if self.dtype is None:
+            return data
+        return data.astype_(self.dtype)
 
     def refit(self):
-        self.solver.refit()
+        with limit_thread_budget(self.n_jobs):
+            self.solver.refit()
 
-    def predict_proba(self, test_data: DataNode):
-        return self.solver.predict_proba(test_data)
+    def predict_proba(self, test_data: DataNode, batch_size=None, n_jobs=1, out=None):
+        """
+        :param batch_size: number of rows predicted at once, which bounds the memory of the prediction;
+            None to predict all the rows at once.
+        :param n_jobs: number of batches predicted concurrently.
+        :param out: array to write the predictions into, or the path of a .npy file to create.
+        """
+        return batch_predict(lambda node: self.solver.predict_proba(self._cast_data(node)), test_data,
+                             batch_size=batch_size, n_jobs=n_jobs, out=out)
 
-    def predict(self, test_data: DataNode):
-        return self.solver.predict(test_data)
+    def predict(self, test_data: DataNode, batch_size=None, n_jobs=1, out=None):
+        return batch_predict(lambda node: self.solver.predict(self._cast_data(node)), test_data,
+                             batch_size=batch_size, n_jobs=n_jobs, out=out)
 
     def score(self, test_data: DataNode, metric_func=None):
         if metric_func is None:
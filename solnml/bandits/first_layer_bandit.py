@@ -1,18 +1,23 @@
 import os
 import time
 import numpy as np
-import pickle as pkl
 from typing import List
 from sklearn.metrics import accuracy_score
 from solnml.components.metrics.metric import get_metric
 from solnml.utils.constant import MAX_INT
 from solnml.components.feature_engineering.transformation_graph import DataNode
 from solnml.bandits.second_layer_bandit import SecondLayerBandit
+from solnml.components.computation.parallel_arm import ParallelArmExecutor
+from solnml.components.computation.sandbox_pool import SUCCESS
+from solnml.components.evaluators.split_plan import SplitPlan
 from solnml.components.evaluators.base_evaluator import load_transformer_estimator, load_combined_transformer_estimator
-from solnml.components.fe_optimizers.parse import construct_node
+from solnml.components.evaluators.base_evaluator import BaseTopKModelSaver
+from solnml.components.fe_optimizers.parse import compile_node
 from solnml.utils.logging_utils import get_logger
 from solnml.components.utils.constants import CLS_TASKS
 
+# An arm is removed from the candidates after this number of failed pulls in a row.
+MAX_PULL_FAILURES = 3
 
 class FirstLayerBandit(object):
     def __init__(self, task_type, trial_num,
@@ -30,17 +35,21 @@ class FirstLayerBandit(object):
                  enable_fe=True,
                  fe_algo='bo',
                  n_jobs=1,
+                 parallel_arms=False,
                  seed=1):
         """
         :param classifier_ids: subset of {'adaboost','bernoulli_nb','decision_tree','extra_trees','gaussian_nb','gradient_boosting',
         'gradient_boosting','k_nearest_neighbors','lda','liblinear_svc','libsvm_svc','multinomial_nb','passive_aggressive','qda',
         'random_forest','sgd'}
+        :param parallel_arms: pull up to n_jobs arms at the same time in separate worker processes;
+            each arm then evaluates its trials with one process.
         """
         self.timestamp = time.time()
         self.task_type = task_type
         self.include_preprocessors = include_preprocessors
         self.metric = get_metric(metric)
-        self.original_data = data.copy_()
+        # The only private copy of the dataset, shared (read-only) by the components below.
+        self.original_data = data.copy_(deep=True)
         self.ensemble_method = ensemble_method
         self.ensemble_size = ensemble_size
         self.trial_num = trial_num
@@ -56,6 +65,8 @@ class FirstLayerBandit(object):
         self.nbest_algo_ids = None
         self.best_lower_bounds = None
         self.es = None
+        # Compiled FE pipeline and estimator of the best configuration, loaded at the first prediction.
+        self.inference_pipeline = None
 
         # Set up backend.
         self.dataset_name = dataset_name
@@ -83,6 +94,13 @@ class FirstLayerBandit(object):
         for _arm in self.arms:
             self.arm_cost_stats[_arm] = list()
 
+        # The resampling splits are computed once and shared by all the sub-bandits.
+        self.split_plan = SplitPlan(self.original_data, self.task_type)
+        self.parallel_arms = parallel_arms and self.n_jobs > 1 and len(self.arms) > 1
+        if self.parallel_arms:
+            # The sub-bandits are sent to worker processes, so they refer to the data by file handles.
+            self.split_plan.share_data()
+
         for arm in self.arms:
             self.rewards[arm] = list()
             self.evaluation_cost[arm] = list()
@@ -95,10 +113,11 @@ class FirstLayerBandit(object):
                 seed=self.seed,
                 eval_type=eval_type,
                 dataset_id=dataset_name,
-                n_jobs=self.n_jobs,
+                n_jobs=1 if self.parallel_arms else self.n_jobs,
                 fe_algo=fe_algo,
                 mth=self.inner_opt_algorithm,
-                timestamp=self.timestamp
+                timestamp=self.timestamp,
+                split_plan=self.split_plan
             )
 
         self.action_sequence = list()
@@ -124,7 +143,10 @@ class FirstLayerBandit(object):
 
     def optimize(self):
         if self.inner_opt_algorithm in ['rb_hpo', 'fixed', 'alter_hpo', 'alter', 'combined']:
-            self.optimize_explore_first()
+            if self.parallel_arms:
+                self.optimize_explore_first_parallel()
+            else:
+                self.optimize_explore_first()
         elif self.inner_opt_algorithm == 'equal':
             self.optimize_equal_resource()
         else:
@@ -157,6 +179,7 @@ class FirstLayerBandit(object):
         self.logger.info('Best val scores: %s' % str(list(scores)))
         self.logger.info('=' * 50)
 
+        self.inference_pipeline = None
         if self.inner_opt_algorithm == 'combined':
             self.best_config = self.sub_bandits[self.optimal_algo_id].incumbent_config
             if self.best_config is None:
@@ -174,14 +197,12 @@ class FirstLayerBandit(object):
         if self.ensemble_method is not None:
             if self.inner_opt_algorithm == 'combined':
                 config_path = os.path.join(self.output_dir, '%s_topk_config.pkl' % self.timestamp)
-                with open(config_path, 'rb') as f:
-                    stats = pkl.load(f)
+                stats = BaseTopKModelSaver.get_topk_config(config_path)
 
                 from solnml.components.ensemble.combined_ensemble.ensemble_bulider import EnsembleBuilder
             else:
                 config_path = os.path.join(self.output_dir, '%s_topk_config.pkl' % self.timestamp)
-                with open(config_path, 'rb') as f:
-                    stats = pkl.load(f)
+                stats = BaseTopKModelSaver.get_topk_config(config_path)
 
                 from solnml.components.ensemble import EnsembleBuilder
 
@@ -205,21 +226,23 @@ class FirstLayerBandit(object):
                 raise AttributeError("AutoML is not fitted!")
             return self.es.predict(test_data)
         else:
-            if self.inner_opt_algorithm == 'combined':
-                best_op_list, estimator = load_combined_transformer_estimator(self.output_dir, self.best_config,
-                                                                              self.timestamp)
-            else:
-                best_op_list, estimator = load_transformer_estimator(self.output_dir, self.optimal_algo_id,
-                                                                     self.best_hpo_config, self.best_fe_config,
-                                                                     self.timestamp)
-
-            test_data_node = test_data.copy_()
-            test_data_node = construct_node(test_data_node, best_op_list)
+            if self.inference_pipeline is None:
+                if self.inner_opt_algorithm == 'combined':
+                    best_op_list, estimator = load_combined_transformer_estimator(self.output_dir, self.best_config,
+                                                                                  self.timestamp)
+                else:
+                    best_op_list, estimator = load_transformer_estimator(self.output_dir, self.optimal_algo_id,
+                                                                         self.best_hpo_config, self.best_fe_config,
+                                                                         self.timestamp)
+                self.inference_pipeline = (compile_node(best_op_list), estimator)
+
+            pipeline, estimator = self.inference_pipeline
+            X_test = pipeline.transform(test_data)
 
             if self.task_type in CLS_TASKS:
-                return estimator.predict_proba(test_data_node.data[0])
+                return estimator.predict_proba(X_test)
             else:
-                return estimator.predict(test_data_node.data[0])
+                return estimator.predict(X_test)
 
     def predict_proba(self, test_data: DataNode):
         if self.task_type not in CLS_TASKS:
@@ -286,40 +309,7 @@ class FirstLayerBandit(object):
                     _iter_id += 1
 
             if _iter_id >= arm_num * self.alpha:
-                # Update the upper/lower bound estimation.
-                budget_left = max(self.time_limit - (time.time() - self.start_time), 0)
-                avg_cost = np.array([np.mean(self.arm_cost_stats[_arm]) for _arm in arm_candidate]).mean()
-                steps = int(budget_left / avg_cost)
-                upper_bounds, lower_bounds = list(), list()
-
-                for _arm in arm_candidate:
-                    rewards = self.rewards[_arm]
-                    slope = (rewards[-1] - rewards[-self.alpha]) / self.alpha
-                    if self.time_limit is None:
-                        steps = self.trial_num - _iter_id
-                    upper_bound = np.min([1.0, rewards[-1] + slope * steps])
-                    upper_bounds.append(upper_bound)
-                    lower_bounds.append(rewards[-1])
-                    self.best_lower_bounds[self.arms.index(_arm)] = rewards[-1]
-
-                # Reject the sub-optimal arms.
-                n = len(arm_candidate)
-                flags = [False] * n
-                for i in range(n):
-                    for j in range(n):
-                        if i != j:
-                            if upper_bounds[i] < lower_bounds[j]:
-                                flags[i] = True
-
-                if np.sum(flags) == n:
-                    self.logger.error('Removing all the arms simultaneously!')
-                self.logger.info('Candidates  : %s' % ','.join(arm_candidate))
-                self.logger.info('Upper bound : %s' % ','.join(['%.4f' % val for val in upper_bounds]))
-                self.logger.info('Lower bound : %s' % ','.join(['%.4f' % val for val in lower_bounds]))
-                self.logger.info('Arms removed: %s' % [item for idx, item in enumerate(arm_candidate) if flags[idx]])
-
-                # Update the arm_candidates.
-                arm_candidate = [item for index, item in enumerate(arm_candidate) if not flags[index]]
+                arm_candidate = self.update_arm_candidates(arm_candidate, _iter_id)
 
             self.early_stop_flag = True
             for arm in arm_candidate:
@@ -333,6 +323,135 @@ class FirstLayerBandit(object):
                 break
         return self.final_rewards
 
+    def optimize_explore_first_parallel(self):
+        """
+            The explore-first strategy with up to n_jobs arms pulled at the same time in worker processes.
+            The rewards are collected as soon as a pull finishes, and the sub-optimal arms are rejected
+            whenever an arm finishes a round (after each candidate has been pulled alpha times).
+        """
+        arm_num = len(self.arms)
+        arm_candidate = self.arms.copy()
+        self.best_lower_bounds = np.zeros(arm_num)
+        _iter_id = 0
+        if self.time_limit is None:
+            if arm_num * self.alpha > self.trial_num:
+                raise ValueError('Trial number should be larger than %d.' % (arm_num * self.alpha))
+        else:
+            self.trial_num = MAX_INT
+
+        pull_cnts = {_arm: 0 for _arm in self.arms}
+        # Number of the consecutive failed pulls of each arm.
+        fail_cnts = {_arm: 0 for _arm in self.arms}
+        early_stopped_arms = set()
+        executor = ParallelArmExecutor(self.sub_bandits, n_jobs=self.n_jobs)
+        try:
+            while True:
+                # Start the candidates pulled the fewest times, so that the arms finish their rounds evenly.
+                idle_arms = [_arm for _arm in arm_candidate if _arm not in executor.running_arms]
+                for _arm in sorted(idle_arms, key=lambda item: pull_cnts[item]):
+                    if len(executor.running_arms) >= self.n_jobs:
+                        break
+                    if _iter_id + len(executor.running_arms) >= self.trial_num:
+                        break
+                    if self.time_limit is not None and time.time() > self.start_time + self.time_limit:
+                        break
+                    if self.early_stop_flag:
+                        break
+                    self.logger.info('Optimize %s in the %d-th iteration' %
+                                     (_arm, _iter_id + len(executor.running_arms)))
+                    remaining_budget = MAX_INT if self.time_limit is None else \
+                        self.time_limit - time.time() + self.start_time
+                    executor.submit(_arm, 'pull', remaining_budget)
+                    pull_cnts[_arm] += 1
+
+                if len(executor.running_arms) == 0:
+                    break
+
+                for _arm, status, result, info, time_taken in executor.wait():
+                    if status != SUCCESS:
+                        self.logger.error('Failed to pull %s: %s' % (_arm, info))
+                        fail_cnts[_arm] += 1
+                        # An arm that keeps failing is removed, even the last one, so that it is not pulled forever.
+                        if _arm in arm_candidate and fail_cnts[_arm] >= MAX_PULL_FAILURES:
+                            self.logger.error('Arm %s is removed after %d failed pulls in a row!' %
+                                              (_arm, fail_cnts[_arm]))
+                            arm_candidate.remove(_arm)
+                        continue
+                    fail_cnts[_arm] = 0
+                    reward, early_stopped_flag = result
+                    self.arm_cost_stats[_arm].append(time_taken)
+                    self.rewards[_arm].append(reward)
+                    self.action_sequence.append(_arm)
+                    self.final_rewards.append(reward)
+                    self.time_records.append(time.time() - self.start_time)
+                    if reward > self.incumbent_perf:
+                        self.incumbent_perf = reward
+                        self.optimal_algo_id = _arm
+                    self.logger.info('The best performance found for %s is %.4f' % (_arm, reward))
+                    _iter_id += 1
+
+                    if _arm in arm_candidate and \
+                            np.min([len(self.rewards[_item]) for _item in arm_candidate]) >= self.alpha:
+                        arm_candidate = self.update_arm_candidates(arm_candidate, _iter_id)
+                    if early_stopped_flag:
+                        early_stopped_arms.add(_arm)
+                    self.early_stop_flag = all(_item in early_stopped_arms for _item in arm_candidate)
+                    if self.early_stop_flag:
+                        self.logger.info("Maximum configuration number met for each arm candidate!")
+        finally:
+            # Bring the states of the arms back, e.g., for the ensemble stage.
+            for _arm in self.arms:
+                sub_bandit = executor.fetch(_arm)
+                if sub_bandit is not None:
+                    self.sub_bandits[_arm] = sub_bandit
+            executor.shutdown()
+        return self.final_rewards
+
+    def update_arm_candidates(self, arm_candidate, _iter_id):
+        """
+            Reject the arms whose upper bound is below the lower bound of another arm.
+        :return: the remaining arm candidates.
+        """
+        # Update the upper/lower bound estimation.
+        budget_left = max(self.time_limit - (time.time() - self.start_time), 0)
+        avg_cost = np.array([np.mean(self.arm_cost_stats[_arm]) for _arm in arm_candidate]).mean()
+        steps = int(budget_left / avg_cost)
+        upper_bounds, lower_bounds = list(), list()
+
+        for _arm in arm_candidate:
+            rewards = self.rewards[_arm]
+            slope = (rewards[-1] - rewards[-self.alpha]) / self.alpha
+            if self.time_limit is None:
+                steps = self.trial_num - _iter_id
+            upper_bound = np.min([1.0, rewards[-1] + slope * steps])
+            upper_bounds.append(upper_bound)
+            lower_bounds.append(rewards[-1])
+            self.best_lower_bounds[self.arms.index(_arm)] = rewards[-1]
+
+        # Reject the sub-optimal arms.
+        n = len(arm_candidate)
+        flags = [False] * n
+        for i in range(n):
+            for j in range(n):
+                if i != j:
+                    if upper_bounds[i] < lower_bounds[j]:
+                        flags[i] = True
+
+        if np.sum(flags) == n:
+            self.logger.error('Removing all the arms simultaneously!')
+        self.logger.info('Candidates  : %s' % ','.join(arm_candidate))
+        self.logger.info('Upper bound : %s' % ','.join(['%.4f' % val for val in upper_bounds]))
+        self.logger.info('Lower bound : %s' % ','.join(['%.4f' % val for val in lower_bounds]))
+        self.logger.info('Arms removed: %s' % [item for idx, item in enumerate(arm_candidate) if flags[idx]])
+
+        # The rejected arms are not pulled again, so their evaluators are released in the workers.
+        for index, item in enumerate(arm_candidate):
+            if flags[index]:
+                self.sub_bandits[item].gc()
+
+        # Update the arm_candidates.
+        return [item for index, item in enumerate(arm_candidate) if not flags[index]]
+
     def optimize_equal_resource(self):
         arm_num = len(self.arms)
         arm_candidate = self.arms.copy()
@@ -1,10 +1,10 @@
 import copy
 import time
-import os
 import numpy as np
-import pickle as pkl
 from solnml.components.evaluators.cls_evaluator import ClassificationEvaluator
 from solnml.components.evaluators.rgs_evaluator import RegressionEvaluator
+from solnml.components.evaluators.transform_cache import TransformCache
+from solnml.components.evaluators.split_plan import SplitPlan
 from solnml.components.utils.class_loader import get_combined_candidtates
 from solnml.utils.logging_utils import get_logger
 from solnml.components.feature_engineering.transformation_graph import DataNode
@@ -12,7 +12,7 @@ from solnml.components.optimizers import build_fe_optimizer
 from solnml.components.fe_optimizers.task_space import get_task_hyperparameter_space
 from solnml.components.optimizers import build_hpo_optimizer
 from solnml.components.utils.constants import CLS_TASKS, RGS_TASKS, TEXT, IMAGE
-from solnml.utils.decorators import time_limit
+from solnml.components.computation.sandbox_pool import get_worker_pool, SUCCESS
 from solnml.utils.functions import is_imbalanced_dataset
 from solnml.utils.constant import MAX_INT
 
@@ -30,7 +30,8 @@ class SecondLayerBandit(object):
                  enable_fe=True, fe_algo='bo',
                  number_of_unit_resource=2,
                  total_resource=30,
-                 timestamp=None):
+                 timestamp=None,
+                 split_plan=None):
         self.task_type = task_type
         self.metric = metric
         self.number_of_unit_resource = number_of_unit_resource
@@ -42,6 +43,7 @@ class SecondLayerBandit(object):
         self.estimator_id = estimator_id
         self.include_preprocessors = include_preprocessors
         self.evaluation_type = eval_type
+        # All the bandits share the (read-only) dataset held by the first-layer bandit.
         self.original_data = data.copy_()
         self.share_fe = share_fe
         self.output_dir = output_dir
@@ -118,6 +120,13 @@ class SecondLayerBandit(object):
         self.fe_default_config = self.fe_config_space.get_default_configuration()
 
         self.timestamp = timestamp
+        # Fitted FE pipelines are shared by all the evaluators of this bandit.
+        self.transform_cache = TransformCache()
+        # Resampling splits are shared by the sub-bandits of the same dataset.
+        self.split_plan = split_plan if split_plan is not None else SplitPlan(self.original_data, self.task_type)
+        # Evaluator of the joint (FE, HPO) incumbents, registered in the worker pool on the first evaluation.
+        self.joint_evaluator = None
+        self.joint_worker_pool, self.joint_evaluator_key = None, None
         # Build the Feature Engineering component.
         if self.task_type in CLS_TASKS:
             fe_evaluator = ClassificationEvaluator(self.default_config, self.fe_default_config,
@@ -125,13 +134,19 @@ class SecondLayerBandit(object):
                                                    data_node=self.original_data, name='fe',
                                                    resampling_strategy=self.evaluation_type, if_imbal=self.if_imbal,
                                                    seed=self.seed, output_dir=self.output_dir,
-                                                   timestamp=self.timestamp)
+                                                   timestamp=self.timestamp,
+                                                   transform_cache=self.transform_cache,
+                                                   split_plan=self.split_plan,
+                                                   n_jobs=self.n_jobs)
             hpo_evaluator = ClassificationEvaluator(self.default_config, self.fe_default_config,
                                                     estimator_id, scorer=self.metric,
                                                     data_node=self.original_data, name='hpo',
                                                     resampling_strategy=self.evaluation_type, if_imbal=self.if_imbal,
                                                     seed=self.seed, output_dir=self.output_dir,
-                                                    timestamp=self.timestamp)
+                                                    timestamp=self.timestamp,
+                                                    transform_cache=self.transform_cache,
+                                                    split_plan=self.split_plan,
+                                                    n_jobs=self.n_jobs)
 
         elif self.task_type in RGS_TASKS:
             fe_evaluator = RegressionEvaluator(self.default_config, self.fe_default_config,
@@ -139,13 +154,19 @@ class SecondLayerBandit(object):
                                                data_node=self.original_data, name='fe',
                                                resampling_strategy=self.evaluation_type,
                                                seed=self.seed, output_dir=self.output_dir,
-                                               timestamp=self.timestamp)
+                                               timestamp=self.timestamp,
+                                               transform_cache=self.transform_cache,
+                                               split_plan=self.split_plan,
+                                               n_jobs=self.n_jobs)
             hpo_evaluator = RegressionEvaluator(self.default_config, self.fe_default_config,
                                                 estimator_id, scorer=self.metric,
                                                 data_node=self.original_data, name='hpo',
                                                 resampling_strategy=self.evaluation_type,
                                                 seed=self.seed, output_dir=self.output_dir,
-                                                timestamp=self.timestamp)
+                                                timestamp=self.timestamp,
+                                                transform_cache=self.transform_cache,
+                                                split_plan=self.split_plan,
+                                                n_jobs=self.n_jobs)
         else:
             raise ValueError('Invalid task type!')
 
@@ -169,6 +190,7 @@ class SecondLayerBandit(object):
 
             self.optimizer['hpo'] = build_hpo_optimizer(self.evaluation_type, hpo_evaluator, cs, output_dir=output_dir,
                                                         per_run_time_limit=per_run_time_limit,
+                                                        per_run_mem_limit=per_run_mem_limit,
                                                         inner_iter_num_per_iter=trials_per_iter,
                                                         seed=self.seed, n_jobs=n_jobs)
 
@@ -197,7 +219,10 @@ class SecondLayerBandit(object):
                 if_imbal=self.if_imbal,
                 timestamp=self.timestamp,
                 output_dir=self.output_dir,
-                resampling_strategy=self.evaluation_type)
+                resampling_strategy=self.evaluation_type,
+                transform_cache=self.transform_cache,
+                split_plan=self.split_plan,
+                n_jobs=self.n_jobs)
             cs = get_combined_cs(self.estimator_id, self.task_type,
                                  include_image=self.include_image, include_text=self.include_text,
                                  include_preprocessors=self.include_preprocessors,
@@ -206,6 +231,7 @@ class SecondLayerBandit(object):
             self.optimizer = build_hpo_optimizer(self.evaluation_type, self.evaluator, cs,
                                                  output_dir=self.output_dir,
                                                  per_run_time_limit=self.per_run_time_limit,
+                                                 per_run_mem_limit=self.per_run_mem_limit,
                                                  inner_iter_num_per_iter=trials_per_iter,
                                                  seed=self.seed, n_jobs=self.n_jobs)
 
@@ -373,42 +399,73 @@ class SecondLayerBandit(object):
         self.action_sequence.append(_arm)
         self.pull_cnt += 1
 
+    def __getstate__(self):
+        # The worker pool belongs to the current process; the joint evaluator is registered again after unpickling.
+        state = self.__dict__.copy()
+        state['joint_worker_pool'], state['joint_evaluator_key'] = None, None
+        return state
+
+    def gc(self):
+        """
+            Release the evaluators registered in the worker pool, e.g., when the arm is rejected.
+        """
+        optimizers = self.optimizer.values() if isinstance(self.optimizer, dict) else [self.optimizer]
+        for optimizer in optimizers:
+            optimizer.gc()
+        if self.joint_evaluator_key is not None:
+            self.joint_worker_pool.unregister(self.joint_evaluator_key)
+        self.joint_worker_pool, self.joint_evaluator_key = None, None
+
+    def _register_joint_evaluator(self):
+        """
+            Register the evaluator of the joint incumbents in the worker pool once; it stays resident in the workers.
+        :return: the worker pool and the key of the evaluator.
+        """
+        worker_pool = get_worker_pool()
+        if self.joint_worker_pool is worker_pool and self.joint_evaluator_key is not None:
+            return worker_pool, self.joint_evaluator_key
+        if self.joint_evaluator is None:
+            if self.task_type in CLS_TASKS:
+                self.joint_evaluator = ClassificationEvaluator(
+                    self.default_config, self.fe_default_config, self.estimator_id,
+                    data_node=self.original_data, scorer=self.metric, if_imbal=self.if_imbal,
+                    name='hpo', resampling_strategy=self.evaluation_type,
+                    seed=self.seed, output_dir=self.output_dir, timestamp=self.timestamp,
+                    transform_cache=self.transform_cache,
+                    split_plan=self.split_plan,
+                    n_jobs=self.n_jobs)
+            else:
+                self.joint_evaluator = RegressionEvaluator(
+                    self.default_config, self.fe_default_config, self.estimator_id,
+                    data_node=self.original_data, scorer=self.metric,
+                    name='hpo', resampling_strategy=self.evaluation_type,
+                    seed=self.seed, output_dir=self.output_dir, timestamp=self.timestamp,
+                    transform_cache=self.transform_cache,
+                    split_plan=self.split_plan,
+                    n_jobs=self.n_jobs)
+            # The evaluator is sent to the workers with handles of the shared dataset.
+            self.joint_evaluator.share_data()
+        self.joint_evaluator_key = worker_pool.register(self.joint_evaluator)
+        self.joint_worker_pool = worker_pool
+        return worker_pool, self.joint_evaluator_key
+
     def evaluate_joint_solution(self):
         # Update join incumbent from FE and HPO.
         _perf = None
         try:
-            with time_limit(self.per_run_time_limit):
-                if self.task_type in CLS_TASKS:
-                    evaluator = ClassificationEvaluator(
-                        self.local_inc['hpo'], self.local_inc['fe'], self.estimator_id,
-                        data_node=self.original_data, scorer=self.metric, if_imbal=self.if_imbal,
-                        name='hpo', resampling_strategy=self.evaluation_type,
-                        seed=self.seed, output_dir=self.output_dir, timestamp=self.timestamp)
-                else:
-                    evaluator = RegressionEvaluator(
-                        self.local_inc['hpo'], self.local_inc['fe'], self.estimator_id,
-                        data_node=self.original_data, scorer=self.metric,
-                        name='hpo', resampling_strategy=self.evaluation_type,
-                        seed=self.seed, output_dir=self.output_dir, timestamp=self.timestamp)
-                _perf = -evaluator(self.local_inc['hpo'])
+            # Run in the sandboxed worker pool with hard time and memory limits.
+            worker_pool, evaluator_key = self._register_joint_evaluator()
+            status, result, trial_info, _ = worker_pool.run(evaluator_key, (self.local_inc['hpo'],),
+                                                            kwargs={'ano_config': self.local_inc['fe']},
+                                                            time_limit=self.per_run_time_limit,
+                                                            mem_limit=self.per_run_mem_limit)
+            if status == SUCCESS:
+                _perf = -result
+            else:
+                self.logger.error(trial_info)
         except Exception as e:
             self.logger.error(str(e))
 
-        # TODO: Need refactoring!
-        sorted_list_path = evaluator.topk_model_saver.sorted_list_path
-        path_list = os.path.split(sorted_list_path)
-        tmp_path = 'tmp_' + path_list[-1]
-        tmp_filepath = os.path.join(os.path.dirname(sorted_list_path), tmp_path)
-
-        # TODO: How to merge when using multi-process
-        if os.path.exists(tmp_filepath):
-            self.logger.info('Temporary config path detected!')
-            with open(tmp_filepath, 'rb') as f1:
-                sorted_file_replica = pkl.load(f1)
-            with open(sorted_list_path, 'wb') as f2:
-                pkl.dump(sorted_file_replica, f2)
-            self.logger.info('Temporary config path merged!')
-
         # Update INC.
         if _perf is not None and np.isfinite(_perf) and _perf > self.incumbent_perf:
             self.inc['hpo'] = self.local_inc['hpo']
@@ -442,8 +499,18 @@ class SecondLayerBandit(object):
         self.final_rewards.append(self.incumbent_perf)
         return self.incumbent_perf
 
+    def pull(self, remaining_budget=MAX_INT):
+        """
+            Play once in a worker process of the first-layer bandit.
+        :return: the reward and whether the arm has been early stopped.
+        """
+        reward = self.play_once(remaining_budget)
+        return reward, self.early_stopped_flag
+
     def prepare_optimizer(self, _arm):
         trials_per_iter = self.one_unit_of_resource * self.number_of_unit_resource
+        # The old optimizer is dropped, so its evaluator is released in the workers.
+        self.optimizer[_arm].gc()
         if _arm == 'fe':
             # Build the Feature Engineering component.
             self.original_data._node_id = -1
@@ -454,13 +521,19 @@ class SecondLayerBandit(object):
                                                        name='fe', resampling_strategy=self.evaluation_type,
                                                        if_imbal=self.if_imbal,
                                                        seed=self.seed, output_dir=self.output_dir,
-                                                       timestamp=self.timestamp)
+                                                       timestamp=self.timestamp,
+                                                       transform_cache=self.transform_cache,
+                                                       split_plan=self.split_plan,
+                                                       n_jobs=self.n_jobs)
             elif self.task_type in RGS_TASKS:
                 fe_evaluator = RegressionEvaluator(inc_hpo, self.fe_default_config, self.estimator_id,
                                                    data_node=self.original_data, scorer=self.metric,
                                                    name='fe', resampling_strategy=self.evaluation_type,
                                                    seed=self.seed, output_dir=self.output_dir,
-                                                   timestamp=self.timestamp)
+                                                   timestamp=self.timestamp,
+                                                   transform_cache=self.transform_cache,
+                                                   split_plan=self.split_plan,
+                                                   n_jobs=self.n_jobs)
             else:
                 raise ValueError('Invalid task type!')
             self.optimizer[_arm] = build_fe_optimizer(self.evaluation_type, fe_evaluator,
@@ -481,21 +554,29 @@ class SecondLayerBandit(object):
                                                         resampling_strategy=self.evaluation_type,
                                                         if_imbal=self.if_imbal,
                                                         seed=self.seed, output_dir=self.output_dir,
-                                                        timestamp=self.timestamp)
+                                                        timestamp=self.timestamp,
+                                                        transform_cache=self.transform_cache,
+                                                        split_plan=self.split_plan,
+                                                        n_jobs=self.n_jobs)
             elif self.task_type in RGS_TASKS:
                 hpo_evaluator = RegressionEvaluator(self.default_config, inc_fe,
                                                     self.estimator_id, scorer=self.metric,
                                                     data_node=self.original_data, name='hpo',
                                                     resampling_strategy=self.evaluation_type,
                                                     seed=self.seed, output_dir=self.output_dir,
-                                                    timestamp=self.timestamp)
+                                                    timestamp=self.timestamp,
+                                                    transform_cache=self.transform_cache,
+                                                    split_plan=self.split_plan,
+                                                    n_jobs=self.n_jobs)
             else:
                 raise ValueError('Invalid task type!')
 
             self.optimizer[_arm] = build_hpo_optimizer(self.evaluation_type, hpo_evaluator, self.config_space,
                                                        output_dir=self.output_dir,
                                                        per_run_time_limit=self.per_run_time_limit,
-                                                       inner_iter_num_per_iter=trials_per_iter, seed=self.seed)
+                                                       per_run_mem_limit=self.per_run_mem_limit,
+                                                       inner_iter_num_per_iter=trials_per_iter,
+                                                       seed=self.seed, n_jobs=self.n_jobs)
 
         self.logger.debug('=' * 30)
         self.logger.debug('UPDATE OPTIMIZER: %s' % _arm)
@@ -7,9 +7,11 @@ import pandas as pd
 import shutil
 
 from solnml.automl import AutoML
-from solnml.autodl import AutoDL
 from solnml.components.feature_engineering.transformation_graph import DataNode
-from solnml.datasets.base_dl_dataset import DLDataset
+from solnml.utils.lazy_import import lazy_import
+
+# The DL modules (and torch) are loaded by the first DL estimator only.
+base_dl_dataset = lazy_import('solnml.datasets.base_dl_dataset')
 
 
 class BaseEstimator(object):
@@ -30,7 +32,8 @@ class BaseEstimator(object):
             n_jobs=1,
             evaluation='holdout',
             output_dir="/tmp/",
-            delete_output_dir_after_fit=False):
+            delete_output_dir_after_fit=False,
+            dtype=None):
         self.dataset_name = dataset_name
         self.metric = metric
         self.task_type = None
@@ -46,6 +49,7 @@ class BaseEstimator(object):
         self.random_state = random_state
         self.n_jobs = n_jobs
         self.evaluation = evaluation
+        self.dtype = dtype
         self._ml_engine = None
         # Create output directory.
         if not os.path.exists(output_dir):
@@ -78,7 +82,8 @@ class BaseEstimator(object):
             random_state=self.random_state,
             n_jobs=self.n_jobs,
             evaluation=self.evaluation,
-            output_dir=self.output_dir
+            output_dir=self.output_dir,
+            dtype=self.dtype
         )
         return engine
 
@@ -90,8 +95,8 @@ class BaseEstimator(object):
             shutil.rmtree(self.output_dir)
         return self
 
-    def predict(self, X: DataNode, batch_size=None, n_jobs=1):
-        return self._ml_engine.predict(X)
+    def predict(self, X: DataNode, batch_size=None, n_jobs=1, out=None):
+        return self._ml_engine.predict(X, batch_size=batch_size, n_jobs=n_jobs, out=out)
 
     def score(self, data: DataNode):
         return self._ml_engine.score(data)
@@ -99,8 +104,8 @@ class BaseEstimator(object):
     def refit(self):
         return self._ml_engine.refit()
 
-    def predict_proba(self, X: DataNode, batch_size=None, n_jobs=1):
-        return self._ml_engine.predict_proba(X)
+    def predict_proba(self, X: DataNode, batch_size=None, n_jobs=1, out=None):
+        return self._ml_engine.predict_proba(X, batch_size=batch_size, n_jobs=n_jobs, out=out)
 
     def get_automl(self):
         return AutoML
@@ -250,9 +255,9 @@ class BaseDLEstimator(object):
         )
         return engine
 
-    def fit(self, data: DLDataset, **kwargs):
+    def fit(self, data: 'DLDataset', **kwargs):
         try:
-            assert data is not None and isinstance(data, DLDataset)
+            assert data is not None and isinstance(data, base_dl_dataset.DLDataset)
             self._ml_engine = self.build_engine()
             self._ml_engine.fit(data, **kwargs)
         except Exception as e:
@@ -262,20 +267,21 @@ class BaseDLEstimator(object):
             print("-" * 60)
         return self
 
-    def predict(self, X: DLDataset, mode='test', batch_size=1, n_jobs=1):
+    def predict(self, X: 'DLDataset', mode='test', batch_size=1, n_jobs=1):
         return self._ml_engine.predict(X, mode=mode, batch_size=batch_size, n_jobs=n_jobs)
 
-    def score(self, data: DLDataset, mode='test'):
+    def score(self, data: 'DLDataset', mode='test'):
         return self._ml_engine.score(data, mode=mode)
 
-    def refit(self, data: DLDataset):
+    def refit(self, data: 'DLDataset'):
         return self._ml_engine.refit(data)
 
-    def predict_proba(self, X: DLDataset, mode='test', batch_size=1, n_jobs=1):
+    def predict_proba(self, X: 'DLDataset', mode='test', batch_size=1, n_jobs=1):
         return self._ml_engine.predict_proba(X, mode=mode, batch_size=batch_size, n_jobs=n_jobs)
 
     def get_runtime_history(self):
         return self._ml_engine._get_runtime_info()
 
     def get_automl(self):
+        from solnml.autodl import AutoDL
         return AutoDL
@@ -11,13 +11,16 @@ class NoDaemonProcess(multiprocessing.Process):
         pass
 
 
-class NoDaemonContext(type(multiprocessing.get_context())):
-    Process = NoDaemonProcess
+def get_nodaemon_context():
+    # The context follows the start method when the pool is created (e.g., forkserver in the sandboxed workers),
+    # so that the locks of the pool queues and the processes are of the same kind.
+    context_class = type(multiprocessing.get_context())
+    return type('NoDaemonContext', (context_class,), {'Process': NoDaemonProcess})()
 
 
 # Sub-class multiprocessing.pool.Pool instead of multiprocessing.Pool
 # because the latter is only a wrapper function, not a proper class.
 class ProcessPool(multiprocessing.pool.Pool):
     def __init__(self, *args, **kwargs):
-        kwargs['context'] = NoDaemonContext()
+        kwargs['context'] = get_nodaemon_context()
         super(ProcessPool, self).__init__(*args, **kwargs)
@@ -0,0 +1,82 @@
+"""
+    Chunked prediction on large test sets.
+
+    The rows of the test DataNode are predicted chunk by chunk, so the FE intermediates and the predictions
+    of the ensemble members only exist for one chunk (per worker) at a time. The results are written into
+    one array allocated once: a given array, a file-backed .npy array, or a new array in memory.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from solnml.components.feature_engineering.transformation_graph import DataNode
+
+
+def slice_node(data_node: DataNode, start, end):
+    """
+    :return: DataNode with the rows [start, end) of data_node; the arrays are not copied (see DataNode.copy_).
+    """
+    node = data_node.copy_()
+    X, y = node.data[:2]
+    X = X.iloc[start:end] if hasattr(X, 'iloc') else X[start:end]
+    y = None if y is None else y[start:end]
+    node.data = [X, y]
+    return node
+
+
+def _allocate_output(out, shape, dtype):
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if isinstance(out, str):
+        return np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+    if out.shape != shape:
+        raise ValueError('The output array has shape %s, but the predictions have shape %s!' % (out.shape, shape))
+    return out
+
+
+def batch_predict(predict_func, data_node: DataNode, batch_size=None, n_jobs=1, out=None):
+    """
+        Apply predict_func on the row chunks of data_node.
+    :param predict_func: function DataNode -> predictions of its rows (numpy array).
+    :param batch_size: number of rows per chunk; None to predict all the rows in one call.
+    :param n_jobs: number of chunks predicted concurrently, in threads of this process
+        (the models are shared, and numpy and most estimators release the GIL).
+    :param out: array of the shape of the predictions to write into, or the path of a .npy file
+        to create as a file-backed array (np.memmap); None to allocate an array in memory.
+    :return: the array with the predictions.
+    """
+    n_samples = data_node.data[0].shape[0]
+    if batch_size is None or batch_size >= n_samples:
+        pred = predict_func(data_node)
+        if out is None:
+            return pred
+        output = _allocate_output(out, pred.shape, pred.dtype)
+        output[...] = pred
+        return output
+
+    batch_size = int(batch_size)
+    if batch_size < 1:
+        raise ValueError('The batch size must be positive, but get %s!' % batch_size)
+    starts = list(range(0, n_samples, batch_size))
+
+    # The first chunk runs in the calling thread: it fixes the output shape and builds the lazy states
+    # of the predictors (e.g., the traces of the compiled FE pipelines) before the workers share them.
+    pred = predict_func(slice_node(data_node, 0, batch_size))
+    output = _allocate_output(out, (n_samples,) + pred.shape[1:], pred.dtype)
+    output[:pred.shape[0]] = pred
+    del pred
+
+    def predict_chunk(start):
+        end = min(start + batch_size, n_samples)
+        output[start:end] = predict_func(slice_node(data_node, start, end))
+
+    if n_jobs is None or n_jobs <= 1 or len(starts) <= 2:
+        for start in starts[1:]:
+            predict_chunk(start)
+    else:
+        with ThreadPoolExecutor(max_workers=int(n_jobs)) as executor:
+            # Iterate the results to raise the exceptions of the workers.
+            for _ in executor.map(predict_chunk, starts[1:]):
+                pass
+    if isinstance(output, np.memmap):
+        output.flush()
+    return output
@@ -0,0 +1,85 @@
+import time
+from multiprocessing.connection import wait as wait_connections
+from .sandbox_pool import SandboxWorker, get_context, FAILED
+from .thread_budget import get_worker_thread_quota
+
+
+class ParallelArmExecutor(object):
+    """
+        Pull the arms (second-layer bandits) in separate worker processes, at most n_jobs at a time.
+
+        Each arm stays resident in its own worker between the pulls, so only the results of the pulls
+        are sent back; the arm itself is sent back once by fetch(). If a worker dies, it is restarted with
+        the arm given to the executor, i.e., the progress of the arm in the dead worker is lost.
+    """
+
+    def __init__(self, arms, n_jobs=1):
+        """
+        :param arms: dict of arm id -> arm.
+        """
+        ctx = get_context()
+        self.n_jobs = n_jobs
+        self.arms = arms
+        self.workers = dict()
+        for arm_id, arm in arms.items():
+            worker = SandboxWorker(ctx)
+            worker.conn.send(('register', arm_id, arm))
+            self.workers[arm_id] = worker
+        # Arm id -> start time of the running pull.
+        self.running_arms = dict()
+
+    def submit(self, arm_id, method, *args, **kwargs):
+        """
+            Start a pull: arm.method(*args, **kwargs) in the worker of the arm.
+        """
+        if arm_id in self.running_arms:
+            raise ValueError('Arm %s is already running!' % arm_id)
+        if len(self.running_arms) >= self.n_jobs:
+            raise ValueError('At most %d arms can run at the same time!' % self.n_jobs)
+        # Each of the n_jobs running arms gets an equal share of the thread budget.
+        n_threads = get_worker_thread_quota(self.n_jobs)
+        self.workers[arm_id].conn.send(('run', arm_id, method, args, kwargs, dict(), n_threads))
+        self.running_arms[arm_id] = time.time()
+
+    def wait(self):
+        """
+            Block until at least one of the running pulls finishes.
+        :return: list of (arm_id, status, result, info, time_taken).
+        """
+        conns = {self.workers[arm_id].conn: arm_id for arm_id in self.running_arms}
+        results = list()
+        for conn in wait_connections(list(conns.keys())):
+            arm_id = conns[conn]
+            start_time = self.running_arms.pop(arm_id)
+            try:
+                status, result, info, time_taken = conn.recv()
+            except (EOFError, OSError):
+                status, result, info = FAILED, None, 'The worker of arm %s died and is restarted!' % arm_id
+                time_taken = time.time() - start_time
+                self._restart(arm_id)
+            results.append((arm_id, status, result, info, time_taken))
+        return results
+
+    def _restart(self, arm_id):
+        worker = self.workers[arm_id]
+        worker.restart()
+        worker.conn.send(('register', arm_id, self.arms[arm_id]))
+
+    def fetch(self, arm_id):
+        """
+        :return: the arm with its current state, or None if its worker died.
+        """
+        worker = self.workers[arm_id]
+        if not worker.process.is_alive():
+            return None
+        worker.conn.send(('fetch', arm_id))
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            return None
+
+    def shutdown(self):
+        for worker in self.workers.values():
+            worker.stop()
+        self.workers = dict()
+        self.running_arms = dict()
@@ -1,6 +1,6 @@
 import time
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED
 from ConfigSpace import Configuration
 
 
@@ -29,14 +29,8 @@ class ParallelEvaluator(object):
         self.evaluator = evaluator
 
     def wait_tasks_finish(self, trial_stats):
-        all_completed = False
-        while not all_completed:
-            all_completed = True
-            for trial in trial_stats:
-                if not trial.done():
-                    all_completed = False
-                    time.sleep(0.1)
-                    break
+        # Block on the futures instead of polling them.
+        wait(trial_stats, return_when=ALL_COMPLETED)
 
     def parallel_execute(self, param_list, resource_ratio=1.):
         n_configuration = len(param_list)
@@ -0,0 +1,160 @@
+import time
+import inspect
+import multiprocessing
+from multiprocessing import util
+from multiprocessing.connection import wait as wait_connections
+from .sandbox_pool import SandboxWorker, get_context, SUCCESS, FAILED
+from .thread_budget import get_thread_quota
+
+# Key of the fold function resident in the fold workers.
+_FOLD_KEY = 'fold'
+
+
+def _get_token(fold_func):
+    """
+        Identify the fold function sent to the workers.
+        A bound method is created on each access, so it is identified by its object and function.
+    """
+    if inspect.ismethod(fold_func):
+        return id(fold_func.__self__), fold_func.__func__.__qualname__
+    return id(fold_func)
+
+
+def _stop_workers(workers):
+    for worker in workers:
+        worker.stop()
+    del workers[:]
+
+
+class ParallelFoldExecutor(object):
+    """
+        Fit and score the folds of one cross-validation in n_jobs worker processes.
+        The fold scores are collected in fold order, so the results are identical to the serial execution.
+
+        The workers are started on the first parallel execution and stay alive across the evaluations, until
+        shutdown(), the garbage collection of the executor or the exit of its process. The fold function is sent
+        to each worker once and stays resident there with its state, e.g., the transform cache of an evaluator;
+        the i-th fold always runs in the worker i % n_jobs, so the transformations of each split are fitted once.
+        fold_func must be picklable (e.g., a bound method of the evaluator instead of a lambda); the arrays shared
+        by the evaluators (see _BaseEvaluator.share_data) are then sent as file handles.
+    """
+
+    def __init__(self, n_jobs=1):
+        self.n_jobs = n_jobs
+        self.workers = list()
+        self._finalizer = None
+
+    def __getstate__(self):
+        # The workers belong to the current process; they are started again after unpickling.
+        state = self.__dict__.copy()
+        state['workers'], state['_finalizer'] = list(), None
+        return state
+
+    def execute(self, fold_func, fold_args, stop_func=None, fold_kwargs=None):
+        """
+        :param fold_func: function that evaluates one fold and returns its score.
+        :param fold_args: list of arguments of fold_func, one for each fold.
+        :param stop_func: called with the fold scores so far; the remaining folds are skipped if it returns True.
+            In parallel, it is checked after each batch of n_jobs folds.
+        :param fold_kwargs: keyword arguments of fold_func shared by the folds, sent with each fold.
+        :return: fold scores and fold time costs.
+        """
+        fold_kwargs = fold_kwargs or dict()
+        n_jobs = min(self.n_jobs, len(fold_args))
+        # Stay within the thread quota of the current process.
+        thread_quota = get_thread_quota(default=None)
+        if thread_quota is not None:
+            n_jobs = min(n_jobs, thread_quota)
+        # Daemonic processes are not allowed to have children.
+        if n_jobs <= 1 or multiprocessing.current_process().daemon:
+            return self._serial_execute(fold_func, fold_args, fold_kwargs, stop_func)
+        return self._parallel_execute(fold_func, fold_args, fold_kwargs, stop_func, n_jobs)
+
+    def shutdown(self):
+        """
+            Stop the workers; the next parallel execution starts them again.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+        self._finalizer = None
+
+    @staticmethod
+    def _serial_execute(fold_func, fold_args, fold_kwargs, stop_func=None):
+        scores, time_costs = list(), list()
+        for fold_arg in fold_args:
+            start_time = time.time()
+            scores.append(fold_func(fold_arg, **fold_kwargs))
+            time_costs.append(time.time() - start_time)
+            if stop_func is not None and stop_func(scores):
+                break
+        return scores, time_costs
+
+    def _get_workers(self, n_jobs, fold_func):
+        if self._finalizer is None:
+            # Stop the workers when the executor is garbage collected, or when its process exits.
+            self._finalizer = util.Finalize(self, _stop_workers, args=(self.workers,), exitpriority=10)
+        ctx = get_context()
+        while len(self.workers) < n_jobs:
+            self.workers.append(SandboxWorker(ctx))
+        token = _get_token(fold_func)
+        for worker in self.workers[:n_jobs]:
+            if not worker.is_alive():
+                worker.restart()
+            if worker.objects.get(_FOLD_KEY) != token:
+                worker.conn.send(('register', _FOLD_KEY, fold_func))
+                worker.objects[_FOLD_KEY] = token
+        return self.workers[:n_jobs]
+
+    def _parallel_execute(self, fold_func, fold_args, fold_kwargs, stop_func, n_jobs):
+        n_fold = len(fold_args)
+        batch_size = n_jobs if stop_func is not None else n_fold
+        scores, time_costs = list(), list()
+        thread_quota = get_thread_quota(default=None)
+        n_threads = None if thread_quota is None else max(1, thread_quota // n_jobs)
+        workers = self._get_workers(n_jobs, fold_func)
+        for batch_start in range(0, n_fold, batch_size):
+            fold_ids = list(range(batch_start, min(batch_start + batch_size, n_fold)))
+            results = self._run_batch(workers, fold_ids, fold_args, fold_kwargs, n_threads)
+            for fold_idx in fold_ids:
+                scores.append(results[fold_idx][0])
+                time_costs.append(results[fold_idx][1])
+            if stop_func is not None and stop_func(scores):
+                break
+        return scores, time_costs
+
+    @staticmethod
+    def _run_batch(workers, fold_ids, fold_args, fold_kwargs, n_threads):
+        """
+        :return: fold index -> (score, time cost).
+        """
+        queues = [[fold_idx for fold_idx in fold_ids if fold_idx % len(workers) == idx] for idx in range(len(workers))]
+        # Connection of the busy worker -> (worker index, fold index).
+        running = dict()
+        results, error = dict(), None
+
+        def _dispatch(idx):
+            if queues[idx] and error is None:
+                fold_idx = queues[idx].pop(0)
+                workers[idx].conn.send(('run', _FOLD_KEY, None, (fold_args[fold_idx],), fold_kwargs, dict(),
+                                        n_threads))
+                running[workers[idx].conn] = (idx, fold_idx)
+
+        for idx in range(len(workers)):
+            _dispatch(idx)
+        # After a failure, the running folds are still collected, so that no result is left in the pipes.
+        while running:
+            for conn in wait_connections(list(running.keys())):
+                idx, fold_idx = running.pop(conn)
+                try:
+                    status, score, info, time_cost = conn.recv()
+                except (EOFError, OSError):
+                    status, info = FAILED, 'Fold worker died with exit code %s.' % str(workers[idx].process.exitcode)
+                    workers[idx].restart()
+                if status != SUCCESS:
+                    error = error or 'Fold %d failed: %s' % (fold_idx, info)
+                    continue
+                results[fold_idx] = (score, time_cost)
+                _dispatch(idx)
+        if error is not None:
+            raise RuntimeError(error)
+        return results
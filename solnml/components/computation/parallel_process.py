@@ -1,57 +1,141 @@
-import time
+import os
 import numpy as np
-from ConfigSpace import Configuration
 from multiprocessing import Manager
-from .base.nondaemonic_processpool import ProcessPool
+from solnml.utils.logging_utils import get_logger
+from solnml.components.computation.sandbox_pool import get_worker_pool, SUCCESS
 
+_manager = None
+_manager_pid = None
 
-def execute_func(evaluator, config, resource_ratio, eta, first_iter, rw_lock):
-    start_time = time.time()
-    try:
-        score = evaluator(config, name='hpo', resource_ratio=resource_ratio, eta=eta, first_iter=first_iter,
-                          rw_lock=rw_lock)
-    except Exception as e:
-        print(e)
-        score = np.inf
 
-    time_taken = time.time() - start_time
-    return score, time_taken
+def get_rw_lock():
+    """
+        Lock shared by the evaluations of the current process; the manager process is started once.
+    """
+    global _manager, _manager_pid
+    if _manager is None or _manager_pid != os.getpid():
+        _manager, _manager_pid = Manager(), os.getpid()
+    return _manager.Lock()
 
 
 class ParallelProcessEvaluator(object):
-    def __init__(self, evaluator, n_worker=1):
+    """
+        Evaluate batches of configurations (e.g., the rungs of successive halving) in the shared worker pool.
+
+        The pool is persistent: the workers are started once and stay warm across brackets and arms,
+        and the evaluator is sent to each worker once instead of being pickled for each task.
+        An executor kept by the optimizer can be entered for each bracket: the evaluator stays resident
+        until close(). Use shutdown_worker_pool (computation.sandbox_pool) to stop the workers at the end of fit.
+    """
+
+    def __init__(self, evaluator, n_worker=1, time_limit=None, mem_limit=None):
+        """
+        :param time_limit: wall-clock limit (in seconds) of each evaluation.
+        :param mem_limit: memory limit (in MB) of each evaluation.
+        """
         self.evaluator = evaluator
+        self.share_data(evaluator)
         self.n_worker = n_worker
-        self.process_pool = None
-        self.rwlock = Manager().Lock()
+        self.time_limit = time_limit
+        self.mem_limit = mem_limit
+        self.worker_pool = None
+        self.evaluator_key = None
+        self.rwlock = None
+        # Task id -> completion callback of the asynchronous evaluations.
+        self.callbacks = dict()
+        self.logger = get_logger(self.__module__ + "." + self.__class__.__name__)
+
+    def __getstate__(self):
+        # The worker pool belongs to the current process; the evaluator is registered again after unpickling.
+        state = self.__dict__.copy()
+        state['worker_pool'], state['evaluator_key'], state['rwlock'] = None, None, None
+        state['callbacks'] = dict()
+        return state
 
     def update_evaluator(self, evaluator):
         self.evaluator = evaluator
+        self.share_data(evaluator)
+        if self.evaluator_key is not None:
+            # Registering with the same key replaces the resident evaluator in the workers.
+            self.worker_pool.register(evaluator, key=self.evaluator_key)
+
+    @staticmethod
+    def share_data(evaluator):
+        # With the data in memory-mapped files, only the file handles are sent and the workers map the same pages.
+        if hasattr(evaluator, 'share_data'):
+            evaluator.share_data()
+
+    def _submit(self, config, resource_ratio, eta, first_iter):
+        kwargs = {'name': 'hpo', 'resource_ratio': resource_ratio, 'eta': eta,
+                  'first_iter': first_iter, 'rw_lock': self.rwlock}
+        return self.worker_pool.submit(self.evaluator_key, (config,), kwargs=kwargs,
+                                       time_limit=self.time_limit, mem_limit=self.mem_limit)
+
+    def _get_result(self, task_id):
+        status, perf, info, _ = self.worker_pool.get_result(task_id)
+        if status != SUCCESS:
+            self.logger.error('Evaluation failed: %s' % info)
+            perf = np.inf
+        return perf
 
     def parallel_execute(self, param_list, resource_ratio=1., eta=3, first_iter=False):
-        evaluation_result = list()
-        apply_results = list()
+        """
+        :return: validation losses in the order of param_list; np.inf for the failed evaluations.
+        """
+        task_ids = [self._submit(_param, resource_ratio, eta, first_iter) for _param in param_list]
+        self.worker_pool.wait(task_ids)
+        return [self._get_result(task_id) for task_id in task_ids]
+
+    @property
+    def running_num(self):
+        return len(self.callbacks)
 
-        for _param in param_list:
-            apply_results.append(self.process_pool.apply_async(execute_func,
-                                                               (self.evaluator, _param, resource_ratio, eta,
-                                                                first_iter, self.rwlock)))
-        for res in apply_results:
-            res.wait()
-            perf = res.get()[0]
-            evaluation_result.append(perf)
+    def submit(self, config, resource_ratio=1., eta=3, first_iter=False, callback=None):
+        """
+            Start an evaluation without waiting for it.
+        :param callback: called with the validation loss (np.inf if failed) when the evaluation finishes.
+        :return: task id.
+        """
+        task_id = self._submit(config, resource_ratio, eta, first_iter)
+        self.callbacks[task_id] = callback
+        return task_id
 
-            # return_dict=res.get()[0]
-            # evaluation_result.append(return_dict)
+    def wait(self, first_completed=True):
+        """
+            Block until the submitted evaluations (or one of them) finish, and call their callbacks.
+        :return: number of the finished evaluations.
+        """
+        if not self.callbacks:
+            return 0
+        finished_ids = self.worker_pool.wait(list(self.callbacks.keys()), first_completed=first_completed)
+        for task_id in finished_ids:
+            callback = self.callbacks.pop(task_id)
+            val_loss = self._get_result(task_id)
+            if callback is not None:
+                callback(val_loss)
+        return len(finished_ids)
 
-        return evaluation_result
+    def get_stats(self):
+        return None if self.worker_pool is None else self.worker_pool.get_stats()
 
-    # def shutdown(self):
-    #     self.process_pool.close()
+    def close(self):
+        """
+            Release the evaluator in the workers; the workers stay alive for the other executors.
+        """
+        if self.evaluator_key is not None:
+            self.worker_pool.unregister(self.evaluator_key)
+        self.worker_pool, self.evaluator_key = None, None
 
     def __enter__(self):
-        self.process_pool = ProcessPool(processes=self.n_worker)
+        worker_pool = get_worker_pool(n_workers=self.n_worker)
+        if worker_pool is not self.worker_pool:
+            # The first use, or the pool was shut down and started again.
+            self.worker_pool = worker_pool
+            self.evaluator_key = self.worker_pool.register(self.evaluator)
+        if self.rwlock is None:
+            self.rwlock = get_rw_lock()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.process_pool.close()
+        # Keep the evaluator resident, so that the next bracket starts with warm workers.
+        pass
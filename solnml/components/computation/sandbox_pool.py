@@ -0,0 +1,425 @@
+import os
+import sys
+import time
+import atexit
+import psutil
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from multiprocessing.connection import wait as wait_connections
+from collections import OrderedDict
+
+from solnml.utils.logging_utils import get_logger
+from solnml.components.computation.thread_budget import get_worker_thread_quota, apply_thread_quota
+
+# Trial status, SUCCESS/FAILED/TIMEOUT are consistent with litebo.
+SUCCESS, FAILED, TIMEOUT, MEMOUT = 0, 1, 2, 3
+
+
+# Interval (in seconds) of the memory checks of the running tasks.
+MEM_CHECK_INTERVAL = 0.2
+
+
+def get_rss(pid):
+    """
+    :return: resident memory (in bytes) of the process and its children (e.g., the processes of the folds).
+    """
+    try:
+        process = psutil.Process(pid)
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+    except psutil.Error:
+        return 0
+
+
+def worker_loop(conn):
+    """
+        Task loop of a sandboxed worker.
+        The objects (e.g., evaluators) are sent once by key and stay resident in the worker.
+    """
+    objects = dict()
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        cmd = msg[0]
+        if cmd == 'stop':
+            break
+        elif cmd == 'register':
+            _, key, obj = msg
+            objects[key] = obj
+        elif cmd == 'unregister':
+            objects.pop(msg[1], None)
+        elif cmd == 'fetch':
+            conn.send(objects[msg[1]])
+        elif cmd == 'run':
+            _, key, method, args, kwargs, attributes, n_threads = msg
+            start_time = time.time()
+            try:
+                if n_threads is not None:
+                    apply_thread_quota(n_threads)
+                obj = objects[key]
+                for name, value in attributes.items():
+                    setattr(obj, name, value)
+                func = obj if method is None else getattr(obj, method)
+                result = (SUCCESS, func(*args, **kwargs), None)
+            except MemoryError as e:
+                result = (MEMOUT, None, 'MemoryError: %s' % str(e))
+            except Exception as e:
+                result = (FAILED, None, '%s: %s' % (e.__class__.__name__, str(e)))
+            try:
+                conn.send(result + (time.time() - start_time,))
+            except Exception as e:
+                conn.send((FAILED, None, 'Failed to send the result: %s' % str(e), time.time() - start_time))
+
+
+def get_context(start_method='forkserver'):
+    if start_method not in multiprocessing.get_all_start_methods():
+        start_method = 'fork'
+    ctx = multiprocessing.get_context(start_method)
+    if start_method == 'forkserver':
+        ctx.set_forkserver_preload([__name__])
+    return ctx
+
+
+# Serializes the start of the workers, while the __file__ of the main module is hidden.
+_start_lock = threading.Lock()
+
+
+@contextmanager
+def _hide_main_file():
+    """
+        Keep the started process from re-importing the main script: scripts without the
+        "if __name__ == '__main__'" guard would be executed again. The worker loop does not depend on the main script.
+        The attribute is restored even if the process fails to start.
+    """
+    with _start_lock:
+        main_module = sys.modules['__main__']
+        main_file = main_module.__dict__.pop('__file__', None)
+        try:
+            yield
+        finally:
+            if main_file is not None:
+                main_module.__file__ = main_file
+
+
+class SandboxWorker(object):
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.process = None
+        self.conn = None
+        # Resident objects: key -> version.
+        self.objects = OrderedDict()
+        # Health and utilization stats.
+        self.create_time = time.time()
+        self.task_num = 0
+        self.busy_time = 0.
+        self.restart_num = 0
+        self.start()
+
+    def start(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        # Non-daemonic, so that the evaluation can use a process pool (e.g., for cross-validation folds).
+        self.process = self.ctx.Process(target=worker_loop, args=(child_conn,), daemon=False)
+        if self.ctx.get_start_method() == 'fork':
+            # The forked worker inherits the imported modules and never re-imports the main script.
+            self.process.start()
+        else:
+            with _hide_main_file():
+                self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.objects.clear()
+
+    def kill(self):
+        if self.process is not None and self.process.is_alive():
+            # The processes started by the task (e.g., for the folds) are killed too.
+            try:
+                for child in psutil.Process(self.process.pid).children(recursive=True):
+                    child.kill()
+            except psutil.Error:
+                pass
+            self.process.kill()
+        if self.process is not None:
+            self.process.join()
+        if self.conn is not None:
+            self.conn.close()
+        self.process, self.conn = None, None
+
+    def restart(self):
+        self.kill()
+        self.start()
+        self.restart_num += 1
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self):
+        try:
+            self.conn.send(('stop',))
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        self.kill()
+
+
+class SandboxWorkerPool(object):
+    """
+        Pool of long-lived sandboxed workers.
+
+        Each task runs under a wall-clock limit, a memory limit and a thread quota, its share of the thread budget
+        (see computation.thread_budget). The memory limit bounds the growth of the resident memory of the worker
+        and its children, checked by the pool every MEM_CHECK_INTERVAL seconds; the virtual address space is not
+        limited, as the BLAS/OpenMP runtimes reserve large arenas that they never touch.
+        A worker is killed and restarted only if its task exceeds a limit or the worker dies.
+        Large objects, e.g., evaluators, are registered once and sent to each worker once.
+    """
+
+    def __init__(self, n_workers=1, max_objects=4, start_method='forkserver'):
+        ctx = get_context(start_method)
+        self.ctx = ctx
+        self.n_workers = n_workers
+        self.max_objects = max_objects
+        self.pid = os.getpid()
+        self.logger = get_logger(self.__module__ + "." + self.__class__.__name__)
+        self.workers = [SandboxWorker(ctx) for _ in range(n_workers)]
+
+        self.objects = dict()
+        self.obj_cnt = 0
+        self.task_cnt = 0
+        self.pending_tasks = list()
+        # Worker index -> (task_id, deadline, start_time, rss_limit).
+        self.running_tasks = dict()
+        self.results = dict()
+
+    def add_workers(self, n_workers):
+        self.workers.extend([SandboxWorker(self.ctx) for _ in range(n_workers)])
+        self.n_workers = len(self.workers)
+        self._dispatch()
+
+    def register(self, obj, key=None):
+        """
+            Register an object that can be called by the tasks; registering again with the same key updates it.
+        :return: key of the object.
+        """
+        if key is None:
+            self.obj_cnt += 1
+            key = 'obj-%d' % self.obj_cnt
+        version = self.objects[key][0] + 1 if key in self.objects else 0
+        self.objects[key] = (version, obj)
+        return key
+
+    def unregister(self, key):
+        self.objects.pop(key, None)
+        for worker in self.workers:
+            if key in worker.objects:
+                worker.objects.pop(key)
+                worker.conn.send(('unregister', key))
+
+    def submit(self, key, args=(), kwargs=None, attributes=None, time_limit=None, mem_limit=None, method=None):
+        """
+            Submit a task that calls the registered object: obj(*args, **kwargs), or obj.method(*args, **kwargs).
+            It starts at the next call of wait().
+        :param attributes: attributes set on the resident object before the call.
+        :param time_limit: wall-clock limit in seconds.
+        :param mem_limit: memory (in MB) the task may add to the resident memory of the worker when it starts.
+        :return: task id.
+        """
+        if key not in self.objects:
+            raise ValueError('Object %s is not registered!' % key)
+        self.task_cnt += 1
+        task_id = self.task_cnt
+        self.pending_tasks.append((task_id, key, method, tuple(args), kwargs or dict(), attributes or dict(),
+                                   time_limit, mem_limit))
+        return task_id
+
+    def _send_object(self, worker, key):
+        version, obj = self.objects[key]
+        if worker.objects.get(key) == version:
+            worker.objects.move_to_end(key)
+            return
+        worker.conn.send(('register', key, obj))
+        worker.objects[key] = version
+        worker.objects.move_to_end(key)
+        while len(worker.objects) > self.max_objects:
+            _key, _ = worker.objects.popitem(last=False)
+            worker.conn.send(('unregister', _key))
+
+    def _dispatch(self):
+        # The thread budget is split among the workers that will be busy after this dispatch.
+        n_threads = get_worker_thread_quota(min(len(self.workers), len(self.running_tasks) + len(self.pending_tasks)))
+        for idx, worker in enumerate(self.workers):
+            if not self.pending_tasks:
+                break
+            if idx in self.running_tasks:
+                continue
+            task_id, key, method, args, kwargs, attributes, time_limit, mem_limit = self.pending_tasks.pop(0)
+            try:
+                self._send_object(worker, key)
+                rss_limit = None if mem_limit is None else get_rss(worker.process.pid) + int(mem_limit * 1024 * 1024)
+                worker.conn.send(('run', key, method, args, kwargs, attributes, n_threads))
+            except Exception as e:
+                self.results[task_id] = (FAILED, None, 'Failed to dispatch the task: %s' % str(e), 0.)
+                worker.restart()
+                continue
+            deadline = None if time_limit is None else time.time() + time_limit
+            self.running_tasks[idx] = (task_id, deadline, time.time(), rss_limit)
+
+    def _collect(self, timeout=None):
+        """
+            Wait for the running tasks until one of them finishes or exceeds its time limit.
+        """
+        if not self.running_tasks:
+            return
+        deadlines = [deadline for _, deadline, _, _ in self.running_tasks.values() if deadline is not None]
+        if deadlines:
+            _timeout = max(0., min(deadlines) - time.time())
+            timeout = _timeout if timeout is None else min(timeout, _timeout)
+        if any(rss_limit is not None for _, _, _, rss_limit in self.running_tasks.values()):
+            timeout = MEM_CHECK_INTERVAL if timeout is None else min(timeout, MEM_CHECK_INTERVAL)
+        conns = {self.workers[idx].conn: idx for idx in self.running_tasks}
+        ready_conns = wait_connections(list(conns.keys()), timeout=timeout)
+
+        for conn in ready_conns:
+            idx = conns[conn]
+            task_id, _, start_time, _ = self.running_tasks.pop(idx)
+            worker = self.workers[idx]
+            worker.task_num += 1
+            worker.busy_time += time.time() - start_time
+            try:
+                self.results[task_id] = conn.recv()
+            except (EOFError, OSError):
+                # The worker died, e.g., it was killed by the OOM killer.
+                exitcode = worker.process.exitcode
+                self.results[task_id] = (MEMOUT, None, 'Worker died with exit code %s.' % str(exitcode),
+                                         time.time() - start_time)
+                self.logger.warning('Worker %d died and is restarted!' % idx)
+                worker.restart()
+
+        _cur_time = time.time()
+        for idx, (task_id, deadline, start_time, rss_limit) in list(self.running_tasks.items()):
+            if deadline is not None and _cur_time >= deadline:
+                result = (TIMEOUT, None, 'Timeout: time limit for this evaluation is %.1fs' %
+                          (deadline - start_time), _cur_time - start_time)
+                self.logger.warning('Worker %d exceeded the time limit and is restarted!' % idx)
+            elif rss_limit is not None and get_rss(self.workers[idx].process.pid) > rss_limit:
+                result = (MEMOUT, None, 'Memout: memory limit for this evaluation is exceeded.',
+                          _cur_time - start_time)
+                self.logger.warning('Worker %d exceeded the memory limit and is restarted!' % idx)
+            else:
+                continue
+            self.running_tasks.pop(idx)
+            self.workers[idx].task_num += 1
+            self.workers[idx].busy_time += _cur_time - start_time
+            self.results[task_id] = result
+            self.workers[idx].restart()
+        self._dispatch()
+
+    def wait(self, task_ids=None, first_completed=False):
+        """
+            Block until the tasks (all submitted tasks by default) finish.
+        :param first_completed: return as soon as one of the tasks finishes.
+        :return: ids of the finished tasks.
+        """
+        if task_ids is None:
+            task_ids = [task[0] for task in self.pending_tasks] + \
+                       [task[0] for task in self.running_tasks.values()] + list(self.results.keys())
+        task_ids = list(task_ids)
+        # The tasks are dispatched here rather than on submission,
+        # so that the thread quota of a batch of tasks is known when they start.
+        self._dispatch()
+        while True:
+            finished_ids = [task_id for task_id in task_ids if task_id in self.results]
+            if len(finished_ids) == len(task_ids) or (first_completed and len(finished_ids) > 0):
+                return finished_ids
+            self._collect()
+
+    def get_result(self, task_id):
+        """
+        :return: status, result, info, time_taken
+        """
+        return self.results.pop(task_id)
+
+    def run(self, key, args=(), kwargs=None, attributes=None, time_limit=None, mem_limit=None, method=None):
+        task_id = self.submit(key, args, kwargs, attributes=attributes, time_limit=time_limit, mem_limit=mem_limit,
+                              method=method)
+        self.wait([task_id])
+        return self.get_result(task_id)
+
+    def get_stats(self):
+        """
+        :return: health and utilization of the workers: number of finished tasks, busy time,
+            utilization (busy time / lifetime), number of restarts (after timeouts or deaths) and liveness.
+        """
+        _cur_time = time.time()
+        worker_stats = list()
+        for idx, worker in enumerate(self.workers):
+            busy_time = worker.busy_time
+            if idx in self.running_tasks:
+                busy_time += _cur_time - self.running_tasks[idx][2]
+            lifetime = max(_cur_time - worker.create_time, 1e-6)
+            worker_stats.append({'task_num': worker.task_num, 'busy_time': busy_time,
+                                 'utilization': busy_time / lifetime, 'restart_num': worker.restart_num,
+                                 'alive': worker.is_alive()})
+        total_lifetime = sum(max(_cur_time - worker.create_time, 1e-6) for worker in self.workers)
+        total_busy_time = sum(stats['busy_time'] for stats in worker_stats)
+        return {'n_workers': len(self.workers),
+                'task_num': sum(stats['task_num'] for stats in worker_stats),
+                'pending_task_num': len(self.pending_tasks),
+                'running_task_num': len(self.running_tasks),
+                'busy_time': total_busy_time,
+                'utilization': total_busy_time / total_lifetime if self.workers else 0.,
+                'restart_num': sum(stats['restart_num'] for stats in worker_stats),
+                'alive_num': sum(stats['alive'] for stats in worker_stats),
+                'workers': worker_stats}
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = list()
+        self.pending_tasks, self.running_tasks = list(), dict()
+
+
+_worker_pool = None
+
+
+def get_worker_pool(n_workers=1):
+    """
+        The worker pool shared in the current process.
+    """
+    global _worker_pool
+    if _worker_pool is not None and _worker_pool.pid != os.getpid():
+        # Inherited from the parent process by fork.
+        _worker_pool = None
+    if _worker_pool is None:
+        _worker_pool = SandboxWorkerPool(n_workers=n_workers)
+    elif _worker_pool.n_workers < n_workers:
+        _worker_pool.add_workers(n_workers - _worker_pool.n_workers)
+    return _worker_pool
+
+
+def shutdown_worker_pool(logger=None):
+    """
+        Stop the workers of the shared pool, e.g., at the end of fit; the next get_worker_pool starts a new pool.
+    :param logger: if given, the utilization stats of the pool are logged.
+    :return: stats of the pool, or None if there is no pool.
+    """
+    global _worker_pool
+    if _worker_pool is None or _worker_pool.pid != os.getpid():
+        return None
+    stats = _worker_pool.get_stats()
+    if logger is not None:
+        logger.info('Worker pool: %d workers, %d tasks, utilization %.2f, %d restarts.' %
+                    (stats['n_workers'], stats['task_num'], stats['utilization'], stats['restart_num']))
+    _worker_pool.shutdown()
+    _worker_pool = None
+    return stats
+
+
+atexit.register(shutdown_worker_pool)
@@ -0,0 +1,105 @@
+import os
+import atexit
+import tempfile
+import numpy as np
+
+# Arrays smaller than this are cheaper to pickle than to map.
+MIN_SHARED_NBYTES = 1024 * 1024
+
+_shared_files = list()
+_attached_arrays = dict()
+# Arrays already copied into files: id -> (array, shared array). Nodes sharing an array share its file too.
+_shared_sources = dict()
+
+
+def get_shared_folder(nbytes=0):
+    # Prefer the in-memory file system, so that the mapped pages never hit the disk.
+    # It is often small in containers, and writing past its capacity through a mapping raises SIGBUS.
+    folder = '/dev/shm'
+    if os.path.isdir(folder) and os.access(folder, os.W_OK):
+        stat = os.statvfs(folder)
+        if stat.f_bavail * stat.f_frsize > 2 * nbytes:
+            return folder
+    return tempfile.gettempdir()
+
+
+def attach_shared_array(filename, dtype, shape, order):
+    """
+        Map the file of a shared array in the current process, at most once per file.
+    """
+    key = (filename, dtype, shape, order)
+    if key not in _attached_arrays:
+        # Copy-on-write: in-place modifications stay private to the process and never reach the file.
+        array = np.memmap(filename, dtype=np.dtype(dtype), mode='c', shape=shape, order=order).view(SharedArray)
+        array.handle = key
+        _attached_arrays[key] = array
+    return _attached_arrays[key]
+
+
+class SharedArray(np.ndarray):
+    """
+        Array backed by a memory-mapped file.
+
+        It is pickled as a handle (file name, dtype, shape, order) instead of its content, so sending it to
+        worker processes costs neither serialization nor an extra copy: all the processes map the same pages.
+        Views, slices and results of computations are ordinary copies when pickled.
+    """
+
+    def __array_finalize__(self, obj):
+        self.handle = None
+
+    def __reduce__(self):
+        if self.handle is not None:
+            return attach_shared_array, self.handle
+        return np.asarray(self).__reduce__()
+
+
+def to_shared_array(array, min_nbytes=MIN_SHARED_NBYTES):
+    """
+        Copy the array into a memory-mapped file.
+    :return: the shared array; the input itself if it cannot (object dtype, not an ndarray) or
+        need not (smaller than min_nbytes, already shared) be shared.
+    """
+    if not isinstance(array, np.ndarray) or array.dtype.hasobject or array.nbytes < min_nbytes:
+        return array
+    if isinstance(array, SharedArray) and array.handle is not None:
+        return array
+    if id(array) in _shared_sources:
+        return _shared_sources[id(array)][1]
+
+    order = 'F' if array.flags['F_CONTIGUOUS'] and not array.flags['C_CONTIGUOUS'] else 'C'
+    fd, filename = tempfile.mkstemp(prefix='solnml_', suffix='.mmap', dir=get_shared_folder(array.nbytes))
+    os.close(fd)
+    _shared_files.append((os.getpid(), filename))
+    mmap_array = np.memmap(filename, dtype=array.dtype, mode='w+', shape=array.shape, order=order)
+    mmap_array[...] = array
+    mmap_array.flush()
+    del mmap_array
+    shared_array = attach_shared_array(filename, array.dtype.str, array.shape, order)
+    # Keep a reference to the source, so that its id is not reused.
+    _shared_sources[id(array)] = (array, shared_array)
+    return shared_array
+
+
+def share_node(data_node, min_nbytes=MIN_SHARED_NBYTES):
+    """
+        Move the arrays of a data node into memory-mapped files in place.
+    """
+    if data_node is None or data_node.data is None:
+        return data_node
+    data_node.data = [to_shared_array(val, min_nbytes) if val is not None else None for val in data_node.data]
+    return data_node
+
+
+def _remove_shared_files():
+    for pid, filename in _shared_files:
+        # Only the creator removes the file; forked children inherit the list.
+        if pid != os.getpid():
+            continue
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+atexit.register(_remove_shared_files)
@@ -0,0 +1,102 @@
+"""
+    Thread budget of the search (AutoML's n_jobs), shared by the main process and the worker processes.
+
+    Each task of the sandboxed worker pool runs with a thread quota: the budget divided by the number of
+    active tasks, so a worker gets more threads when fewer workers are busy. The quota of a process bounds
+    the n_jobs of the estimators it builds, its BLAS/OpenMP thread pools (through threadpoolctl if installed)
+    and the processes it uses for the cross-validation folds.
+
+    In the user's process, the budget and the thread pool limits only hold inside limit_thread_budget,
+    which restores the previous ones on exit.
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_thread_budget = None
+_thread_quota = None
+
+
+def get_cpu_count():
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@contextmanager
+def limit_thread_budget(n_threads=None):
+    """
+        Set the number of threads the search may use in total inside the with block.
+        The previous budget, quota, thread pool limits and environment variables are restored on exit.
+    :param n_threads: None for all the available cores.
+    """
+    global _thread_budget, _thread_quota
+    saved_state = _thread_budget, _thread_quota
+    saved_environ = {name: os.environ.get(name) for name in _THREAD_ENV_VARS}
+    limiter = None
+    try:
+        _thread_budget = get_cpu_count() if n_threads is None else max(1, int(n_threads))
+        limiter = apply_thread_quota(_thread_budget)
+        yield _thread_budget
+    finally:
+        if limiter is not None:
+            limiter.restore_original_limits()
+        for name, value in saved_environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        _thread_budget, _thread_quota = saved_state
+
+
+def get_thread_budget():
+    """
+    :return: the thread budget, or None if it is not set.
+    """
+    return _thread_budget
+
+
+def get_worker_thread_quota(active_num):
+    """
+        In a worker process, its own quota is the budget of the workers it starts (e.g., a bandit arm).
+    :param active_num: number of the workers running tasks.
+    :return: thread quota of each worker, or None if no budget is set.
+    """
+    budget = _thread_budget if _thread_budget is not None else _thread_quota
+    if budget is None:
+        return None
+    return max(1, budget // max(1, active_num))
+
+
+def apply_thread_quota(n_threads):
+    """
+        Limit the threads used by the current process. The limits are kept until the process exits,
+        so outside the worker processes use limit_thread_budget instead.
+    :return: the threadpoolctl limiter, or None if the quota is unchanged or threadpoolctl is not installed.
+    """
+    global _thread_quota
+    n_threads = max(1, int(n_threads))
+    if n_threads == _thread_quota:
+        return None
+    _thread_quota = n_threads
+    if threadpool_limits is not None:
+        return threadpool_limits(limits=n_threads)
+    # Only effective for the thread pools created after this call, e.g., in the child processes.
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(n_threads)
+    return None
+
+
+def get_thread_quota(default=1):
+    """
+    :param default: returned if no quota is applied in the current process.
+    :return: number of threads the current process may use, e.g., the n_jobs of an estimator.
+    """
+    return default if _thread_quota is None else _thread_quota
@@ -1,12 +1,10 @@
 from sklearn.metrics.scorer import _BaseScorer
 import numpy as np
 import os
-import pickle as pkl
 
 from solnml.components.utils.constants import CLS_TASKS
-from solnml.components.fe_optimizers.parse import construct_node
+from solnml.components.ensemble.fitted_ensemble import FittedEnsemble
 from solnml.components.ensemble.base_ensemble import BaseEnsembleModel
-from functools import reduce
 
 
 class Bagging(BaseEnsembleModel):
@@ -24,36 +22,21 @@ class Bagging(BaseEnsembleModel):
                          output_dir=output_dir)
 
     def fit(self, datanode):
-        return self
-
-    def predict(self, data):
-        model_pred_list = []
-        final_pred = []
-        # Get predictions from each model
+        # Keep the FE pipelines and estimators of the chosen models in memory for prediction.
+        self.fitted_ensemble = FittedEnsemble(self.task_type)
         model_cnt = 0
         for algo_id in self.stats:
             model_to_eval = self.stats[algo_id]
             for idx, (_, _, path) in enumerate(model_to_eval):
-                with open(path, 'rb')as f:
-                    op_list, model = pkl.load(f)
-                _node = data.copy_()
-
-                _node = construct_node(_node, op_list)
-
                 if self.base_model_mask[model_cnt] == 1:
-                    if self.task_type in CLS_TASKS:
-                        model_pred_list.append(model.predict_proba(_node.data[0]))
-                    else:
-                        model_pred_list.append(model.predict(_node.data[0]))
+                    self.fitted_ensemble.add_member_from_path(path)
                 model_cnt += 1
+        return self
 
+    def predict(self, data):
         # Calculate the average of predictions
-        for i in range(len(data.data[0])):
-            sample_pred_list = [model_pred[i] for model_pred in model_pred_list]
-            pred_average = reduce(lambda x, y: x + y, sample_pred_list) / len(sample_pred_list)
-            final_pred.append(pred_average)
-
-        return np.array(final_pred)
+        model_pred_list = self.fitted_ensemble.predict_members(data)
+        return np.mean(model_pred_list, axis=0)
 
     def get_ens_model_info(self):
         model_cnt = 0
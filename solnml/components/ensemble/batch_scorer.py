@@ -0,0 +1,100 @@
+"""
+    Scores of all the candidate ensembles of one ensemble selection step at once.
+
+    In a step, candidate j is the average of the current members and model j: (ensemble_sum + predictions[j]) / (s + 1).
+    For the metrics below, the scores of all the candidates are computed with array operations on
+    the (n_models, n_samples, ...) predictions instead of one metric call per candidate.
+"""
+import numpy as np
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, log_loss, mean_squared_error
+
+from solnml.components.utils.constants import CLS_TASKS
+
+# Maximal number of prediction entries processed at once (about 128MB in float64).
+CHUNK_SIZE = 2 ** 24
+
+
+def _iter_chunks(predictions):
+    entries_per_model = max(1, predictions[0].size)
+    chunk_num = max(1, CHUNK_SIZE // entries_per_model)
+    for start in range(0, predictions.shape[0], chunk_num):
+        yield start, predictions[start: start + chunk_num]
+
+
+def _accuracy_func(labels):
+    def score_func(ensemble_sum, n_members, predictions):
+        scores = np.empty(predictions.shape[0])
+        for start, chunk in _iter_chunks(predictions):
+            # The argmax of the sum equals the argmax of the average.
+            y_pred = np.argmax(ensemble_sum + chunk, axis=-1)
+            scores[start: start + len(chunk)] = np.mean(y_pred == labels, axis=1)
+        return scores
+    return score_func
+
+
+def _balanced_accuracy_func(labels):
+    # Average recall over the classes in labels, as in sklearn.
+    _, label_idx = np.unique(labels, return_inverse=True)
+    label_onehot = np.zeros((len(labels), label_idx.max() + 1))
+    label_onehot[np.arange(len(labels)), label_idx] = 1.
+    class_counts = label_onehot.sum(axis=0)
+
+    def score_func(ensemble_sum, n_members, predictions):
+        scores = np.empty(predictions.shape[0])
+        for start, chunk in _iter_chunks(predictions):
+            is_correct = np.argmax(ensemble_sum + chunk, axis=-1) == labels
+            recalls = np.dot(is_correct, label_onehot) / class_counts
+            scores[start: start + len(chunk)] = np.mean(recalls, axis=1)
+        return scores
+    return score_func
+
+
+def _log_loss_func(labels, eps=1e-15):
+    sample_idx = np.arange(len(labels))
+
+    def score_func(ensemble_sum, n_members, predictions):
+        scores = np.empty(predictions.shape[0])
+        for start, chunk in _iter_chunks(predictions):
+            # Clip and normalize the probabilities as sklearn's log_loss does.
+            proba = np.clip((ensemble_sum + chunk) / (n_members + 1), eps, 1 - eps)
+            true_proba = proba[:, sample_idx, labels] / np.sum(proba, axis=-1)
+            scores[start: start + len(chunk)] = -np.mean(np.log(true_proba), axis=1)
+        return scores
+    return score_func
+
+
+def _mean_squared_error_func(labels):
+    def score_func(ensemble_sum, n_members, predictions):
+        scores = np.empty(predictions.shape[0])
+        for start, chunk in _iter_chunks(predictions):
+            errors = (ensemble_sum + chunk) / (n_members + 1) - labels
+            scores[start: start + len(chunk)] = np.mean(errors.reshape(len(chunk), -1) ** 2, axis=1)
+        return scores
+    return score_func
+
+
+def get_batch_score_func(metric, task_type, labels, n_classes=None):
+    """
+    :param metric: sklearn scorer of the ensemble selection.
+    :param labels: validation labels.
+    :param n_classes: number of columns of the predicted probabilities, for classification.
+    :return: function (ensemble_sum, n_members, predictions) -> the values of metric._score_func for all
+        the candidates (without the sign of the scorer), or None if the metric is not supported.
+    """
+    score_func = getattr(metric, '_score_func', None)
+    labels = np.asarray(labels)
+    if task_type in CLS_TASKS:
+        # The labels must be the column indices of the probabilities.
+        if labels.ndim != 1 or n_classes is None or not np.array_equal(labels, np.round(labels)) \
+                or labels.min() < 0 or labels.max() >= n_classes:
+            return None
+        labels = labels.astype(int)
+        if score_func is accuracy_score:
+            return _accuracy_func(labels)
+        elif score_func is balanced_accuracy_score:
+            return _balanced_accuracy_func(labels)
+        elif score_func is log_loss:
+            return _log_loss_func(labels)
+    elif score_func is mean_squared_error:
+        return _mean_squared_error_func(labels)
+    return None
@@ -6,9 +6,11 @@ import pickle as pkl
 import time
 
 from solnml.components.utils.constants import CLS_TASKS
+from solnml.components.utils.utils import get_float_dtype
 from solnml.components.ensemble.unnamed_ensemble import choose_base_models_classification, \
     choose_base_models_regression
 from solnml.components.fe_optimizers.parse import construct_node
+from solnml.components.evaluators.prediction_store import load_predictions
 from solnml.utils.logging_utils import get_logger
 
 
@@ -31,41 +33,44 @@ class BaseEnsembleModel(object):
 
         self.predictions = []
         self.train_labels = None
+        # The predictions are stored with the float dtype of the data (float32 in the float32 mode of AutoML).
+        self.dtype = get_float_dtype(data_node.data[0])
         self.timestamp = str(time.time())
         logger_name = 'EnsembleBuilder'
         self.logger = get_logger(logger_name)
 
+        # TODO: Test size
+        test_size = 0.33
+        if self.task_type in CLS_TASKS:
+            ss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=1)
+        else:
+            ss = ShuffleSplit(n_splits=1, test_size=test_size, random_state=1)
+        # The split only depends on the labels (and the number of samples), which the FE pipelines keep.
+        for _, val_index in ss.split(self.node.data[0], self.node.data[1]):
+            self.train_labels = self.node.data[1][val_index]
+
         for algo_id in self.stats.keys():
             model_to_eval = self.stats[algo_id]
             for idx, (_, _, path) in enumerate(model_to_eval):
-                with open(path, 'rb')as f:
-                    op_list, model = pkl.load(f)
-                _node = self.node.copy_()
-                _node = construct_node(_node, op_list)
-
-                # TODO: Test size
-                test_size = 0.33
-                X, y = _node.data
-
-                if self.task_type in CLS_TASKS:
-                    ss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=1)
-                else:
-                    ss = ShuffleSplit(n_splits=1, test_size=test_size, random_state=1)
-
-                for train_index, val_index in ss.split(X, y):
-                    X_valid = X[val_index]
-                    y_valid = y[val_index]
-
-                if self.train_labels is not None:
+                # Use the validation predictions stored by the evaluator if available.
+                y_valid_pred = load_predictions(path, self.train_labels)
+                if y_valid_pred is None:
+                    with open(path, 'rb')as f:
+                        op_list, model = pkl.load(f)
+                    _node = self.node.copy_()
+                    _node = construct_node(_node, op_list)
+
+                    X, y = _node.data
+                    for train_index, val_index in ss.split(X, y):
+                        X_valid = X[val_index]
+                        y_valid = y[val_index]
                     assert (self.train_labels == y_valid).all()
-                else:
-                    self.train_labels = y_valid
 
-                if self.task_type in CLS_TASKS:
-                    y_valid_pred = model.predict_proba(X_valid)
-                else:
-                    y_valid_pred = model.predict(X_valid)
-                self.predictions.append(y_valid_pred)
+                    if self.task_type in CLS_TASKS:
+                        y_valid_pred = model.predict_proba(X_valid)
+                    else:
+                        y_valid_pred = model.predict(X_valid)
+                self.predictions.append(np.asarray(y_valid_pred, dtype=self.dtype))
 
         if len(self.predictions) < self.ensemble_size:
             self.ensemble_size = len(self.predictions)
@@ -77,7 +82,8 @@ class BaseEnsembleModel(object):
             self.base_model_mask = choose_base_models_classification(np.array(self.predictions),
                                                                      self.ensemble_size)
         else:
-            self.base_model_mask = choose_base_models_regression(np.array(self.predictions), np.array(y_valid),
+            self.base_model_mask = choose_base_models_regression(np.array(self.predictions),
+                                                                 np.array(self.train_labels),
                                                                  self.ensemble_size)
         self.ensemble_size = sum(self.base_model_mask)
 
@@ -9,6 +9,8 @@ from solnml.components.ensemble.combined_ensemble.base_ensemble import BaseEnsem
 from solnml.components.utils.constants import CLS_TASKS
 from solnml.components.evaluators.base_evaluator import fetch_predict_estimator
 from solnml.components.fe_optimizers.parse import construct_node
+from solnml.components.ensemble.fitted_ensemble import FittedEnsemble
+from solnml.components.computation.thread_budget import get_thread_quota
 
 
 class Stacking(BaseEnsembleModel):
@@ -47,14 +49,16 @@ class Stacking(BaseEnsembleModel):
                                                                n_estimators=250)
             elif meta_learner == 'lightgbm':
                 from lightgbm import LGBMClassifier
-                self.meta_learner = LGBMClassifier(max_depth=4, learning_rate=0.05, n_estimators=150, n_jobs=1)
+                self.meta_learner = LGBMClassifier(max_depth=4, learning_rate=0.05, n_estimators=150,
+                                                  n_jobs=get_thread_quota())
         else:
             if meta_learner == 'linear':
                 from sklearn.linear_model import LinearRegression
                 self.meta_learner = LinearRegression()
             elif meta_learner == 'lightgbm':
                 from lightgbm import LGBMRegressor
-                self.meta_learner = LGBMRegressor(max_depth=4, learning_rate=0.05, n_estimators=70, n_jobs=1)
+                self.meta_learner = LGBMRegressor(max_depth=4, learning_rate=0.05, n_estimators=70,
+                                                 n_jobs=get_thread_quota())
 
     def fit(self, data):
         # Split training data for phase 1 and phase 2
@@ -64,6 +68,7 @@ class Stacking(BaseEnsembleModel):
             kf = KFold(n_splits=self.kfold)
 
         # Train basic models using a part of training data
+        self.fitted_ensemble = FittedEnsemble(self.task_type)
         model_cnt = 0
         suc_cnt = 0
         feature_p2 = None
@@ -78,6 +83,7 @@ class Stacking(BaseEnsembleModel):
 
                 X, y = _node.data
                 if self.base_model_mask[model_cnt] == 1:
+                    fold_estimators = list()
                     for j, (train, test) in enumerate(kf.split(X, y)):
                         x_p1, x_p2, y_p1, _ = X[train], X[test], y[train], y[test]
                         estimator = fetch_predict_estimator(self.task_type, algo_id, config, x_p1, y_p1,
@@ -89,6 +95,7 @@ class Stacking(BaseEnsembleModel):
                                 os.path.join(self.output_dir, '%s-model%d_part%d' % (self.timestamp, model_cnt, j)),
                                 'wb') as f:
                             pkl.dump(estimator, f)
+                        fold_estimators.append(estimator)
                         if self.task_type in CLS_TASKS:
                             pred = estimator.predict_proba(x_p2)
                             n_dim = np.array(pred).shape[1]
@@ -111,6 +118,7 @@ class Stacking(BaseEnsembleModel):
                                 num_samples = len(train) + len(test)
                                 feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
                             feature_p2[test, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = pred
+                    self.fitted_ensemble.add_member(op_list, fold_estimators)
                     suc_cnt += 1
                 model_cnt += 1
         # Train model for stacking using the other part of training data
@@ -118,54 +126,16 @@ class Stacking(BaseEnsembleModel):
         return self
 
     def get_feature(self, data):
-        # Predict the labels via stacking
-        feature_p2 = None
-        model_cnt = 0
-        suc_cnt = 0
-        for algo_id in self.stats.keys():
-            model_to_eval = self.stats[algo_id]
-            for idx, (config, _, path) in enumerate(model_to_eval):
-                with open(path, 'rb')as f:
-                    op_list, model = pkl.load(f)
-                _node = data.copy_()
-
-                _node = construct_node(_node, op_list)
-
-                if self.base_model_mask[model_cnt] == 1:
-                    for j in range(self.kfold):
-                        with open(
-                                os.path.join(self.output_dir, '%s-model%d_part%d' % (self.timestamp, model_cnt, j)),
-                                'rb') as f:
-                            estimator = pkl.load(f)
-                        if self.task_type in CLS_TASKS:
-                            pred = estimator.predict_proba(_node.data[0])
-                            n_dim = np.array(pred).shape[1]
-                            if n_dim == 2:
-                                n_dim = 1
-                            if feature_p2 is None:
-                                num_samples = len(_node.data[0])
-                                feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                            # Get average predictions
-                            if n_dim == 1:
-                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = \
-                                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] + pred[:,
-                                                                                           1:2] / self.kfold
-                            else:
-                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = \
-                                    feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] + pred / self.kfold
-                        else:
-                            pred = estimator.predict(_node.data[0]).reshape(-1, 1)
-                            n_dim = 1
-                            # Initialize training matrix for phase 2
-                            if feature_p2 is None:
-                                num_samples = len(_node.data[0])
-                                feature_p2 = np.zeros((num_samples, self.ensemble_size * n_dim))
-                            # Get average predictions
-                            feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] = \
-                                feature_p2[:, suc_cnt * n_dim:(suc_cnt + 1) * n_dim] + pred / self.kfold
-                    suc_cnt += 1
-                model_cnt += 1
-        return feature_p2
+        # Predict the labels via stacking, using the base models kept in memory
+        # (the predictions of the models fitted on the folds are averaged)
+        feature_p2 = list()
+        for pred in self.fitted_ensemble.predict_members(data):
+            if self.task_type in CLS_TASKS:
+                # Binary classification: keep the probabilities of the positive class
+                feature_p2.append(pred[:, 1:2] if pred.shape[1] == 2 else pred)
+            else:
+                feature_p2.append(pred.reshape(-1, 1))
+        return np.hstack(feature_p2)
 
     def predict(self, data):
         feature_p2 = self.get_feature(data)
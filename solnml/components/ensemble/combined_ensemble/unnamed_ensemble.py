@@ -9,7 +9,7 @@ from sklearn.metrics import accuracy_score
 
 def choose_base_models_regression(predictions, labels, num_model):
     base_mask = [0] * len(predictions)
-    dif = predictions - labels
+    dif = predictions - labels.astype(predictions.dtype)
     dif[dif > 0] = 1
     dif[dif < 0] = -1
     '''Calculate the distance between each model'''
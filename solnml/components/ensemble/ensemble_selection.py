@@ -1,12 +1,12 @@
 from collections import Counter
 import numpy as np
-import pickle as pkl
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.metrics.scorer import _BaseScorer, _PredictScorer, _ThresholdScorer
 
 from solnml.components.utils.constants import *
 from solnml.components.ensemble.base_ensemble import BaseEnsembleModel
-from solnml.components.fe_optimizers.parse import construct_node
+from solnml.components.ensemble.fitted_ensemble import FittedEnsemble
+from solnml.components.ensemble.batch_scorer import get_batch_score_func
 
 
 class EnsembleSelection(BaseEnsembleModel):
@@ -17,7 +17,8 @@ class EnsembleSelection(BaseEnsembleModel):
             metric: _BaseScorer,
             output_dir=None,
             sorted_initialization: bool = False,
-            mode: str = 'fast'
+            mode: str = 'fast',
+            early_stopping_rounds: int = None
     ):
         super().__init__(stats=stats,
                          data_node=data_node,
@@ -29,9 +30,13 @@ class EnsembleSelection(BaseEnsembleModel):
         self.model_idx = list()
         self.sorted_initialization = sorted_initialization
         self.mode = mode
+        # Stop adding members when the score has not improved for this many iterations (fast mode only).
+        self.early_stopping_rounds = early_stopping_rounds
         self.encoder = OneHotEncoder()
         self.shape = self.predictions[0].shape
         self.random_state = np.random.RandomState(1)
+        # FE pipelines and estimators of the models with non-zero weights, built by fit.
+        self.fitted_ensemble = None
 
     def calculate_score(self, pred, y_true):
         if isinstance(self.metric, _ThresholdScorer):
@@ -60,12 +65,14 @@ class EnsembleSelection(BaseEnsembleModel):
         self._calculate_weights()
         self.identifiers_ = None
 
+        self.fitted_ensemble = FittedEnsemble(self.task_type)
         model_cnt = 0
         for algo_id in self.stats.keys():
             model_to_eval = self.stats[algo_id]
-            for _, _ in enumerate(model_to_eval):
+            for _, _, path in model_to_eval:
                 if self.weights_[model_cnt] != 0:
                     self.model_idx.append(model_cnt)
+                    self.fitted_ensemble.add_member_from_path(path)
                 model_cnt += 1
 
         return self
@@ -78,7 +85,12 @@ class EnsembleSelection(BaseEnsembleModel):
         return self
 
     def _fast(self, predictions, labels):
-        """Fast version of Rich Caruana's ensemble selection method."""
+        """Fast version of Rich Caruana's ensemble selection method.
+
+        The candidates of each iteration are scored in one batched pass for the metrics supported by
+        get_batch_score_func; the running sum of the members' predictions replaces their average.
+        """
+        predictions = np.asarray(predictions)
         self.num_input_models_ = len(predictions)
 
         ensemble = []
@@ -86,48 +98,39 @@ class EnsembleSelection(BaseEnsembleModel):
         order = []
 
         ensemble_size = self.ensemble_size
+        ensemble_sum = np.zeros(predictions[0].shape, dtype=self.dtype)
 
         if self.sorted_initialization:
             n_best = 20
             indices = self._sorted_initialization(predictions, labels, n_best)
             for idx in indices:
                 ensemble.append(predictions[idx])
+                ensemble_sum += predictions[idx]
                 order.append(idx)
-                ensemble_ = np.array(ensemble).mean(axis=0)
+                ensemble_ = ensemble_sum / len(ensemble)
                 ensemble_performance = self.calculate_score(pred=ensemble_, y_true=labels)
                 trajectory.append(ensemble_performance)
             ensemble_size -= n_best
 
+        n_classes = predictions.shape[-1] if predictions.ndim == 3 else None
+        batch_score_func = get_batch_score_func(self.metric, self.task_type, labels, n_classes=n_classes)
+        best_score, n_rounds_without_improvement = np.inf, 0
+        # Number of the members in the best ensemble found with early stopping.
+        best_size = len(order)
         for i in range(ensemble_size):
-            scores = np.zeros((len(predictions)))
             s = len(ensemble)
-            if s == 0:
-                weighted_ensemble_prediction = np.zeros(predictions[0].shape)
+            if batch_score_func is not None:
+                scores = -batch_score_func(ensemble_sum, s, predictions) * self.metric._sign
             else:
-                # Memory-efficient averaging!
-                ensemble_prediction = np.zeros(ensemble[0].shape)
-                for pred in ensemble:
-                    ensemble_prediction += pred
-                ensemble_prediction /= s
-
-                weighted_ensemble_prediction = (s / float(s + 1)) * \
-                                               ensemble_prediction
-            fant_ensemble_prediction = np.zeros(weighted_ensemble_prediction.shape)
-            for j, pred in enumerate(predictions):
-                # TODO: this could potentially be vectorized! - let's profile
-                # the script first!
-                if self.task_type in CLS_TASKS:
-                    fant_ensemble_prediction[:, :] = weighted_ensemble_prediction + \
-                                                     (1. / float(s + 1)) * pred
-                else:
-                    fant_ensemble_prediction[:] = weighted_ensemble_prediction + \
-                                                  (1. / float(s + 1)) * pred
-
-                scores[j] = -self.calculate_score(pred=fant_ensemble_prediction, y_true=labels)
+                scores = np.zeros((len(predictions)))
+                for j, pred in enumerate(predictions):
+                    fant_ensemble_prediction = (ensemble_sum + pred) / (s + 1)
+                    scores[j] = -self.calculate_score(pred=fant_ensemble_prediction, y_true=labels)
 
             all_best = np.argwhere(scores == np.nanmin(scores)).flatten()
             best = self.random_state.choice(all_best)
             ensemble.append(predictions[best])
+            ensemble_sum += predictions[best]
             trajectory.append(scores[best])
             order.append(best)
 
@@ -135,6 +138,20 @@ class EnsembleSelection(BaseEnsembleModel):
             if len(predictions) == 1:
                 break
 
+            if self.early_stopping_rounds is not None:
+                if scores[best] < best_score:
+                    best_score, n_rounds_without_improvement = scores[best], 0
+                    best_size = len(order)
+                else:
+                    n_rounds_without_improvement += 1
+                    if n_rounds_without_improvement >= self.early_stopping_rounds:
+                        break
+
+        if self.early_stopping_rounds is not None and len(predictions) > 1:
+            # Drop the members added after the best iteration.
+            best_size = max(best_size, 1)
+            order, trajectory = order[:best_size], trajectory[:best_size]
+
         self.indices_ = order
         self.trajectory_ = trajectory
         self.train_score_ = trajectory[-1]
@@ -202,46 +219,9 @@ class EnsembleSelection(BaseEnsembleModel):
         return indices
 
     def predict(self, data):
-        predictions = []
-        cur_idx = 0
-        for algo_id in self.stats.keys():
-            model_to_eval = self.stats[algo_id]
-            for idx, (_, _, path) in enumerate(model_to_eval):
-                with open(path, 'rb')as f:
-                    op_list, estimator = pkl.load(f)
-                _node = data.copy_()
-
-                _node = construct_node(_node, op_list)
-
-                X_test = _node.data[0]
-                if cur_idx in self.model_idx:
-                    if self.task_type in CLS_TASKS:
-                        predictions.append(estimator.predict_proba(X_test))
-                    else:
-                        predictions.append(estimator.predict(X_test))
-                else:
-                    if len(self.shape) == 1:
-                        predictions.append(np.zeros(len(_node.data[0])))
-                    else:
-                        predictions.append(np.zeros((len(_node.data[0]), self.shape[1])))
-                cur_idx += 1
-        predictions = np.asarray(predictions)
-
-        # if predictions.shape[0] == len(self.weights_),
-        # predictions include those of zero-weight models.
-        if predictions.shape[0] == len(self.weights_):
-            return np.average(predictions, axis=0, weights=self.weights_)
-
-        # if prediction model.shape[0] == len(non_null_weights),
-        # predictions do not include those of zero-weight models.
-        elif predictions.shape[0] == np.count_nonzero(self.weights_):
-            non_null_weights = [w for w in self.weights_ if w > 0]
-            return np.average(predictions, axis=0, weights=non_null_weights)
-
-        # If none of the above applies, then something must have gone wrong.
-        else:
-            raise ValueError("The dimensions of ensemble predictions"
-                             " and ensemble weights do not match!")
+        # Only the models with non-zero weights are applied, in the order of model_idx.
+        predictions = np.asarray(self.fitted_ensemble.predict_members(data), dtype=self.dtype)
+        return np.average(predictions, axis=0, weights=self.weights_[self.model_idx])
 
     def __str__(self):
         return 'Ensemble Selection:\n\tTrajectory: %s\n\tMembers: %s' \
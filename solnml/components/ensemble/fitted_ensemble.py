@@ -0,0 +1,57 @@
+import pickle as pkl
+import numpy as np
+
+from solnml.components.utils.constants import CLS_TASKS
+from solnml.components.fe_optimizers.parse import compile_node
+
+
+class FittedEnsemble(object):
+    """
+        Self-contained form of a fitted ensemble for prediction: the FE pipelines and the estimators of
+        the members kept by the ensemble, held in memory. Members with the same fitted FE pipeline share it,
+        so each distinct pipeline runs once per prediction.
+    """
+
+    def __init__(self, task_type):
+        self.task_type = task_type
+        self.pipelines = list()
+        # Pickled op_list -> index of its pipeline in self.pipelines.
+        self._pipeline_index = dict()
+        # (pipeline index, estimators) of the members.
+        self.members = list()
+
+    def add_member(self, op_list, estimators):
+        """
+        :param op_list: fitted FE transformers of the member.
+        :param estimators: fitted estimators of the member, whose predictions are averaged
+            (e.g., the models fitted on the folds in stacking).
+        """
+        key = pkl.dumps(op_list)
+        if key not in self._pipeline_index:
+            self._pipeline_index[key] = len(self.pipelines)
+            self.pipelines.append(compile_node(op_list))
+        self.members.append((self._pipeline_index[key], list(estimators)))
+
+    def add_member_from_path(self, path):
+        """
+            Add the member saved by the evaluators: the pickled (op_list, estimator).
+        """
+        with open(path, 'rb') as f:
+            op_list, estimator = pkl.load(f)
+        self.add_member(op_list, [estimator])
+
+    def predict_members(self, data):
+        """
+        :param data: DataNode to predict.
+        :return: list of the predictions of the members (the probabilities for classification).
+        """
+        features = [pipeline.transform(data) for pipeline in self.pipelines]
+        predictions = list()
+        for pipeline_idx, estimators in self.members:
+            X = features[pipeline_idx]
+            if self.task_type in CLS_TASKS:
+                preds = [estimator.predict_proba(X) for estimator in estimators]
+            else:
+                preds = [estimator.predict(X) for estimator in estimators]
+            predictions.append(preds[0] if len(preds) == 1 else np.mean(preds, axis=0))
+        return predictions
@@ -1,9 +1,12 @@
 import os
 import pickle as pkl
 import hashlib
+import numpy as np
 from abc import ABCMeta
 from solnml.components.metrics.metric import get_metric
 from solnml.components.utils.constants import *
+from solnml.components.evaluators.transform_cache import get_fe_config_id, get_node_fingerprint
+from solnml.components.evaluators.topk_journal import TopKIndex, TopKJournal, get_journal_path
 
 
 def load_combined_transformer_estimator(model_dir, config, timestamp):
@@ -26,7 +29,8 @@ def fetch_predict_estimator(task_type, estimator_id, config, X_train, y_train, w
     # Build the ML estimator.
     from solnml.components.utils.balancing import get_weights, smote
     _fit_params = {}
-    config_dict = config.get_dictionary().copy()
+    # The top-k records store the configurations as dicts.
+    config_dict = dict(config) if isinstance(config, dict) else config.get_dictionary().copy()
     if weight_balance == 1:
         _init_params, _fit_params = get_weights(
             y_train, estimator_id, None, {}, {})
@@ -68,6 +72,97 @@ class _BaseEvaluator(metaclass=ABCMeta):
     def __call__(self, *args, **kwargs):
         raise NotImplementedError()
 
+    def race_to_stop(self, scores):
+        """
+            Fold-level racing in cross-validation (resampling strategy 'cv_racing').
+            The remaining folds are skipped if the one-sided upper confidence bound on the mean
+            fold score falls below the incumbent performance passed in by the optimizer.
+        :param scores: scores of the evaluated folds, the larger the better.
+        :return: True if the configuration cannot beat the incumbent.
+        """
+        if 'racing' not in self.resampling_strategy:
+            return False
+        incumbent_perf = getattr(self, 'incumbent_perf', None)
+        if incumbent_perf is None or not np.isfinite(incumbent_perf):
+            return False
+        n = len(scores)
+        if n < 2:
+            return False
+        if not np.all(np.isfinite(scores)):
+            return True
+
+        resampling_params = self.resampling_params or dict()
+        confidence = resampling_params.get('racing_confidence', 0.95)
+        from scipy.stats import t
+        std_err = np.std(scores, ddof=1) / np.sqrt(n)
+        upper_bound = np.mean(scores) + t.ppf(confidence, n - 1) * std_err
+        return upper_bound < incumbent_perf
+
+    def share_data(self):
+        """
+            Move the dataset arrays into memory-mapped files before the evaluator is sent to worker processes.
+            The evaluator is then pickled with file handles instead of copies of the data.
+        """
+        from solnml.components.computation.shared_array import share_node
+        data_node = getattr(self, 'data_node', None)
+        if data_node is None or not hasattr(data_node, 'data'):
+            return
+        split_plan = getattr(self, 'split_plan', None)
+        if split_plan is not None:
+            split_plan.share_data()
+        share_node(data_node)
+        # The train/val nodes are overwritten by each evaluation, so they can refer to the shared arrays
+        # (which are copy-on-write) instead of holding private copies.
+        for node_name in ['train_node', 'val_node']:
+            node = getattr(self, node_name, None)
+            if node is not None:
+                node.data = list(data_node.data)
+
+    def save_val_predictions(self, model_path, estimator, X_val, y_val, proba=True):
+        """
+            Store the validation predictions of a saved model, so that the ensemble builders can read them
+            instead of predicting again.
+        :param proba: whether to store the class probabilities (classification) or the predictions.
+        """
+        from solnml.components.evaluators.prediction_store import save_predictions
+        try:
+            predictions = estimator.predict_proba(X_val) if proba else estimator.predict(X_val)
+            save_predictions(model_path, predictions, y_val)
+        except Exception as e:
+            # The ensemble builders fall back to predicting with the saved model.
+            self.logger.warning('Failed to save validation predictions: %s' % str(e))
+
+    def transform_nodes(self, fe_config, split_id, train_node, val_node, resource_ratio=1.0, **kwargs):
+        """
+            Fit the FE pipeline on train_node and apply it to val_node.
+            The results are reused from the transform cache if the same pipeline has been
+            fitted on the same split of the same dataset before.
+        :param fe_config: FE configuration (or combined configuration).
+        :param split_id: fingerprint of the train/val split in the split plan.
+        :param resource_ratio: ratio of the training data used to fit the pipeline.
+        :param kwargs: additional parameters for parse_config.
+        :return: transformed train node, transformed val node, and the fitted op_list.
+        """
+        from solnml.components.fe_optimizers.parse import parse_config, construct_node
+
+        transform_cache = getattr(self, 'transform_cache', None)
+        if transform_cache is not None:
+            config_id = get_fe_config_id(fe_config, getattr(self, 'estimator_id', None))
+            split_plan = getattr(self, 'split_plan', None)
+            data_id = split_plan.get_fingerprint() if split_plan is not None else get_node_fingerprint(train_node)
+            cache_key = transform_cache.get_key(config_id, split_id, resource_ratio, data_id)
+            cached_item = transform_cache.get(cache_key)
+            if cached_item is not None:
+                return cached_item
+
+        data_node, op_list = parse_config(train_node, fe_config, record=True, **kwargs)
+        _val_node = val_node.copy_()
+        _val_node = construct_node(_val_node, op_list)
+
+        if transform_cache is not None:
+            transform_cache.put(cache_key, data_node, _val_node, op_list)
+        return data_node, _val_node, op_list
+
 
 class BaseTopKModelSaver(object):
     def __init__(self, k, model_dir, identifier):
@@ -75,24 +170,44 @@ class BaseTopKModelSaver(object):
         self.model_dir = model_dir
         self.identifier = identifier
         self.sorted_list_path = os.path.join(model_dir, '%s_topk_config.pkl' % identifier)
-        self.sorted_dict = None
+        # The top-k records are kept in memory and shared with the other evaluators through the journal.
+        self.index = TopKIndex()
+        self.journal = TopKJournal(get_journal_path(self.sorted_list_path))
 
     @staticmethod
     def get_topk_config(config_path):
+        """
+        :return: {estimator_id: [(config, perf, model_path), ...]} in descending order of perf,
+                 where config is the dict of the configuration (or a tuple of the hpo and fe dicts).
+        """
+        journal_path = get_journal_path(config_path)
+        if os.path.exists(journal_path):
+            index = TopKIndex()
+            for record in TopKJournal(journal_path).read():
+                index.apply(record)
+            return index.get_sorted_dict()
         if not os.path.exists(config_path):
             return dict()
         with open(config_path, 'rb') as f:
             content = pkl.load(f)
         return content
 
+    @property
+    def sorted_dict(self):
+        return self.index.get_sorted_dict()
+
     def save_topk_config(self):
-        # TODO：Multiple temp file in multiprocessing
-        # In case of timeout
-        path_list = os.path.split(self.sorted_list_path)
-        tmp_path = 'tmp_' + path_list[-1]
-        tmp_filepath = os.path.join(os.path.dirname(self.sorted_list_path), tmp_path)
-        with open(tmp_filepath, 'wb') as f:
-            pkl.dump(self.sorted_dict, f)
+        # The records are already in the journal; make sure they reach the disk.
+        self.journal.sync()
+
+    def _add(self, config, perf, estimator_id, model_path_id):
+        """
+            perf: the larger, the better.
+        :return: save_flag, model_path_id, delete_flag, model_path_removed
+        """
+        save_flag, delete_flag, model_path_removed = self.journal.append(
+            (self.k, estimator_id, config, perf, model_path_id), self.index)
+        return save_flag, model_path_id, delete_flag, model_path_removed
 
 
 class CombinedTopKModelSaver(BaseTopKModelSaver):
@@ -120,52 +235,8 @@ class CombinedTopKModelSaver(BaseTopKModelSaver):
         :param perf:
         :return:
         """
-
         model_path_id = self.get_path_by_config(config, self.identifier)
-        model_path_removed = None
-        save_flag, delete_flag = False, False
-        self.sorted_dict = self.get_topk_config(self.sorted_list_path)
-        sorted_list = self.sorted_dict.get(estimator_id, list())
-
-        # Update existed configs
-        for sorted_element in sorted_list:
-            if config == sorted_element[0]:
-                if perf > sorted_element[1]:
-                    sorted_list.remove(sorted_element)
-                    for idx, item in enumerate(sorted_list):
-                        if perf > item[1]:
-                            sorted_list.insert(idx, (config, perf, model_path_id))
-                            break
-                        if idx == len(sorted_list) - 1:
-                            sorted_list.append((config, perf, model_path_id))
-                            break
-                    self.sorted_dict[estimator_id] = sorted_list
-                    return True, model_path_id, False, model_path_removed
-                else:
-                    return False, model_path_id, False, model_path_removed
-
-        if len(sorted_list) == 0:
-            sorted_list.append((config, perf, model_path_id))
-        else:
-            # Sorted list is in a descending order.
-            for idx, item in enumerate(sorted_list):
-                if perf > item[1]:
-                    sorted_list.insert(idx, (config, perf, model_path_id))
-                    break
-                if idx == len(sorted_list) - 1:
-                    sorted_list.append((config, perf, model_path_id))
-                    break
-
-        if len(sorted_list) > self.k:
-            model_path_removed = sorted_list[-1][2]
-            delete_flag = True
-            sorted_list = sorted_list[:-1]
-        if model_path_id in [item[2] for item in sorted_list]:
-            save_flag = True
-
-        self.sorted_dict[estimator_id] = sorted_list
-
-        return save_flag, model_path_id, delete_flag, model_path_removed
+        return self._add(config.get_dictionary(), perf, estimator_id, model_path_id)
 
 
 class BanditTopKModelSaver(BaseTopKModelSaver):
@@ -198,50 +269,6 @@ class BanditTopKModelSaver(BaseTopKModelSaver):
         :param perf:
         :return:
         """
-
         model_path_id = self.get_path_by_config(estimator_id, hpo_config, fe_config, self.identifier)
-        model_path_removed = None
-        save_flag, delete_flag = False, False
-        self.sorted_dict = self.get_topk_config(self.sorted_list_path)
-        sorted_list = self.sorted_dict.get(estimator_id, list())
-
-        config = (hpo_config, fe_config)
-        # Update existed configs
-        for sorted_element in sorted_list:
-            if config == sorted_element[0]:
-                if perf > sorted_element[1]:
-                    sorted_list.remove(sorted_element)
-                    for idx, item in enumerate(sorted_list):
-                        if perf > item[1]:
-                            sorted_list.insert(idx, (config, perf, model_path_id))
-                            break
-                        if idx == len(sorted_list) - 1:
-                            sorted_list.append((config, perf, model_path_id))
-                            break
-                    self.sorted_dict[estimator_id] = sorted_list
-                    return True, model_path_id, False, model_path_removed
-                else:
-                    return False, model_path_id, False, model_path_removed
-
-        if len(sorted_list) == 0:
-            sorted_list.append((config, perf, model_path_id))
-        else:
-            # Sorted list is in a descending order.
-            for idx, item in enumerate(sorted_list):
-                if perf > item[1]:
-                    sorted_list.insert(idx, (config, perf, model_path_id))
-                    break
-                if idx == len(sorted_list) - 1:
-                    sorted_list.append((config, perf, model_path_id))
-                    break
-
-        if len(sorted_list) > self.k:
-            model_path_removed = sorted_list[-1][2]
-            delete_flag = True
-            sorted_list = sorted_list[:-1]
-        if model_path_id in [item[2] for item in sorted_list]:
-            save_flag = True
-
-        self.sorted_dict[estimator_id] = sorted_list
-
-        return save_flag, model_path_id, delete_flag, model_path_removed
+        config = (hpo_config.get_dictionary(), fe_config.get_dictionary())
+        return self._add(config, perf, estimator_id, model_path_id)
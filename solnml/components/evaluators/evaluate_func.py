@@ -1,8 +1,10 @@
 import warnings
+from functools import partial
 import numpy as np
 from sklearn.model_selection import StratifiedKFold, KFold, StratifiedShuffleSplit, ShuffleSplit
 
 from solnml.components.utils.balancing import smote
+from solnml.components.computation.parallel_fold import ParallelFoldExecutor
 
 
 def get_onehot_y(encoder, y):
@@ -10,8 +12,24 @@ def get_onehot_y(encoder, y):
     return encoder.transform(y_).toarray()
 
 
+def _fit_and_score_fold(estimator, scorer, X, y, fold_index, fit_params=None, onehot=None):
+    train_idx, valid_idx = fold_index
+    train_x, valid_x = X[train_idx], X[valid_idx]
+    train_y, valid_y = y[train_idx], y[valid_idx]
+    _fit_params = dict()
+    if fit_params:
+        if 'sample_weight' in fit_params:
+            _fit_params['sample_weight'] = fit_params['sample_weight'][train_idx]
+        elif 'data_balance' in fit_params:
+            train_x, train_y = smote(train_x, train_y)
+    estimator.fit(train_x, train_y, **_fit_params)
+    if onehot is not None:
+        valid_y = get_onehot_y(onehot, valid_y)
+    return scorer(estimator, valid_x, valid_y)
+
+
 def cross_validation(estimator, scorer, X, y, n_fold=5, shuffle=True, fit_params=None, if_stratify=True,
-                     onehot=None, random_state=1):
+                     onehot=None, random_state=1, n_jobs=1):
     with warnings.catch_warnings():
         # ignore all caught warnings
         warnings.filterwarnings("ignore")
@@ -19,20 +37,9 @@ def cross_validation(estimator, scorer, X, y, n_fold=5, shuffle=True, fit_params
             kfold = StratifiedKFold(n_splits=n_fold, random_state=random_state, shuffle=shuffle)
         else:
             kfold = KFold(n_splits=n_fold, random_state=random_state, shuffle=shuffle)
-        scores = list()
-        for train_idx, valid_idx in kfold.split(X, y):
-            train_x, valid_x = X[train_idx], X[valid_idx]
-            train_y, valid_y = y[train_idx], y[valid_idx]
-            _fit_params = dict()
-            if fit_params:
-                if 'sample_weight' in fit_params:
-                    _fit_params['sample_weight'] = fit_params['sample_weight'][train_idx]
-                elif 'data_balance' in fit_params:
-                    X_train, y_train = smote(X_train, y_train)
-            estimator.fit(train_x, train_y, **_fit_params)
-            if onehot is not None:
-                valid_y = get_onehot_y(onehot, valid_y)
-            scores.append(scorer(estimator, valid_x, valid_y))
+
+        fold_func = partial(_fit_and_score_fold, estimator, scorer, X, y, fit_params=fit_params, onehot=onehot)
+        scores, _ = ParallelFoldExecutor(n_jobs=n_jobs).execute(fold_func, list(kfold.split(X, y)))
         return np.mean(scores)
 
 
@@ -0,0 +1,52 @@
+"""
+    Validation predictions of the saved top-k models, written by the evaluators when a model is saved
+    and read by the ensemble builders instead of re-transforming the data and predicting again.
+
+    The predictions of each model are stored next to its pickle ('<model>.pkl' -> '<model>_val_pred.npy')
+    as a float32 array, together with the validation labels they refer to ('<model>_val_labels.npy').
+    They are memory-mapped when loaded.
+"""
+import os
+import numpy as np
+
+
+def get_prediction_paths(model_path):
+    prefix = os.path.splitext(model_path)[0]
+    return prefix + '_val_pred.npy', prefix + '_val_labels.npy'
+
+
+def _save_array(path, array):
+    # Write to a temporary file and rename it, so that readers never see a partial file.
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def save_predictions(model_path, predictions, labels):
+    pred_path, label_path = get_prediction_paths(model_path)
+    _save_array(label_path, np.asarray(labels))
+    _save_array(pred_path, np.asarray(predictions, dtype=np.float32))
+
+
+def load_predictions(model_path, labels=None):
+    """
+    :param labels: the expected validation labels; the stored predictions are ignored if they
+        were made on a different validation set.
+    :return: the memory-mapped predictions, or None if they are not available.
+    """
+    pred_path, label_path = get_prediction_paths(model_path)
+    if not os.path.exists(pred_path) or not os.path.exists(label_path):
+        return None
+    try:
+        if labels is not None and not np.array_equal(np.load(label_path), labels):
+            return None
+        return np.load(pred_path, mmap_mode='r')
+    except (IOError, ValueError):
+        return None
+
+
+def remove_predictions(model_path):
+    for path in get_prediction_paths(model_path):
+        if os.path.exists(path):
+            os.remove(path)
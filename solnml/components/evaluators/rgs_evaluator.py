@@ -8,10 +8,15 @@ from multiprocessing import Lock
 
 from solnml.utils.logging_utils import get_logger
 from solnml.components.evaluators.base_evaluator import _BaseEvaluator
+from solnml.components.evaluators.transform_cache import TransformCache
+from solnml.components.evaluators.split_plan import SplitPlan
+from solnml.components.evaluators.prediction_store import remove_predictions
+from solnml.components.computation.parallel_fold import ParallelFoldExecutor
+from solnml.components.computation.thread_budget import get_thread_quota
 from solnml.components.evaluators.evaluate_func import validation
-from solnml.components.fe_optimizers.parse import parse_config, construct_node
 from solnml.components.evaluators.base_evaluator import BanditTopKModelSaver
 from solnml.components.utils.class_loader import get_combined_candidtates
+from solnml.components.utils.constants import REGRESSION
 
 
 def get_estimator(config, estimator_id):
@@ -22,19 +27,19 @@ def get_estimator(config, estimator_id):
     config_['random_state'] = 1
     estimator = _candidates[regressor_type](**config_)
     if hasattr(estimator, 'n_jobs'):
-        setattr(estimator, 'n_jobs', 1)
+        # Use the thread quota of the current worker.
+        setattr(estimator, 'n_jobs', get_thread_quota())
     return regressor_type, estimator
 
 
 class RegressionEvaluator(_BaseEvaluator):
     def __init__(self, reg_config, fe_config, estimator_id, scorer=None, data_node=None, name=None,
                  resampling_strategy='cv', resampling_params=None, seed=1,
-                 timestamp=None, output_dir=None):
+                 timestamp=None, output_dir=None, transform_cache=None, split_plan=None, n_jobs=1):
         self.resampling_strategy = resampling_strategy
         self.resampling_params = resampling_params
         self.hpo_config = reg_config
 
-        # TODO: Optimize: Fit the same transformers only once
         self.fe_config = fe_config
         self.estimator_id = estimator_id
         self.scorer = scorer
@@ -47,13 +52,41 @@ class RegressionEvaluator(_BaseEvaluator):
         self.output_dir = output_dir
         self.timestamp = timestamp
 
+        # The data of train/val nodes is replaced by each evaluation, so they share the original arrays.
         self.train_node = data_node.copy_()
         self.val_node = data_node.copy_()
+        # Fitted FE pipelines and transformed splits shared across evaluations.
+        self.transform_cache = transform_cache if transform_cache is not None else TransformCache()
+        # Resampling splits shared across evaluations.
+        self.split_plan = split_plan if split_plan is not None else SplitPlan(data_node, task_type=REGRESSION)
+        # Folds in cross-validation are evaluated in n_jobs processes.
+        self.fold_executor = ParallelFoldExecutor(n_jobs=n_jobs)
 
         self.continue_training = False
 
         self.topk_model_saver = BanditTopKModelSaver(k=60, model_dir=self.output_dir, identifier=timestamp)
 
+    def _evaluate_fold(self, split_id, hpo_config, fe_config):
+        """
+            Fit the pipeline on the training part of one fold and score it on the validation part.
+        """
+        train_data, val_data = self.split_plan.get_data(split_id)
+        self.train_node.data = list(train_data)
+        self.val_node.data = list(val_data)
+
+        data_node, _val_node, op_list = self.transform_nodes(fe_config, split_id,
+                                                             self.train_node, self.val_node)
+
+        _X_train, _y_train = data_node.data
+        _X_val, _y_val = _val_node.data
+
+        config_dict = hpo_config.get_dictionary().copy()
+
+        _, clf = get_estimator(config_dict, self.estimator_id)
+
+        return validation(clf, self.scorer, _X_train, _y_train, _X_val, _y_val,
+                          random_state=self.seed)
+
     def __call__(self, config, **kwargs):
         start_time = time.time()
         return_dict = dict()
@@ -77,22 +110,13 @@ class RegressionEvaluator(_BaseEvaluator):
             try:
                 with warnings.catch_warnings():
                     warnings.filterwarnings("ignore")
-                    if self.resampling_params is None or 'test_size' not in self.resampling_params:
-                        test_size = 0.33
-                    else:
-                        test_size = self.resampling_params['test_size']
-
-                    from sklearn.model_selection import ShuffleSplit
-                    ss = ShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
-                    for train_index, test_index in ss.split(self.data_node.data[0]):
-                        _X_train, _X_val = self.data_node.data[0][train_index], self.data_node.data[0][test_index]
-                        _y_train, _y_val = self.data_node.data[1][train_index], self.data_node.data[1][test_index]
-                    self.train_node.data = [_X_train, _y_train]
-                    self.val_node.data = [_X_val, _y_val]
+                    split_id = self.split_plan.get_split_ids(self.resampling_strategy, self.resampling_params)[0]
+                    train_data, val_data = self.split_plan.get_data(split_id)
+                    self.train_node.data = list(train_data)
+                    self.val_node.data = list(val_data)
 
-                    data_node, op_list = parse_config(self.train_node, fe_config, record=True)
-                    _val_node = self.val_node.copy_()
-                    _val_node = construct_node(_val_node, op_list)
+                    data_node, _val_node, op_list = self.transform_nodes(fe_config, split_id,
+                                                                         self.train_node, self.val_node)
 
                 _X_train, _y_train = data_node.data
                 _X_val, _y_val = _val_node.data
@@ -116,12 +140,14 @@ class RegressionEvaluator(_BaseEvaluator):
                         with open(model_path, 'wb') as f:
                             pkl.dump([op_list, clf], f)
                         self.logger.info("Model saved to %s" % model_path)
+                        self.save_val_predictions(model_path, clf, _X_val, _y_val, proba=False)
 
                     self.topk_model_saver.save_topk_config()
 
                     try:
                         if delete_flag and os.path.exists(model_path_deleted):
                             os.remove(model_path_deleted)
+                            remove_predictions(model_path_deleted)
                             self.logger.info("Model deleted from %s" % model_path_deleted)
                     except:
                         pass
@@ -141,36 +167,15 @@ class RegressionEvaluator(_BaseEvaluator):
                 with warnings.catch_warnings():
                     warnings.filterwarnings("ignore")
 
-                    if 'cv' in self.resampling_strategy:
-                        if self.resampling_params is None or 'folds' not in self.resampling_params:
-                            folds = 5
-                        else:
-                            folds = self.resampling_params['folds']
-
-                    from sklearn.model_selection import KFold
-                    skfold = KFold(n_splits=folds, random_state=self.seed, shuffle=False)
-                    scores = list()
-
-                    for train_index, test_index in skfold.split(self.data_node.data[0]):
-                        _X_train, _X_val = self.data_node.data[0][train_index], self.data_node.data[0][test_index]
-                        _y_train, _y_val = self.data_node.data[1][train_index], self.data_node.data[1][test_index]
-                        self.train_node.data = [_X_train, _y_train]
-                        self.val_node.data = [_X_val, _y_val]
-
-                        data_node, op_list = parse_config(self.train_node, fe_config, record=True)
-                        _val_node = self.val_node.copy_()
-                        _val_node = construct_node(_val_node, op_list)
-
-                        _X_train, _y_train = data_node.data
-                        _X_val, _y_val = _val_node.data
-
-                        config_dict = hpo_config.get_dictionary().copy()
-
-                        regressor_id, clf = get_estimator(config_dict, self.estimator_id)
-
-                        _score = validation(clf, self.scorer, _X_train, _y_train, _X_val, _y_val,
-                                            random_state=self.seed)
-                        scores.append(_score)
+                    split_ids = self.split_plan.get_split_ids(self.resampling_strategy, self.resampling_params)
+                    scores, time_costs = self.fold_executor.execute(
+                        self._evaluate_fold, split_ids, stop_func=self.race_to_stop,
+                        fold_kwargs={'hpo_config': hpo_config, 'fe_config': fe_config})
+                    self.logger.debug('Fold time costs: %s' % str(time_costs))
+                    # An evaluation pruned by racing is reported as a censored observation: the mean of its
+                    # evaluated folds, which already falls short of the incumbent. It is kept out of the top-k models.
+                    pruned = len(scores) < len(split_ids)
+                    regressor_id = self.estimator_id
                     score = np.mean(scores)
 
                 # TODO: Don't save models for cv
@@ -178,7 +183,9 @@ class RegressionEvaluator(_BaseEvaluator):
                     self.logger.info('rw_lock not defined! Possible read-write conflicts may happen!')
                 lock = kwargs.get('rw_lock', Lock())
                 lock.acquire()
-                if np.isfinite(score):
+                if pruned:
+                    self.logger.info('Racing: pruned after %d folds, partial score %.4f.' % (len(scores), score))
+                elif np.isfinite(score):
                     _ = self.topk_model_saver.add(hpo_config, fe_config, score, regressor_id)
                     self.topk_model_saver.save_topk_config()
                 lock.release()
@@ -195,33 +202,25 @@ class RegressionEvaluator(_BaseEvaluator):
                 with warnings.catch_warnings():
                     warnings.filterwarnings("ignore")
 
-                    if self.resampling_params is None or 'test_size' not in self.resampling_params:
-                        test_size = 0.33
-                    else:
-                        test_size = self.resampling_params['test_size']
-
-                    from sklearn.model_selection import ShuffleSplit
-                    ss = ShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
-                    for train_index, test_index in ss.split(self.data_node.data[0]):
-                        _X_train, _X_val = self.data_node.data[0][train_index], self.data_node.data[0][test_index]
-                        _y_train, _y_val = self.data_node.data[1][train_index], self.data_node.data[1][test_index]
-                    self.train_node.data = [_X_train, _y_train]
-                    self.val_node.data = [_X_val, _y_val]
+                    split_id = self.split_plan.get_split_ids(self.resampling_strategy, self.resampling_params)[0]
+                    train_data, val_data = self.split_plan.get_data(split_id)
+                    self.train_node.data = list(train_data)
+                    self.val_node.data = list(val_data)
 
-                    data_node, op_list = parse_config(self.train_node, fe_config, record=True)
-                    _val_node = self.val_node.copy_()
-                    _val_node = construct_node(_val_node, op_list)
+                    data_node, _val_node, op_list = self.transform_nodes(fe_config, split_id,
+                                                                         self.train_node, self.val_node)
 
                 _X_train, _y_train = data_node.data
 
                 if downsample_ratio != 1:
+                    from sklearn.model_selection import ShuffleSplit
                     down_ss = ShuffleSplit(n_splits=1, test_size=downsample_ratio,
                                            random_state=self.seed)
                     for _, _val_index in down_ss.split(_X_train):
                         _act_x_train, _act_y_train = _X_train[_val_index], _y_train[_val_index]
                 else:
                     _act_x_train, _act_y_train = _X_train, _y_train
-                    _val_index = list(range(len(_X_train)))
+                    _val_index = list(range(_X_train.shape[0]))
 
                 _X_val, _y_val = _val_node.data
 
@@ -245,12 +244,14 @@ class RegressionEvaluator(_BaseEvaluator):
                         with open(model_path, 'wb') as f:
                             pkl.dump([op_list, clf], f)
                         self.logger.info("Model saved to %s" % model_path)
+                        self.save_val_predictions(model_path, clf, _X_val, _y_val, proba=False)
 
                     self.topk_model_saver.save_topk_config()
 
                     try:
                         if delete_flag and os.path.exists(model_path_deleted):
                             os.remove(model_path_deleted)
+                            remove_predictions(model_path_deleted)
                             self.logger.info("Model deleted from %s" % model_path_deleted)
                     except:
                         pass
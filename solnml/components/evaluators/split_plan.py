@@ -0,0 +1,128 @@
+from solnml.components.utils.constants import CLS_TASKS
+
+
+class SplitPlan(object):
+    """
+        Resampling splits of one dataset, shared by the evaluators of all the bandits.
+
+        The splits are deterministic (seed=1 in all the evaluators), so the train/val indices and
+        the materialized train/val arrays are computed once per (strategy, parameter) and reused.
+        The cached arrays are shared by the callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, data_node, task_type=None, seed=1):
+        self.data_node = data_node
+        self.task_type = task_type if task_type is not None else data_node.task_type
+        self.stratify = self.task_type in CLS_TASKS
+        self.seed = seed
+        self._splits = dict()
+        # Whether the materialized splits are kept in memory-mapped files.
+        self.shared = False
+        self.fingerprint = None
+
+    @staticmethod
+    def get_test_size(resampling_params):
+        if resampling_params is None or 'test_size' not in resampling_params:
+            return 0.33
+        return resampling_params['test_size']
+
+    @staticmethod
+    def get_folds(resampling_params):
+        if resampling_params is None or 'folds' not in resampling_params:
+            return 5
+        return resampling_params['folds']
+
+    def get_fingerprint(self):
+        """
+            Fingerprint of the dataset, which tells apart the splits of different datasets in the transform caches.
+        """
+        if self.fingerprint is None:
+            from solnml.components.evaluators.transform_cache import get_node_fingerprint
+            self.fingerprint = get_node_fingerprint(self.data_node)
+        return self.fingerprint
+
+    def _materialize(self, split_id, train_index, test_index):
+        X, y = self.data_node.data
+        # Fancy indexing returns contiguous copies, which are gathered only once here.
+        self._splits[split_id] = (train_index, test_index,
+                                  [X[train_index], y[train_index]],
+                                  [X[test_index], y[test_index]])
+        if self.shared:
+            self._share_split(split_id)
+
+    def _share_split(self, split_id):
+        from solnml.components.computation.shared_array import to_shared_array
+        train_index, test_index, train_data, val_data = self._splits[split_id]
+        self._splits[split_id] = (train_index, test_index,
+                                  [to_shared_array(val) for val in train_data],
+                                  [to_shared_array(val) for val in val_data])
+
+    def share_data(self):
+        """
+            Keep the dataset and the splits in memory-mapped files, so that the plan is pickled
+            to worker processes as lightweight handles.
+        """
+        from solnml.components.computation.shared_array import share_node
+        if self.shared:
+            return
+        share_node(self.data_node)
+        self.shared = True
+        for split_id in self._splits:
+            self._share_split(split_id)
+
+    def _build_holdout(self, test_size):
+        if self.stratify:
+            from sklearn.model_selection import StratifiedShuffleSplit
+            ss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
+        else:
+            from sklearn.model_selection import ShuffleSplit
+            ss = ShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
+        for train_index, test_index in ss.split(self.data_node.data[0], self.data_node.data[1]):
+            self._materialize('holdout-%s' % test_size, train_index, test_index)
+
+    def _build_cv(self, folds):
+        if self.stratify:
+            from sklearn.model_selection import StratifiedKFold
+            kfold = StratifiedKFold(n_splits=folds, random_state=self.seed, shuffle=False)
+        else:
+            from sklearn.model_selection import KFold
+            kfold = KFold(n_splits=folds, random_state=self.seed, shuffle=False)
+        _splits = kfold.split(self.data_node.data[0], self.data_node.data[1])
+        for fold_idx, (train_index, test_index) in enumerate(_splits):
+            self._materialize('cv-%d-%d' % (folds, fold_idx), train_index, test_index)
+
+    def get_split_ids(self, resampling_strategy, resampling_params=None):
+        """
+            Split ids used by the resampling strategy, in evaluation order.
+        """
+        if 'holdout' in resampling_strategy or 'partial' in resampling_strategy:
+            test_size = self.get_test_size(resampling_params)
+            split_ids = ['holdout-%s' % test_size]
+            if split_ids[0] not in self._splits:
+                self._build_holdout(test_size)
+        elif 'cv' in resampling_strategy:
+            folds = self.get_folds(resampling_params)
+            split_ids = ['cv-%d-%d' % (folds, fold_idx) for fold_idx in range(folds)]
+            if split_ids[0] not in self._splits:
+                self._build_cv(folds)
+        else:
+            raise ValueError('Invalid resampling strategy: %s!' % resampling_strategy)
+        return split_ids
+
+    def get_indices(self, split_id):
+        train_index, test_index, _, _ = self._splits[split_id]
+        return train_index, test_index
+
+    def get_data(self, split_id):
+        """
+        :return: [X_train, y_train], [X_val, y_val]
+        """
+        _, _, train_data, val_data = self._splits[split_id]
+        return train_data, val_data
+
+    def get_splits(self, resampling_strategy, resampling_params=None):
+        """
+        :return: list of (split_id, [X_train, y_train], [X_val, y_val]).
+        """
+        return [(split_id,) + tuple(self.get_data(split_id))
+                for split_id in self.get_split_ids(resampling_strategy, resampling_params)]
@@ -0,0 +1,242 @@
+import os
+import heapq
+import struct
+import pickle as pkl
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_HEADER = struct.Struct('<I')
+# Each journal file starts with a random id, which changes when the journal is compacted.
+_GENERATION_SIZE = 16
+
+
+def get_journal_path(config_path):
+    return os.path.splitext(config_path)[0] + '.journal'
+
+
+class TopKIndex(object):
+    """
+        Top-k (config, perf, model_path) records of each estimator, kept in min-heaps (perf: the larger, the better).
+
+        A record replaced by a better evaluation of the same configuration stays in the heap
+        and is skipped when popped (lazy deletion), so both updates and inserts take O(log k).
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.heaps = dict()
+        # Estimator id -> {model path: entry}, entry = [perf, -seq, model_path, config, valid].
+        self.entries = dict()
+        self.topk = dict()
+        self.seq = 0
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.entries.values())
+
+    def apply(self, record):
+        """
+            Add one evaluation record: (k, estimator_id, config, perf, model_path).
+        :return: save_flag, delete_flag, model_path_removed.
+        """
+        k, estimator_id, config, perf, model_path = record
+        self.topk[estimator_id] = k
+        heap = self.heaps.setdefault(estimator_id, list())
+        entries = self.entries.setdefault(estimator_id, dict())
+        self.seq += 1
+        entry = [perf, -self.seq, model_path, config, True]
+
+        # Update existed configs.
+        if model_path in entries:
+            if perf <= entries[model_path][0]:
+                return False, False, None
+            entries[model_path][4] = False
+            entries[model_path] = entry
+            heapq.heappush(heap, (perf, -self.seq, entry))
+            return True, False, None
+
+        entries[model_path] = entry
+        heapq.heappush(heap, (perf, -self.seq, entry))
+        model_path_removed = None
+        if len(entries) > k:
+            # Among the equal perfs, the latest record is removed first.
+            _, _, removed_entry = heapq.heappop(heap)
+            while not removed_entry[4]:
+                _, _, removed_entry = heapq.heappop(heap)
+            model_path_removed = entries.pop(removed_entry[2])[2]
+        if len(heap) > 2 * len(entries) + k:
+            self.heaps[estimator_id] = [item for item in heap if item[2][4]]
+            heapq.heapify(self.heaps[estimator_id])
+        return model_path in entries, model_path_removed is not None, model_path_removed
+
+    def get_records(self):
+        """
+        :return: the records that rebuild the current top-k entries, in the order they were added.
+        """
+        records = list()
+        for estimator_id, entries in self.entries.items():
+            k = self.topk[estimator_id]
+            for entry in entries.values():
+                records.append((-entry[1], (k, estimator_id, entry[3], entry[0], entry[2])))
+        return [record for _, record in sorted(records, key=lambda t: t[0])]
+
+    def get_sorted_dict(self):
+        """
+        :return: {estimator_id: [(config, perf, model_path), ...]} in descending order of perf.
+        """
+        sorted_dict = dict()
+        for estimator_id, entries in self.entries.items():
+            sorted_entries = sorted(entries.values(), key=lambda entry: (-entry[0], -entry[1]))
+            sorted_dict[estimator_id] = [(entry[3], entry[0], entry[2]) for entry in sorted_entries]
+        return sorted_dict
+
+
+class TopKJournal(object):
+    """
+        Append-only journal of the evaluation records, shared by the evaluators of all processes.
+
+        Each writer keeps its own TopKIndex and replays the records appended by the others
+        before appending its own, under an exclusive file lock. So all writers see the same
+        ordered history and make the same top-k decisions. A record is a length-prefixed pickle;
+        a partial record left by a crash is ignored by the readers and cut off by the next writer.
+        The journal is fsynced every sync_interval records and on sync().
+
+        Once the journal holds more than compact_size records and twice as many as the top-k entries,
+        the writer replaces it with the records of its current top-k entries. The other writers find
+        a new file and rebuild their indexes from it. Without file locks (fcntl), the journal is not compacted.
+    """
+
+    def __init__(self, path, sync_interval=16, compact_size=1024):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.compact_size = compact_size
+        self.offset = 0
+        self.unsynced_cnt = 0
+        # Id of the journal file read so far, and the number of records in it.
+        self.generation = None
+        self.record_cnt = 0
+
+    def _check_generation(self, f):
+        """
+        :return: True if the journal is not the one read so far, in which case it is read from the first record.
+        """
+        f.seek(0)
+        generation = f.read(_GENERATION_SIZE)
+        if generation == self.generation:
+            return False
+        self.generation, self.offset, self.record_cnt = generation, _GENERATION_SIZE, 0
+        return True
+
+    def _read_records(self, f):
+        f.seek(self.offset)
+        records = list()
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            size, = _HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size:
+                break
+            records.append(pkl.loads(payload))
+            self.offset += _HEADER.size + size
+        self.record_cnt += len(records)
+        return records
+
+    def _lock(self):
+        """
+        :return: the journal file, opened and locked.
+        """
+        while True:
+            f = open(self.path, 'a+b')
+            if fcntl is None:
+                return f
+            fcntl.flock(f, fcntl.LOCK_EX)
+            # The journal may have been compacted while waiting for the lock.
+            try:
+                if os.stat(self.path).st_ino == os.fstat(f.fileno()).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def _compact(self, index):
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        generation = os.urandom(_GENERATION_SIZE)
+        size = _GENERATION_SIZE
+        with open(tmp_path, 'wb') as f:
+            f.write(generation)
+            records = index.get_records()
+            for record in records:
+                payload = pkl.dumps(record)
+                f.write(_HEADER.pack(len(payload)) + payload)
+                size += _HEADER.size + len(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # The index is rebuilt from the compacted records, as the other writers do.
+        index.clear()
+        for record in records:
+            index.apply(record)
+        self.generation, self.offset, self.record_cnt = generation, size, len(records)
+        self.unsynced_cnt = 0
+
+    def read(self):
+        """
+        :return: the records appended since the last read; a new journal object reads all the records.
+        """
+        if not os.path.exists(self.path):
+            return list()
+        with open(self.path, 'rb') as f:
+            self._check_generation(f)
+            return self._read_records(f)
+
+    def append(self, record, index):
+        """
+            Apply the records of the other writers and then the new record to the index, and append the new record.
+        :param index: TopKIndex of this writer.
+        :return: result of index.apply on the new record.
+        """
+        f = self._lock()
+        with f:
+            try:
+                if os.fstat(f.fileno()).st_size < _GENERATION_SIZE:
+                    f.truncate(0)
+                    f.write(os.urandom(_GENERATION_SIZE))
+                    f.flush()
+                if self._check_generation(f):
+                    # A new (or compacted) journal: rebuild the index from its first record.
+                    index.clear()
+                for _record in self._read_records(f):
+                    index.apply(_record)
+                # Cut off a partial record left by a crashed writer.
+                if os.fstat(f.fileno()).st_size > self.offset:
+                    f.truncate(self.offset)
+                result = index.apply(record)
+
+                payload = pkl.dumps(record)
+                f.write(_HEADER.pack(len(payload)) + payload)
+                f.flush()
+                self.offset += _HEADER.size + len(payload)
+                self.record_cnt += 1
+                self.unsynced_cnt += 1
+                if fcntl is not None and self.record_cnt > max(self.compact_size, 2 * len(index)):
+                    self._compact(index)
+                elif self.unsynced_cnt >= self.sync_interval:
+                    os.fsync(f.fileno())
+                    self.unsynced_cnt = 0
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+    def sync(self):
+        if self.unsynced_cnt > 0 and os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                os.fsync(f.fileno())
+            self.unsynced_cnt = 0
@@ -0,0 +1,131 @@
+import hashlib
+import pickle as pkl
+import numpy as np
+import scipy.sparse as sp
+from collections import OrderedDict
+
+from solnml.utils.logging_utils import get_logger
+
+
+def get_fe_config_id(config, estimator_id=None):
+    """
+        Fingerprint of the feature engineering part in a configuration.
+    :param config: FE configuration or combined (HPO + FE) configuration.
+    :param estimator_id: hyperparameters prefixed by "estimator_id:" are not part of the FE pipeline.
+    :return: sha1 digest.
+    """
+    data_dict = config.get_dictionary()
+    data_list = []
+    for key, value in sorted(data_dict.items(), key=lambda t: t[0]):
+        if key == 'hpo':
+            continue
+        if estimator_id is not None and key.startswith('%s:' % estimator_id):
+            continue
+        if isinstance(value, float):
+            value = round(value, 5)
+        data_list.append('%s-%s' % (key, str(value)))
+    data_id = '_'.join(data_list)
+    return hashlib.sha1(data_id.encode('utf8')).hexdigest()
+
+
+def get_node_fingerprint(node):
+    """
+        Fingerprint of the data in a node: the arrays, the feature types and the task type.
+    :return: sha1 digest.
+    """
+    sha = hashlib.sha1()
+    sha.update(str((node.feature_types, node.task_type)).encode('utf8'))
+    for item in node.data[:2]:
+        if item is None:
+            sha.update(b'none')
+            continue
+        if sp.issparse(item):
+            item = item.tocsr()
+            sha.update(str(('csr', item.shape, item.dtype.str)).encode('utf8'))
+            arrays = [item.data, item.indices, item.indptr]
+        else:
+            item = np.asarray(item)
+            sha.update(str((item.shape, item.dtype.str)).encode('utf8'))
+            arrays = [item]
+        for array in arrays:
+            if array.dtype.hasobject:
+                sha.update(pkl.dumps(array.tolist()))
+            else:
+                sha.update(np.ascontiguousarray(array).view(np.uint8).reshape(-1))
+    return sha.hexdigest()
+
+
+def get_node_nbytes(node):
+    nbytes = 0
+    for item in node.data[:2]:
+        if sp.issparse(item):
+            item = item.tocsr()
+            nbytes += item.data.nbytes + item.indices.nbytes + item.indptr.nbytes
+        elif item is not None and hasattr(item, 'nbytes'):
+            nbytes += item.nbytes
+    return nbytes
+
+
+class TransformCache(object):
+    """
+        LRU cache for fitted FE pipelines and the transformed train/val nodes.
+
+        The cached entries are keyed by (fe_config fingerprint, split fingerprint, resource ratio, data fingerprint),
+        and the total size of the cached arrays is bounded by memory_limit (in MB).
+        The cached nodes are shared by the callers, so they must be treated as read-only.
+        The entries are not pickled: a worker process that receives the cache starts with an empty one of its own.
+    """
+
+    def __init__(self, memory_limit=1024):
+        self.memory_limit = memory_limit * 1024 * 1024
+        self.memory_usage = 0
+        self.hit_cnt = 0
+        self.miss_cnt = 0
+        self._cache = OrderedDict()
+        self.logger = get_logger(self.__module__ + "." + self.__class__.__name__)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        state['memory_usage'] = 0
+        state['hit_cnt'], state['miss_cnt'] = 0, 0
+        return state
+
+    @staticmethod
+    def get_key(config_id, split_id, resource_ratio=1.0, data_id=None):
+        return config_id, split_id, round(float(resource_ratio), 5), data_id
+
+    def get(self, key):
+        if key not in self._cache:
+            self.miss_cnt += 1
+            return None
+        self.hit_cnt += 1
+        self._cache.move_to_end(key)
+        return self._cache[key][0]
+
+    def put(self, key, train_node, val_node, op_list):
+        size = get_node_nbytes(train_node) + get_node_nbytes(val_node)
+        if size > self.memory_limit:
+            self.logger.debug('Transformed data (%d bytes) exceeds the cache budget!' % size)
+            return
+
+        if key in self._cache:
+            self.memory_usage -= self._cache.pop(key)[1]
+
+        # Evict the least recently used entries.
+        while self.memory_usage + size > self.memory_limit:
+            _, (_, _size) = self._cache.popitem(last=False)
+            self.memory_usage -= _size
+
+        self._cache[key] = ((train_node, val_node, op_list), size)
+        self.memory_usage += size
+
+    def clear(self):
+        self._cache.clear()
+        self.memory_usage = 0
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def __len__(self):
+        return len(self._cache)
@@ -2,6 +2,7 @@ from solnml.components.feature_engineering.transformations import _bal_balancer,
     _image_preprocessor, _text_preprocessor, _bal_addons, _imb_balancer, _gen_addons, _res_addons, _sel_addons
 from solnml.components.utils.class_loader import get_combined_fe_candidtates
 from solnml.components.feature_engineering.transformation_graph import DataNode
+from solnml.components.feature_engineering.compiled_pipeline import CompiledPipeline
 from solnml.components.fe_optimizers.task_space import stage_list, thirdparty_candidates_dict
 
 
@@ -86,15 +87,30 @@ def parse_config(data_node: DataNode, config, record=False, skip_balance=False,
     return _node
 
 
-def construct_node(data_node: DataNode, tran_dict, mode='test'):
+def _get_transformers(tran_dict, mode='test'):
+    transformers = list()
     if 'image_preprocessor' in tran_dict:
-        data_node = tran_dict['image_preprocessor'].operate(data_node)
+        transformers.append(tran_dict['image_preprocessor'])
 
     if 'text_preprocessor' in tran_dict:
-        data_node = tran_dict['text_preprocessor'].operate(data_node)
+        transformers.append(tran_dict['text_preprocessor'])
 
     for stage in stage_list:
         if stage_list == 'balancer' and mode == 'test':
             continue
-        data_node = tran_dict[stage].operate(data_node)
+        transformers.append(tran_dict[stage])
+    return transformers
+
+
+def construct_node(data_node: DataNode, tran_dict, mode='test'):
+    for tran in _get_transformers(tran_dict, mode):
+        data_node = tran.operate(data_node)
     return data_node
+
+
+def compile_node(tran_dict, mode='test'):
+    """
+        Compile the fitted transformers for repeated predictions; the result equals construct_node's.
+    :return: CompiledPipeline, whose transform(data_node) returns the transformed feature matrix.
+    """
+    return CompiledPipeline(_get_transformers(tran_dict, mode))
@@ -0,0 +1,143 @@
+import threading
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from solnml.components.utils.utils import collect_fields, get_float_dtype, match_float_dtype
+from solnml.components.feature_engineering.transformation_graph import DataNode
+from solnml.components.feature_engineering.transformations.base_transformer import get_kernel_input, \
+    compound_arrays
+
+
+class _ArrayNode(object):
+    """
+        Minimal input of a transformer kernel: the kernels of ease_trans only read the data.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, X):
+        self.data = (X, None)
+
+
+class _ArrayKernel(object):
+    """
+        Array-to-array form of a transformer decorated by ease_trans, with the column maps of its compound mode.
+    """
+
+    def __init__(self, transformer, target_fields, n_features):
+        self.transformer = transformer
+        self.func = type(transformer).operate.__wrapped__
+        self.target_fields = target_fields
+        self.mode = transformer.compound_mode
+        # Columns kept by the 'replace' mode, in their original order.
+        self.keep_fields = np.setdiff1d(np.arange(n_features), target_fields)
+        # Thread id -> reused output buffer, so that threads can apply the pipeline concurrently.
+        self.buffers = dict()
+
+    def get_buffer(self):
+        return self.buffers.get(threading.get_ident())
+
+    def _get_buffer(self, shape, dtype, reuse):
+        if not reuse:
+            return np.empty(shape, dtype=dtype)
+        buffer = self.get_buffer()
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[threading.get_ident()] = buffer
+        return buffer
+
+    def __call__(self, X, reuse=False):
+        X_in, target_fields = get_kernel_input(self.transformer, X, self.target_fields)
+        _X = self.func(self.transformer, _ArrayNode(X_in), target_fields)
+        _X = match_float_dtype(_X, X)
+        if sp.issparse(X) or sp.issparse(_X):
+            # Sparse results are assembled by scipy; the buffers only hold dense data.
+            return compound_arrays(self.mode, X, _X, self.target_fields)
+        if self.mode == 'only_new':
+            return _X
+        if self.mode == 'in_place':
+            output = self._get_buffer(X.shape, get_float_dtype(X), reuse)
+            output[...] = X
+            output[:, self.target_fields] = _X
+            return output
+
+        if _X.shape[1] == 0:
+            return X if self.mode == 'concatenate' else X[:, self.keep_fields]
+        n_left = X.shape[1] if self.mode == 'concatenate' else len(self.keep_fields)
+        output = self._get_buffer((X.shape[0], n_left + _X.shape[1]), np.result_type(X, _X), reuse)
+        if self.mode == 'concatenate':
+            output[:, :n_left] = X
+        else:
+            np.take(X, self.keep_fields, axis=1, out=output[:, :n_left])
+        output[:, n_left:] = _X
+        return output
+
+
+class _NodeKernel(object):
+    """
+        Transformers that build their output nodes themselves are called on a node with the recorded feature types.
+    """
+
+    def __init__(self, transformer, feature_types, task_type):
+        self.transformer = transformer
+        self.feature_types = feature_types
+        self.task_type = task_type
+
+    def __call__(self, X, reuse=False):
+        return self.transformer.operate(DataNode([X, None], self.feature_types, self.task_type)).data[0]
+
+
+class CompiledPipeline(object):
+    """
+        Compiled form of a fitted op_list for inference: a flat sequence of array-to-array kernels.
+
+        The first call traces the transformers with DataNodes (as construct_node does) and records the feature
+        types and column maps of each stage. The next calls with the same input schema skip the DataNode
+        bookkeeping, drop the stages that leave the data unchanged, and reuse the intermediate buffers
+        when the batch size does not change. The returned array is never a reused buffer.
+    """
+
+    def __init__(self, transformers):
+        self.transformers = transformers
+        # The first transform traces the pipeline: run it once before applying the pipeline in several threads.
+        self.input_types = None
+        self.kernels = None
+
+    def _trace(self, data_node):
+        kernels = list()
+        node = data_node.copy_()
+        for transformer in self.transformers:
+            X = node.data[0]
+            if hasattr(type(transformer).operate, '__wrapped__'):
+                # The fields are collected as in ease_trans.
+                target_fields = collect_fields(node.feature_types, transformer.input_type)
+                if len(target_fields) > 0:
+                    kernels.append(_ArrayKernel(transformer, target_fields, len(node.feature_types)))
+            output_node = transformer.operate(node)
+            _X = output_node.data[0]
+            if not hasattr(type(transformer).operate, '__wrapped__'):
+                unchanged = _X is X or (isinstance(_X, np.ndarray) and isinstance(X, np.ndarray) and
+                                        _X.shape == X.shape and np.shares_memory(_X, X))
+                if not unchanged:
+                    kernels.append(_NodeKernel(transformer, node.feature_types.copy(), node.task_type))
+            node = output_node
+        self.input_types = list(data_node.feature_types)
+        self.kernels = kernels
+        return node.data[0]
+
+    def transform(self, data_node: DataNode):
+        """
+        :return: the transformed feature matrix.
+        """
+        if self.kernels is None or list(data_node.feature_types) != self.input_types:
+            return self._trace(data_node)
+
+        X = data_node.data[0]
+        if isinstance(X, pd.DataFrame):
+            X = X.values
+        for idx, kernel in enumerate(self.kernels):
+            X = kernel(X, reuse=idx < len(self.kernels) - 1)
+        # The last kernel may return a view of a reused buffer (e.g., an 'only_new' selection of the columns).
+        if any(isinstance(kernel, _ArrayKernel) and kernel.get_buffer() is not None and
+               np.may_share_memory(X, kernel.get_buffer()) for kernel in self.kernels):
+            X = X.copy()
+        return X
@@ -2,7 +2,6 @@ import os
 import abc
 from solnml.components.utils.constants import CLS_TASKS, CLASSIFICATION, CATEGORICAL, ORDINAL
 from solnml.components.feature_engineering.transformation_graph import DataNode
-from solnml.components.feature_engineering.transformations.preprocessor.imputer import ImputationTransformation
 from solnml.components.feature_engineering.transformations.preprocessor.onehot_encoder import \
     OneHotTransformation
 from solnml.components.feature_engineering.transformations.selector.variance_selector import VarianceSelector
@@ -52,6 +51,7 @@ class FEPipeline(object, metaclass=abc.ABCMeta):
 
         # For data preprocessing.
         self.uninformative_columns, self.uninformative_idx = list(), list()
+        self.impute_values = None
         self.variance_selector = None
         self.onehot_encoder = None
         self.label_encoder = None
@@ -80,20 +80,32 @@ class FEPipeline(object, metaclass=abc.ABCMeta):
         input_node.data[0] = raw_dataframe
         return input_node
 
-    def impute_cols(self, input_node: DataNode):
+    def impute_cols(self, input_node: DataNode, train_phase=True):
+        """
+            Fill the missing values of all the columns in one pass: the most frequent value for the categorical
+            and ordinal columns, and the median for the others. The values are computed in the training phase
+            and reused for the test data.
+        """
         raw_dataframe = input_node.data[0]
         feat_types = input_node.feature_types
-        need_imputation = raw_dataframe.isnull().values.any()
-        if need_imputation:
-            for idx, column in enumerate(list(raw_dataframe)):
-                if raw_dataframe[column].isnull().values.any():
-                    feature_type = feat_types[idx]
-                    if feature_type in [CATEGORICAL, ORDINAL]:
-                        imputer = ImputationTransformation('most_frequent')
-                        input_node = imputer.operate(input_node, [idx])
-                    else:
-                        imputer = ImputationTransformation('median')
-                        input_node = imputer.operate(input_node, [idx])
+        if train_phase or self.impute_values is None:
+            columns = list(raw_dataframe)
+            cat_columns = [column for idx, column in enumerate(columns) if feat_types[idx] in [CATEGORICAL, ORDINAL]]
+            num_columns = [column for idx, column in enumerate(columns)
+                           if feat_types[idx] not in [CATEGORICAL, ORDINAL]]
+            # The columns without any value have no median or mode, and are left as they are.
+            impute_values = dict()
+            if len(num_columns) > 0:
+                impute_values.update(raw_dataframe[num_columns].median(numeric_only=True).dropna().to_dict())
+            if len(cat_columns) > 0:
+                # Ties are broken by the smallest value, as SimpleImputer does.
+                modes = raw_dataframe[cat_columns].mode(dropna=True)
+                if not modes.empty:
+                    impute_values.update(modes.iloc[0].dropna().to_dict())
+            self.impute_values = impute_values
+
+        if raw_dataframe.isnull().values.any():
+            input_node.data[0] = raw_dataframe.fillna(value=self.impute_values)
         return input_node
 
     def one_hot(self, input_node: DataNode):
@@ -130,7 +142,7 @@ class FEPipeline(object, metaclass=abc.ABCMeta):
         # print(input_node.shape)
         try:
             input_node = self.remove_uninf_cols(input_node, train_phase)
-            input_node = self.impute_cols(input_node)
+            input_node = self.impute_cols(input_node, train_phase)
             input_node = self.one_hot(input_node)
         except AttributeError as e:
             print('data[0] in input_node should be a DataFrame!')
@@ -1,5 +1,29 @@
 import numpy as np
+import scipy.sparse as sp
 from solnml.components.utils.constants import CATEGORICAL
+from solnml.components.computation.shared_array import SharedArray
+
+
+def _readonly_view(val):
+    # scipy.sparse matrices cannot be made read-only: they are shared as they are, and never modified in place.
+    if not isinstance(val, np.ndarray) or not val.flags.writeable:
+        return val
+    if isinstance(val, SharedArray) and val.handle is not None:
+        # The mapping is private to the process already; a view would lose the handle and be pickled by content.
+        return val
+    view = val.view()
+    view.setflags(write=False)
+    return view
+
+
+def _copy_array(val):
+    return None if val is None else val.copy()
+
+
+def _as_float(val):
+    if np.issubdtype(val.dtype, np.floating):
+        return val
+    return val.astype(np.float64)
 
 
 class DataNode(object):
@@ -21,25 +45,38 @@ class DataNode(object):
         if isinstance(node, DataNode):
             if self.shape != node.shape:
                 return False
-            X1 = self.data[0].astype("float64")
-            X2 = node.data[0].astype("float64")
-            X_flag = np.isclose(X1, X2).all()
+            X1, X2 = self.data[0], node.data[0]
+            if sp.issparse(X1) or sp.issparse(X2):
+                # Compare the non-zero entries only, without densifying the matrices.
+                diff = sp.csr_matrix(X1) - sp.csr_matrix(X2)
+                X_flag = np.isclose(diff.data, 0.).all()
+            else:
+                # Only the non-float data (e.g., of object dtype) is converted; float32 data is not upcast.
+                X_flag = np.isclose(_as_float(X1), _as_float(X2)).all()
             y_flag = np.isclose(self.data[1], node.data[1]).all()
             if X_flag and y_flag:
                 return True
         return False
 
     def __add__(self, other):
-        X1, y1 = self.copy_().data
-        X2, y2 = other.copy_().data
+        # vstack allocates new arrays, so the inputs need not be copied.
+        X1, y1 = self.data
+        X2, y2 = other.data
         feat_types = self.feature_types.copy()
-        X = np.vstack((X1, X2))
+        X = sp.vstack((X1, X2), format='csr') if sp.issparse(X1) or sp.issparse(X2) else np.vstack((X1, X2))
         y = np.vstack((y1, y2))
         return DataNode(data=[X, y], feature_type=feat_types)
 
-    def copy_(self):
-        new_data = list([self.data[0].copy()])
-        new_data.append(None if self.data[1] is None else self.data[1].copy())
+    def copy_(self, deep=False):
+        """
+            Copy the node with copy-on-write semantics: the new node refers to read-only views of the data arrays,
+            so the copy itself allocates no data. Transformers produce new arrays and never modify their input;
+            a component that modifies the data in place must copy the arrays first (copy_(deep=True)),
+            otherwise numpy raises an error on the read-only arrays instead of changing the other nodes.
+        :param deep: copy the data arrays, e.g., to keep a private copy of the user's data.
+        """
+        copy_func = _copy_array if deep else _readonly_view
+        new_data = [copy_func(val) for val in self.data[:2]]
         new_node = DataNode(new_data, self.feature_types.copy(), self.task_type,
                             self.feature_names.copy() if self.feature_names else None)
         new_node.trans_hist = self.trans_hist.copy()
@@ -49,18 +86,30 @@ class DataNode(object):
         new_node.config = self.config
         return new_node
 
+    def astype_(self, dtype):
+        """
+            Copy the node with the feature matrix cast to a float dtype, e.g., float32 to halve the memory.
+            The data that is not numerical (e.g., a DataFrame) is kept as it is.
+        :return: the new node; the data is not copied if it has the dtype already (see copy_).
+        """
+        new_node = self.copy_()
+        X = self.data[0]
+        is_numerical = sp.issparse(X) or (isinstance(X, np.ndarray) and
+                                          (np.issubdtype(X.dtype, np.number) or X.dtype == np.bool_))
+        if is_numerical and X.dtype != dtype:
+            new_node.data[0] = X.astype(dtype)
+        return new_node
+
     def set_values(self, node):
         """ Assign node's content to current node.
 
         Assign the variables "data, feature_types, and task_type" of node to the current node.
         This function does NOT assign the node id.
 
-        :param node: the data node is copied.
+        :param node: the data node is copied (copy-on-write, see copy_).
         :return: None.
         """
-        self.data = []
-        for val in node.data[:2]:
-            self.data.append(val.copy() if val is not None else None)
+        self.data = [_readonly_view(val) for val in node.data[:2]]
         self.feature_types = node.feature_types.copy()
         self.task_type = node.task_type
 
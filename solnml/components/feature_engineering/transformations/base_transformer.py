@@ -1,6 +1,8 @@
 import abc
 import typing
+import functools
 import pandas as pd
+import scipy.sparse as sp
 
 from solnml.components.utils.utils import *
 from solnml.components.utils.constants import *
@@ -51,6 +53,8 @@ class Transformer(object, metaclass=abc.ABCMeta):
         44: robust_scaler
     """
     type = -1
+    # Whether operate handles scipy.sparse data; otherwise ease_trans passes it the target columns densified.
+    accept_sparse = False
 
     def __init__(self, name, random_state=1):
         self.name = name
@@ -125,7 +129,46 @@ class Transformer(object, metaclass=abc.ABCMeta):
                 'output': (INPUT,)}
 
 
+def get_kernel_input(trans, X, target_fields):
+    """
+        Input of the undecorated operate of a transformer (see ease_trans).
+    :return: (X, target_fields); a sparse X is reduced to the dense target columns for
+        the transformers that do not accept sparse data.
+    """
+    if sp.issparse(X) and not trans.accept_sparse:
+        return X[:, target_fields].toarray(), list(range(len(target_fields)))
+    return X, target_fields
+
+
+def compound_arrays(mode, X, _X, target_fields):
+    """
+        Combine the input X and the new columns _X according to the compound mode;
+        the result is sparse if X or _X is sparse.
+    """
+    _X = match_float_dtype(_X, X)
+    if mode == 'only_new':
+        return _X
+    elif mode == 'concatenate':
+        # Nothing to concatenate (e.g., the empty transformer): keep the input array instead of copying it.
+        return hstack_columns((X, _X)) if _X.shape[1] > 0 else X
+    elif mode == 'replace':
+        return delete_columns(hstack_columns((X, _X)), target_fields)
+    else:
+        assert _X.shape[1] == len(target_fields)
+        if sp.issparse(X):
+            # Append the new columns and move them to the positions of the target fields.
+            column_order = np.arange(X.shape[1])
+            column_order[target_fields] = X.shape[1] + np.arange(len(target_fields))
+            return hstack_columns((X.astype(get_float_dtype(X)), _X))[:, column_order]
+        # The only mode that writes into the data: materialize one private (float) copy.
+        new_X = X.astype(get_float_dtype(X))
+        new_X[:, target_fields] = densify(_X)
+        return new_X
+
+
 def ease_trans(func):
+    # The undecorated kernel stays accessible as operate.__wrapped__ (used by the compiled pipelines).
+    @functools.wraps(func)
     def dec(*args, **kwargs):
         param_name = 'target_fields'
         target_fields = None
@@ -149,31 +192,26 @@ def ease_trans(func):
         if isinstance(X, pd.DataFrame):
             X = X.values
 
-        args = (trans, input, target_fields)
-        _X = func(*args)
+        X_in, _target_fields = get_kernel_input(trans, X, target_fields)
+        _input = input if X_in is X else \
+            DataNode((X_in, y), [input.feature_types[idx] for idx in target_fields], input.task_type)
+        _X = func(trans, _input, _target_fields)
         if isinstance(trans.output_type, list):
             trans.output_type = trans.output_type[0]
         _types = [trans.output_type] * _X.shape[1]
 
+        new_X = compound_arrays(trans.compound_mode, X, _X, target_fields)
         if trans.compound_mode == 'only_new':
-            new_X = _X
             new_types = _types
         elif trans.compound_mode == 'concatenate':
-            new_X = np.hstack((X, _X))
             new_types = input.feature_types.copy()
             new_types.extend(_types)
         elif trans.compound_mode == 'replace':
-            new_X = np.hstack((X, _X))
             new_types = input.feature_types.copy()
             new_types.extend(_types)
-            new_X = np.delete(new_X, target_fields, axis=1)
             temp_array = np.array(new_types)
             new_types = list(np.delete(temp_array, target_fields))
         else:
-            assert _X.shape[1] == len(target_fields)
-            new_X = X.copy()
-            new_X = new_X.astype(float)
-            new_X[:, target_fields] = _X
             new_types = input.feature_types.copy()
 
         output_datanode = DataNode((new_X, y), new_types, input.task_type)
@@ -4,12 +4,14 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 class DiscreteCategorizer(Transformer):
     type = 25
 
-    def __init__(self, max_unique=10):
+    def __init__(self, max_unique=10, sparse_threshold=0.3):
         super().__init__("discrete_categorizer")
         self.input_type = [DISCRETE]
         self.output_type = CATEGORICAL
         self.max_unique = max_unique
         self.target_fields = None
+        # The output is a CSR matrix if its density is below the threshold (as in sklearn's ColumnTransformer).
+        self.sparse_threshold = sparse_threshold
 
     def operate(self, input_datanode, target_fields=None):
         import numpy as np
@@ -22,7 +24,8 @@ class DiscreteCategorizer(Transformer):
 
         X, y = input_datanode.data
         if self.target_fields is None:
-            target_fields = [idx for idx in target_fields if len(set(X[:, idx])) <= self.max_unique]
+            target_fields = [idx for idx in target_fields
+                             if len(np.unique(densify(X[:, [idx]]))) <= self.max_unique]
             # Fetch the fields to transform.
             self.target_fields = target_fields
 
@@ -31,15 +34,14 @@ class DiscreteCategorizer(Transformer):
 
         X_input = X[:, self.target_fields]
         if self.model is None:
-            self.model = OneHotEncoder(handle_unknown='ignore')  # Ignore values out of range
+            self.model = OneHotEncoder(handle_unknown='ignore', dtype=get_float_dtype(X))  # Ignore values out of range
             self.model.fit(X_input)
 
-        new_X = self.model.transform(X_input).toarray()
-        X_output = X.copy()
+        new_X = self.model.transform(X_input)
 
-        # Delete the original columns.
-        X_output = np.delete(X_output, np.s_[self.target_fields], axis=1)
-        X_output = np.hstack((X_output, new_X))
+        # Delete the original columns; the encoded columns stay sparse unless the result is dense enough.
+        X_output = hstack_columns((delete_columns(X, self.target_fields), new_X),
+                                  sparse_threshold=self.sparse_threshold)
         feature_types = input_datanode.feature_types.copy()
         feature_types = list(np.delete(feature_types, self.target_fields))
         feature_types.extend([CATEGORICAL] * new_X.shape[1])
@@ -9,6 +9,7 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 
 class KernelPCA(Transformer):
     type = 12
+    accept_sparse = True
 
     def __init__(self, n_components=100, kernel='rbf', degree=3, gamma=0.25, coef0=0.0,
                  random_state=1):
@@ -7,6 +7,7 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 
 class KitchenSinks(Transformer):
     type = 13
+    accept_sparse = True
 
     def __init__(self, gamma=1.0, n_components=100, random_state=1):
         super().__init__("kitchen_sinks", random_state=random_state)
@@ -9,6 +9,7 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 
 class NystronemSampler(Transformer):
     type = 15
+    accept_sparse = True
 
     def __init__(self, kernel='rbf', n_components=100, gamma=1.0, degree=3,
                  coef0=1, random_state=1):
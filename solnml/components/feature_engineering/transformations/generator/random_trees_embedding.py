@@ -7,6 +7,7 @@ from solnml.components.utils.configspace_utils import check_none, check_for_bool
 
 class RandomTreesEmbeddingTransformation(Transformer):
     type = 18
+    accept_sparse = True
 
     def __init__(self, n_estimators=10, max_depth=5, min_samples_split=2,
                  min_samples_leaf=1, min_weight_fraction_leaf=1.0, max_leaf_nodes='None',
@@ -68,7 +69,9 @@ class RandomTreesEmbeddingTransformation(Transformer):
 
             self.model.fit(X_new)
 
-        _X = self.model.transform(X_new).toarray()
+        _X = self.model.transform(X_new)
+        if not sp.issparse(X_new):
+            _X = densify(_X)
 
         return _X
 
@@ -5,6 +5,7 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 
 class SvdDecomposer(Transformer):
     type = 19
+    accept_sparse = True
 
     def __init__(self, target_dim=128, random_state=1):
         super().__init__("svd")
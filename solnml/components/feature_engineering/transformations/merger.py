@@ -18,7 +18,7 @@ class Merger(Transformer):
         new_feature_types = input_datanodes[0].feature_types.copy()
 
         for data_node in input_datanodes[1:]:
-            new_X = np.hstack((new_X, data_node.data[0]))
+            new_X = hstack_columns((new_X, data_node.data[0]))
             new_feature_types.extend(data_node.feature_types)
         output_datanode = DataNode((new_X, y), new_feature_types, input_datanodes[0].task_type)
 
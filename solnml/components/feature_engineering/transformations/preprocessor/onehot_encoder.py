@@ -4,9 +4,11 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 class OneHotTransformation(Transformer):
     type = 2
 
-    def __init__(self):
+    def __init__(self, sparse_threshold=0.3):
         super().__init__("onehot_encoder")
         self.input_type = CATEGORICAL
+        # The output is a CSR matrix if its density is below the threshold (as in sklearn's ColumnTransformer).
+        self.sparse_threshold = sparse_threshold
 
     def operate(self, input_datanode: DataNode, target_fields=None):
         import pandas as pd
@@ -24,14 +26,12 @@ class OneHotTransformation(Transformer):
         X_input = X[:, target_fields]
 
         if self.model is None:
-            self.model = OneHotEncoder(handle_unknown='ignore')
+            self.model = OneHotEncoder(handle_unknown='ignore', dtype=get_float_dtype(X))
             self.model.fit(X_input)
-        new_X = self.model.transform(X_input).toarray()
-        X_output = X.copy()
+        new_X = self.model.transform(X_input)
 
-        # Delete the original columns.
-        X_output = np.delete(X_output, np.s_[target_fields], axis=1)
-        X_output = np.hstack((X_output, new_X))
+        # Delete the original columns; the encoded columns stay sparse unless the result is dense enough.
+        X_output = hstack_columns((delete_columns(X, target_fields), new_X), sparse_threshold=self.sparse_threshold)
         feature_types = input_datanode.feature_types.copy()
         feature_types = list(np.delete(feature_types, target_fields))
         feature_types.extend([CATEGORICAL] * new_X.shape[1])
@@ -3,6 +3,7 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 
 class NormalizeTransformation(Transformer):
     type = 4
+    accept_sparse = True
 
     def __init__(self):
         super().__init__("normalizer")
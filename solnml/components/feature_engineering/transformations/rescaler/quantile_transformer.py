@@ -6,6 +6,7 @@ from solnml.components.feature_engineering.transformations.base_transformer impo
 
 class QuantileTransformation(Transformer):
     type = 5
+    accept_sparse = True
 
     def __init__(self, n_quantiles=1000, output_distribution='uniform', random_state=1):
         super().__init__("quantile_transformer")
@@ -70,7 +70,7 @@ class LibLinearBasedSelector(Transformer):
         selected_types = [feature_types[idx] for idx in target_fields if is_selected[idx]]
         selected_types.extend(irrevalent_types)
 
-        new_X = np.hstack((_X, X[:, irrevalent_fields]))
+        new_X = hstack_columns((_X, X[:, irrevalent_fields]))
         new_feature_types = selected_types
         output_datanode = DataNode((new_X, y), new_feature_types, input_datanode.task_type)
         output_datanode.trans_hist = input_datanode.trans_hist.copy()
@@ -42,7 +42,10 @@ class PercentileSelector(Transformer):
         # Because the pipeline guarantees that each feature is positive,
         # clip all values below zero to zero
         if self.score_func == 'chi2':
-            X_new[X_new < 0] = 0.0
+            if sp.issparse(X_new):
+                X_new.data[X_new.data < 0] = 0.0
+            else:
+                X_new[X_new < 0] = 0.0
 
         if self.model is None:
             from sklearn.feature_selection import SelectPercentile
@@ -56,7 +59,7 @@ class PercentileSelector(Transformer):
         selected_types = [feature_types[idx] for idx in target_fields if is_selected[idx]]
         selected_types.extend(irrevalent_types)
 
-        new_X = np.hstack((_X, X[:, irrevalent_fields]))
+        new_X = hstack_columns((_X, X[:, irrevalent_fields]))
         new_feature_types = selected_types
         output_datanode = DataNode((new_X, y), new_feature_types, input_datanode.task_type)
         output_datanode.trans_hist = input_datanode.trans_hist.copy()
@@ -42,7 +42,7 @@ class VarianceSelector(Transformer):
         _X = self.model.transform(X_new)
 
         if len(irrevalent_fields) > 0:
-            new_X = np.hstack((_X, X[:, irrevalent_fields]))
+            new_X = hstack_columns((_X, X[:, irrevalent_fields]))
             if input_datanode.feature_names is not None:
                 feature_names = np.hstack(([input_datanode.feature_names[idx] for idx in irrevalent_fields],
                                            [input_datanode.feature_names[idx] for idx in self.model.get_support(True)]))
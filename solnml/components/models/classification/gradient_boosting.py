@@ -10,6 +10,7 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
 from solnml.components.models.base_model import BaseClassificationModel, IterativeComponentWithSampleWeight
 from solnml.components.utils.configspace_utils import check_none
 from solnml.components.utils.constants import DENSE, UNSIGNED_DATA, PREDICTIONS
+from solnml.components.utils.utils import densify
 
 
 class GradientBoostingClassifier(IterativeComponentWithSampleWeight,
@@ -38,6 +39,8 @@ class GradientBoostingClassifier(IterativeComponentWithSampleWeight,
 
     def iterative_fit(self, X, y, sample_weight=None, n_iter=1, refit=False):
 
+        # The dense input only (see get_properties).
+        X = densify(X)
         # Special fix for gradient boosting!
         if isinstance(X, np.ndarray):
             X = np.ascontiguousarray(X, dtype=X.dtype)
@@ -101,12 +104,12 @@ class GradientBoostingClassifier(IterativeComponentWithSampleWeight,
     def predict(self, X):
         if self.estimator is None:
             raise NotImplementedError
-        return self.estimator.predict(X)
+        return self.estimator.predict(densify(X))
 
     def predict_proba(self, X):
         if self.estimator is None:
             raise NotImplementedError()
-        return self.estimator.predict_proba(X)
+        return self.estimator.predict_proba(densify(X))
 
     @staticmethod
     def get_properties(dataset_properties=None):
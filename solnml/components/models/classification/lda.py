@@ -6,6 +6,7 @@ import numpy as np
 
 from solnml.components.models.base_model import BaseClassificationModel
 from solnml.components.utils.constants import DENSE, UNSIGNED_DATA, PREDICTIONS
+from solnml.components.utils.utils import densify
 from solnml.components.utils.model_util import softmax
 from solnml.components.utils.configspace_utils import check_none
 
@@ -53,19 +54,20 @@ class LDA(BaseClassificationModel):
         else:
             self.estimator = estimator
 
-        self.estimator.fit(X, Y)
+        # The dense input only (see get_properties).
+        self.estimator.fit(densify(X), Y)
         return self
 
     def predict(self, X):
         if self.estimator is None:
             raise NotImplementedError()
-        return self.estimator.predict(X)
+        return self.estimator.predict(densify(X))
 
     def predict_proba(self, X):
         if self.estimator is None:
             raise NotImplementedError()
 
-        df = self.estimator.predict_proba(X)
+        df = self.estimator.predict_proba(densify(X))
         return softmax(df)
 
     @staticmethod
@@ -4,10 +4,10 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
     UniformIntegerHyperparameter, CategoricalHyperparameter, \
     UnParametrizedHyperparameter, Constant
 import numpy as np
-from lightgbm import LGBMClassifier
 
 from solnml.components.utils.constants import *
 from solnml.components.models.base_model import BaseClassificationModel
+from solnml.components.computation.thread_budget import get_thread_quota
 
 
 class LightGBM(BaseClassificationModel):
@@ -21,11 +21,12 @@ class LightGBM(BaseClassificationModel):
         self.min_child_samples = min_child_samples
         self.colsample_bytree = colsample_bytree
 
-        self.n_jobs = 4
+        self.n_jobs = get_thread_quota()
         self.random_state = random_state
         self.estimator = None
 
     def fit(self, X, y):
+        from lightgbm import LGBMClassifier
         self.estimator = LGBMClassifier(num_leaves=self.num_leaves,
                                         max_depth=self.max_depth,
                                         learning_rate=self.learning_rate,
@@ -9,6 +9,7 @@ from ConfigSpace.hyperparameters import UniformFloatHyperparameter, \
 from solnml.components.models.base_model import BaseRegressionModel, IterativeComponentWithSampleWeight
 from solnml.components.utils.configspace_utils import check_none
 from solnml.components.utils.constants import DENSE, UNSIGNED_DATA, PREDICTIONS
+from solnml.components.utils.utils import densify
 
 
 class GradientBoostingRegressor(IterativeComponentWithSampleWeight, BaseRegressionModel):
@@ -39,6 +40,8 @@ class GradientBoostingRegressor(IterativeComponentWithSampleWeight, BaseRegressi
     def iterative_fit(self, X, y, sample_weight=None, n_iter=1, refit=False):
 
         from sklearn.ensemble.gradient_boosting import GradientBoostingRegressor as GBR
+        # The dense input only (see get_properties).
+        X = densify(X)
         # Special fix for gradient boosting!
         if isinstance(X, np.ndarray):
             X = np.ascontiguousarray(X, dtype=X.dtype)
@@ -102,7 +105,7 @@ class GradientBoostingRegressor(IterativeComponentWithSampleWeight, BaseRegressi
     def predict(self, X):
         if self.estimator is None:
             raise NotImplementedError
-        return self.estimator.predict(X)
+        return self.estimator.predict(densify(X))
 
     @staticmethod
     def get_properties(dataset_properties=None):
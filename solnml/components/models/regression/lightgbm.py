@@ -7,6 +7,7 @@ import numpy as np
 
 from solnml.components.utils.constants import *
 from solnml.components.models.base_model import BaseRegressionModel
+from solnml.components.computation.thread_budget import get_thread_quota
 
 
 class LightGBM(BaseRegressionModel):
@@ -21,7 +22,7 @@ class LightGBM(BaseRegressionModel):
         self.min_child_weight = min_child_weight
         self.colsample_bytree = colsample_bytree
 
-        self.n_jobs = 1
+        self.n_jobs = get_thread_quota()
         self.random_state = random_state
         self.estimator = None
 
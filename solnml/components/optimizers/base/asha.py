@@ -0,0 +1,101 @@
+import time
+import numpy as np
+from solnml.utils.constant import MAX_INT
+
+
+class AshaScheduler(object):
+    """
+        Asynchronous successive halving (ASHA) over one bracket.
+
+        A configuration is promoted to the next rung as soon as it ranks in the top 1/eta
+        of the results received by its rung, so a free worker never waits for the stragglers of a rung.
+        Once a rung has received all its results, its best configuration is promoted even if the rung
+        has less than eta results, as the synchronous version does.
+    """
+
+    def __init__(self, executor, R, eta=3):
+        """
+        :param executor: ParallelProcessEvaluator, entered.
+        :param R: maximal resource.
+        """
+        self.executor = executor
+        self.R = R
+        self.eta = eta
+
+    def run(self, configs, r, n_rungs, budget=MAX_INT, callback=None):
+        """
+        :param configs: configurations of the lowest rung.
+        :param r: resource of the lowest rung; rung i uses r * eta ** i.
+        :param n_rungs: number of rungs.
+        :param budget: no evaluation is started after budget seconds.
+        :param callback: called with (config, n_resource, val_loss) when an evaluation finishes.
+        :return: list of (n_resource, configs, val_losses) for each rung, in the order of completion.
+        """
+        self.resources = [r * self.eta ** i for i in range(n_rungs)]
+        self.queue = list(configs)
+        self.results = [list() for _ in range(n_rungs)]
+        self.promoted = [set() for _ in range(n_rungs)]
+        self.running_num = [0] * n_rungs
+        self.callback = callback
+
+        start_time = time.time()
+        while True:
+            while self.executor.running_num < self.executor.n_worker:
+                if time.time() - start_time > budget:
+                    break
+                job = self._get_job()
+                if job is None:
+                    break
+                config, rung = job
+                self.running_num[rung] += 1
+                self.executor.submit(config, resource_ratio=float(self.resources[rung] / self.R), eta=self.eta,
+                                     first_iter=(rung == 0), callback=self._get_callback(config, rung))
+            if self.executor.running_num == 0:
+                break
+            # Block until one of the evaluations finishes; the results are handled by the callbacks.
+            self.executor.wait(first_completed=True)
+
+        return [(int(self.resources[i]), [config for config, _ in self.results[i]],
+                 [val_loss for _, val_loss in self.results[i]]) for i in range(n_rungs) if self.results[i]]
+
+    def _get_callback(self, config, rung):
+        def on_complete(val_loss):
+            self.running_num[rung] -= 1
+            self.results[rung].append((config, val_loss))
+            if self.callback is not None:
+                self.callback(config, int(self.resources[rung]), val_loss)
+        return on_complete
+
+    def _get_job(self):
+        # Promotions first, from the top rung down, so that the configurations reach the maximal resource early.
+        for rung in reversed(range(len(self.results) - 1)):
+            config = self._get_promotable(rung)
+            if config is not None:
+                self.promoted[rung].add(config)
+                return config, rung + 1
+        if self.queue:
+            return self.queue.pop(0), 0
+        return None
+
+    def _is_complete(self, rung):
+        """
+            Whether the rung has received all its results.
+        """
+        if self.running_num[rung] > 0:
+            return False
+        if rung == 0:
+            return len(self.queue) == 0
+        return self._is_complete(rung - 1) and self._get_promotable(rung - 1) is None
+
+    def _get_promotable(self, rung):
+        finished = [(val_loss, idx) for idx, (_, val_loss) in enumerate(self.results[rung]) if np.isfinite(val_loss)]
+        if not finished:
+            return None
+        promotion_num = int(len(self.results[rung]) / self.eta)
+        if promotion_num == 0 and len(self.promoted[rung]) == 0 and self._is_complete(rung):
+            promotion_num = 1
+        for _, idx in sorted(finished)[:promotion_num]:
+            config = self.results[rung][idx][0]
+            if config not in self.promoted[rung]:
+                return config
+        return None
@@ -202,20 +202,16 @@ class AbstractEPM(object):
                              (self.bounds.shape[0],
                               X.shape[1]))
 
-        mean = np.zeros(X.shape[0])
-        var = np.zeros(X.shape[0])
-        for i, x in enumerate(X):
-            X_ = np.hstack(
-                (np.tile(x, (n_instances, 1)), self.instance_features))
-            means, vars = self.predict(X_)
-            # use only mean of variance and not the variance of the mean here
-            # since we don't want to reason about the instance hardness distribution
-            var_x = np.mean(vars)  # + np.var(means)
-            if var_x < self.var_threshold:
-                var_x = self.var_threshold
-
-            var[i] = var_x
-            mean[i] = np.mean(means)
+        # Predict all the (configuration, instance) pairs in one call.
+        n_samples = X.shape[0]
+        X_ = np.hstack((np.repeat(X, n_instances, axis=0),
+                        np.tile(self.instance_features, (n_samples, 1))))
+        means, vars = self.predict(X_)
+        mean = np.mean(means.reshape((n_samples, -1)), axis=1)
+        # use only mean of variance and not the variance of the mean here
+        # since we don't want to reason about the instance hardness distribution
+        var = np.mean(vars.reshape((n_samples, -1)), axis=1)  # + np.var(means)
+        var[var < self.var_threshold] = self.var_threshold
 
         if len(mean.shape) == 1:
             mean = mean.reshape((-1, 1))
@@ -10,17 +10,22 @@ from solnml.components.optimizers.base.funcs import get_types, std_normalization
 from solnml.components.optimizers.base.config_space_utils import sample_configurations
 from solnml.components.optimizers.base.config_space_utils import convert_configurations_to_array
 from solnml.components.computation.parallel_process import ParallelProcessEvaluator
+from solnml.components.optimizers.base.asha import AshaScheduler
 from solnml.utils.logging_utils import get_logger
 from solnml.components.optimizers.base.prob_rf import RandomForestWithInstances
 
 
 class BohbBase(object):
     def __init__(self, eval_func, config_space, config_generator='tpe',
-                 seed=1, R=27, eta=3, n_jobs=1):
+                 seed=1, R=27, eta=3, n_jobs=1,
+                 per_run_time_limit=None, per_run_mem_limit=None):
         self.eval_func = eval_func
         self.config_space = config_space
         self.config_generator = config_generator
         self.n_workers = n_jobs
+        # Limits of each trial in the worker pool.
+        self.per_run_time_limit = per_run_time_limit
+        self.per_run_mem_limit = per_run_mem_limit
 
         self.trial_cnt = 0
         self.configs = list()
@@ -59,8 +64,8 @@ class BohbBase(object):
         self.num_config = len(bounds)
         self.surrogate = RandomForestWithInstances(types, bounds)
 
-        # self.executor = ParallelEvaluator(self.eval_func, n_worker=n_jobs)
-        # self.executor = ParallelProcessEvaluator(self.eval_func, n_worker=n_jobs)
+        # Persistent executor: the workers and the resident evaluator are reused across brackets.
+        self.executor = None
         self.acquisition_func = EI(model=self.surrogate)
         self.acq_optimizer = RandomSampling(self.acquisition_func,
                                             self.config_space,
@@ -71,6 +76,46 @@ class BohbBase(object):
 
         self.eval_dict = dict()
 
+    def _get_executor(self):
+        # Created on the first bracket; with n_jobs=1, the trials run in a single sandboxed worker.
+        if self.executor is None:
+            self.executor = ParallelProcessEvaluator(self.eval_func, n_worker=self.n_workers,
+                                                     time_limit=self.per_run_time_limit,
+                                                     mem_limit=self.per_run_mem_limit)
+        return self.executor
+
+    def _evaluate_batch(self, T, n_resource, first_iter=False):
+        """
+        :return: validation losses of the configurations in T; np.inf for the failed evaluations.
+        """
+        with self._get_executor() as executor:
+            return executor.parallel_execute(T, resource_ratio=float(n_resource / self.R),
+                                             eta=self.eta, first_iter=first_iter)
+
+    def _update_observation(self, config, n_resource, val_loss):
+        if np.isfinite(val_loss):
+            self.target_x[n_resource].append(config)
+            self.target_y[n_resource].append(val_loss)
+        if n_resource == self.R:
+            self.incumbent_configs.append(config)
+            self.incumbent_perfs.append(val_loss)
+            self.time_ticks.append(time.time() - self.global_start_time)
+            # Only update results using maximal resources
+            if self.config_generator != 'smac' and np.isfinite(val_loss):
+                self.config_gen.new_result(config, val_loss)
+
+    def _iterate_async(self, T, r, n_rungs, budget=MAX_INT):
+        """
+            Run a bracket with asynchronous successive halving in the worker pool.
+        """
+        self.logger.info("BOHB (async): %d configurations x size %d / %d each, %d rungs" %
+                         (len(T), r, self.R, n_rungs))
+        with self._get_executor() as executor:
+            scheduler = AshaScheduler(executor, self.R, eta=self.eta)
+            rungs = scheduler.run(T, r, n_rungs, budget=budget, callback=self._update_observation)
+        for n_resource, configs, val_losses in rungs:
+            self.exp_output[time.time()] = (n_resource, configs, val_losses)
+
     def _iterate(self, s, budget=MAX_INT, skip_last=0):
         # Set initial number of configurations
         n = int(ceil(self.B / self.R / (s + 1) * self.eta ** s))
@@ -83,51 +128,44 @@ class BohbBase(object):
         time_elapsed = time.time() - start_time
         self.logger.info("Choosing next batch of configurations took %.2f sec." % time_elapsed)
 
-        with ParallelProcessEvaluator(self.eval_func, n_worker=self.n_workers) as executor:
-            for i in range((s + 1) - int(skip_last)):  # changed from s + 1
-                if time.time() >= budget + start_time:
-                    break
-
-                # Run each of the n configs for <iterations>
-                # and keep best (n_configs / eta) configurations
-
-                n_configs = n * self.eta ** (-i)
-                n_resource = r * self.eta ** i
-
-                self.logger.info("BOHB: %d configurations x size %d / %d each" %
-                                 (int(n_configs), n_resource, self.R))
-
-                val_losses = executor.parallel_execute(T, resource_ratio=float(n_resource / self.R),
-                                                       eta=self.eta,
-                                                       first_iter=(i == 0))
-                for _id, _val_loss in enumerate(val_losses):
-                    if np.isfinite(_val_loss):
-                        self.target_x[int(n_resource)].append(T[_id])
-                        self.target_y[int(n_resource)].append(_val_loss)
-
-                self.exp_output[time.time()] = (int(n_resource), T, val_losses)
-
-                if int(n_resource) == self.R:
-                    self.incumbent_configs.extend(T)
-                    self.incumbent_perfs.extend(val_losses)
-                    self.time_ticks.extend([time.time() - self.global_start_time] * len(T))
-
-                    # Only update results using maximal resources
-                    if self.config_generator != 'smac':
-                        for _id, _val_loss in enumerate(val_losses):
-                            if np.isfinite(_val_loss):
-                                self.config_gen.new_result(T[_id], _val_loss)
-
-                # Select a number of best configurations for the next loop.
-                # Filter out early stops, if any.
-                indices = np.argsort(val_losses)
-                if len(T) >= self.eta:
-                    T = [T[i] for i in indices]
-                    reduced_num = int(n_configs / self.eta)
-                    T = T[0:reduced_num]
-                else:
-                    T = [T[indices[0]]]
+        if self.n_workers > 1:
+            # Promote the configurations asynchronously, so that the workers never wait for the slowest one of a rung.
+            self._iterate_async(T, r, (s + 1) - int(skip_last), budget=budget)
+            self._refit_surrogate()
+            return
+
+        for i in range((s + 1) - int(skip_last)):  # changed from s + 1
+            if time.time() >= budget + start_time:
+                break
+
+            # Run each of the n configs for <iterations>
+            # and keep best (n_configs / eta) configurations
+
+            n_configs = n * self.eta ** (-i)
+            n_resource = r * self.eta ** i
+
+            self.logger.info("BOHB: %d configurations x size %d / %d each" %
+                             (int(n_configs), n_resource, self.R))
+
+            val_losses = self._evaluate_batch(T, n_resource, first_iter=(i == 0))
+            for _id, _val_loss in enumerate(val_losses):
+                self._update_observation(T[_id], int(n_resource), _val_loss)
+
+            self.exp_output[time.time()] = (int(n_resource), T, val_losses)
+
+            # Select a number of best configurations for the next loop.
+            # Filter out early stops, if any.
+            indices = np.argsort(val_losses)
+            if len(T) >= self.eta:
+                T = [T[i] for i in indices]
+                reduced_num = int(n_configs / self.eta)
+                T = T[0:reduced_num]
+            else:
+                T = [T[indices[0]]]
+
+        self._refit_surrogate()
 
+    def _refit_surrogate(self):
         # Refit the surrogate model.
         resource_val = self.iterate_r[-1]
         if len(self.target_y[resource_val]) > 1:
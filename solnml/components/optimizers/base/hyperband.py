@@ -10,10 +10,14 @@ from solnml.components.computation.parallel_process import ParallelProcessEvalua
 
 class HyperbandBase(object):
     def __init__(self, eval_func, config_space,
-                 seed=1, R=81, eta=3, n_jobs=1):
+                 seed=1, R=81, eta=3, n_jobs=1,
+                 per_run_time_limit=None, per_run_mem_limit=None):
         self.eval_func = eval_func
         self.config_space = config_space
         self.n_workers = n_jobs
+        # Limits of each trial in the worker pool.
+        self.per_run_time_limit = per_run_time_limit
+        self.per_run_mem_limit = per_run_mem_limit
 
         self.trial_cnt = 0
         self.configs = list()
@@ -47,6 +51,24 @@ class HyperbandBase(object):
             self.target_y[r] = list()
 
         self.eval_dict = dict()
+        # Persistent executor: the workers and the resident evaluator are reused across brackets.
+        self.executor = None
+
+    def _get_executor(self):
+        # Created on the first bracket; with n_jobs=1, the trials run in a single sandboxed worker.
+        if self.executor is None:
+            self.executor = ParallelProcessEvaluator(self.eval_func, n_worker=self.n_workers,
+                                                     time_limit=self.per_run_time_limit,
+                                                     mem_limit=self.per_run_mem_limit)
+        return self.executor
+
+    def _evaluate_batch(self, T, n_resource, first_iter=False):
+        """
+        :return: validation losses of the configurations in T; np.inf for the failed evaluations.
+        """
+        with self._get_executor() as executor:
+            return executor.parallel_execute(T, resource_ratio=float(n_resource / self.R),
+                                             eta=self.eta, first_iter=first_iter)
 
     def _iterate(self, s, budget=MAX_INT, skip_last=0):
 
@@ -61,40 +83,37 @@ class HyperbandBase(object):
         time_elapsed = time.time() - start_time
         self.logger.info("Choosing next batch of configurations took %.2f sec." % time_elapsed)
 
-        with ParallelProcessEvaluator(self.eval_func, n_worker=self.n_workers) as executor:
-            for i in range((s + 1) - int(skip_last)):  # changed from s + 1
-                if time.time() >= budget + start_time:
-                    break
-
-                # Run each of the n configs for <iterations>
-                # and keep best (n_configs / eta) configurations
-
-                n_configs = n * self.eta ** (-i)
-                n_resource = r * self.eta ** i
-
-                self.logger.info("MFSE: %d configurations x size %d / %d each" %
-                                 (int(n_configs), n_resource, self.R))
-
-                val_losses = executor.parallel_execute(T, resource_ratio=float(n_resource / self.R),
-                                                       eta=self.eta,
-                                                       first_iter=(i == 0))
-                for _id, _val_loss in enumerate(val_losses):
-                    if np.isfinite(_val_loss):
-                        self.target_x[int(n_resource)].append(T[_id])
-                        self.target_y[int(n_resource)].append(_val_loss)
-
-                self.exp_output[time.time()] = (int(n_resource), T, val_losses)
-
-                if int(n_resource) == self.R:
-                    self.incumbent_configs.extend(T)
-                    self.incumbent_perfs.extend(val_losses)
-
-                # Select a number of best configurations for the next loop.
-                # Filter out early stops, if any.
-                indices = np.argsort(val_losses)
-                if len(T) >= self.eta:
-                    T = [T[i] for i in indices]
-                    reduced_num = int(n_configs / self.eta)
-                    T = T[0:reduced_num]
-                else:
-                    T = [T[indices[0]]]
+        for i in range((s + 1) - int(skip_last)):  # changed from s + 1
+            if time.time() >= budget + start_time:
+                break
+
+            # Run each of the n configs for <iterations>
+            # and keep best (n_configs / eta) configurations
+
+            n_configs = n * self.eta ** (-i)
+            n_resource = r * self.eta ** i
+
+            self.logger.info("MFSE: %d configurations x size %d / %d each" %
+                             (int(n_configs), n_resource, self.R))
+
+            val_losses = self._evaluate_batch(T, n_resource, first_iter=(i == 0))
+            for _id, _val_loss in enumerate(val_losses):
+                if np.isfinite(_val_loss):
+                    self.target_x[int(n_resource)].append(T[_id])
+                    self.target_y[int(n_resource)].append(_val_loss)
+
+            self.exp_output[time.time()] = (int(n_resource), T, val_losses)
+
+            if int(n_resource) == self.R:
+                self.incumbent_configs.extend(T)
+                self.incumbent_perfs.extend(val_losses)
+
+            # Select a number of best configurations for the next loop.
+            # Filter out early stops, if any.
+            indices = np.argsort(val_losses)
+            if len(T) >= self.eta:
+                T = [T[i] for i in indices]
+                reduced_num = int(n_configs / self.eta)
+                T = T[0:reduced_num]
+            else:
+                T = [T[indices[0]]]
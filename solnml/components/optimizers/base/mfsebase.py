@@ -7,14 +7,19 @@ from litebo.core.mf_batch_advisor import MFBatchAdvisor
 from solnml.utils.constant import MAX_INT
 from solnml.utils.logging_utils import get_logger
 from solnml.components.computation.parallel_process import ParallelProcessEvaluator
+from solnml.components.optimizers.base.asha import AshaScheduler
 
 
 class MfseBase(object):
     def __init__(self, eval_func, config_space,
-                 seed=1, R=81, eta=3, n_jobs=1, output_dir='./'):
+                 seed=1, R=81, eta=3, n_jobs=1, output_dir='./',
+                 per_run_time_limit=None, per_run_mem_limit=None):
         self.eval_func = eval_func
         self.config_space = config_space
         self.n_workers = n_jobs
+        # Limits of each trial in the worker pool.
+        self.per_run_time_limit = per_run_time_limit
+        self.per_run_mem_limit = per_run_mem_limit
 
         self.trial_cnt = 0
         self.configs = list()
@@ -53,6 +58,38 @@ class MfseBase(object):
 
         self.mf_advisor = MFBatchAdvisor(config_space, output_dir=output_dir)
         self.eval_dict = dict()
+        # Persistent executor: the workers and the resident evaluator are reused across brackets.
+        self.executor = None
+
+    def _get_executor(self):
+        # Created on the first bracket; with n_jobs=1, the trials run in a single sandboxed worker.
+        if self.executor is None:
+            self.executor = ParallelProcessEvaluator(self.eval_func, n_worker=self.n_workers,
+                                                     time_limit=self.per_run_time_limit,
+                                                     mem_limit=self.per_run_mem_limit)
+        return self.executor
+
+    def _update_observation(self, config, n_resource, val_loss):
+        if np.isfinite(val_loss):
+            self.target_x[n_resource].append(config)
+            self.target_y[n_resource].append(val_loss)
+            self.evaluation_stats['timestamps'].append(time.time() - self.global_start_time)
+            self.evaluation_stats['val_scores'].append(val_loss)
+        if n_resource == self.R:
+            self.incumbent_configs.append(config)
+            self.incumbent_perfs.append(val_loss)
+
+    def _iterate_async(self, T, r, n_rungs, budget=MAX_INT):
+        """
+            Run a bracket with asynchronous successive halving in the worker pool.
+        """
+        self.logger.info("MFSE (async): %d configurations x size %d / %d each, %d rungs" %
+                         (len(T), r, self.R, n_rungs))
+        with self._get_executor() as executor:
+            scheduler = AshaScheduler(executor, self.R, eta=self.eta)
+            rungs = scheduler.run(T, r, n_rungs, budget=budget, callback=self._update_observation)
+        for n_resource, configs, val_losses in rungs:
+            self.exp_output[time.time()] = (n_resource, configs, val_losses)
 
     def _iterate(self, s, budget=MAX_INT, skip_last=0):
         # Set initial number of configurations
@@ -66,7 +103,10 @@ class MfseBase(object):
         time_elapsed = time.time() - start_time
         self.logger.info("Choosing next batch of configurations took %.2f sec." % time_elapsed)
 
-        with ParallelProcessEvaluator(self.eval_func, n_worker=self.n_workers) as executor:
+        if self.n_workers > 1:
+            # Promote the configurations asynchronously, so that the workers never wait for the slowest one of a rung.
+            self._iterate_async(T, r, (s + 1) - int(skip_last), budget=budget)
+        else:
             for i in range((s + 1) - int(skip_last)):  # changed from s + 1
                 if time.time() > budget + start_time:
                     break
@@ -79,42 +119,20 @@ class MfseBase(object):
                 self.logger.info("MFSE: %d configurations x size %d / %d each" %
                                  (int(n_configs), n_resource, self.R))
 
-                if self.n_workers > 1:
-                    # TODO: Time limit control
-                    val_losses = executor.parallel_execute(T, resource_ratio=float(n_resource / self.R),
-                                                           eta=self.eta,
-                                                           first_iter=(i == 0))
-                    for _id, _val_loss in enumerate(val_losses):
-                        if np.isfinite(_val_loss):
-                            self.target_x[int(n_resource)].append(T[_id])
-                            self.target_y[int(n_resource)].append(_val_loss)
-                            self.evaluation_stats['timestamps'].append(time.time() - self.global_start_time)
-                            self.evaluation_stats['val_scores'].append(_val_loss)
-                else:
-                    val_losses = list()
+                val_losses = list()
+                with self._get_executor() as executor:
                     for config in T:
                         if time.time() - start_time > budget:
                             self.logger.warning('Time limit exceeded!')
                             break
-                        try:
-                            # TODO: Add time limit
-                            val_loss = self.eval_func(config, resource_ratio=float(n_resource / self.R),
-                                                      eta=self.eta, first_iter=(i == 0))
-                        except Exception as e:
-                            val_loss = np.inf
+                        # The trial runs in the sandboxed worker, where it is isolated from the main process.
+                        val_loss = executor.parallel_execute([config], resource_ratio=float(n_resource / self.R),
+                                                             eta=self.eta, first_iter=(i == 0))[0]
                         val_losses.append(val_loss)
-                        if np.isfinite(val_loss):
-                            self.target_x[int(n_resource)].append(config)
-                            self.target_y[int(n_resource)].append(val_loss)
-                            self.evaluation_stats['timestamps'].append(time.time() - self.global_start_time)
-                            self.evaluation_stats['val_scores'].append(val_loss)
+                        self._update_observation(config, int(n_resource), val_loss)
 
                 self.exp_output[time.time()] = (int(n_resource), T, val_losses)
 
-                if int(n_resource) == self.R:
-                    self.incumbent_configs.extend(T)
-                    self.incumbent_perfs.extend(val_losses)
-
                 # Select a number of best configurations for the next loop.
                 # Filter out early stops, if any.
                 indices = np.argsort(val_losses)
@@ -183,12 +183,12 @@ class RandomForestWithInstances(AbstractEPM):
             raise ValueError('Rows in X should have %d entries but have %d!' %
                              (self.types.shape[0], X.shape[1]))
 
-        means, vars_ = [], []
-        for row_X in X:
-            mean, var = self.rf.predict_mean_var(row_X)
-            means.append(mean)
-            vars_.append(var)
-        means = np.array(means)
-        vars_ = np.array(vars_)
-
-        return means.reshape((-1, 1)), vars_.reshape((-1, 1))
+        # pyrfr predicts one row per call: the duplicated candidates (e.g., of the local search
+        # and the random sampling) are predicted once, without per-row array allocations.
+        X_unique, inverse = np.unique(X, axis=0, return_inverse=True)
+        predict_mean_var = self.rf.predict_mean_var
+        stats = np.array([predict_mean_var(row_X) for row_X in X_unique.tolist()],
+                         dtype=np.float64).reshape((-1, 2))
+        stats = stats[inverse.reshape(-1)]
+
+        return stats[:, :1], stats[:, 1:]
@@ -1,11 +1,10 @@
 import abc
-import os
 import time
 import numpy as np
-import pickle as pkl
 from solnml.utils.constant import MAX_INT
 from solnml.utils.logging_utils import get_logger
 from solnml.components.evaluators.base_evaluator import _BaseEvaluator
+from solnml.components.computation.sandbox_pool import get_worker_pool
 
 
 class BaseOptimizer(object):
@@ -22,6 +21,27 @@ class BaseOptimizer(object):
         self.logger = get_logger(self.__module__ + "." + self.__class__.__name__)
         self.init_hpo_iter_num = None
         self.early_stopped_flag = False
+        # Trials run in the sandboxed worker pool, where the evaluator stays resident.
+        self.worker_pool = None
+        self.evaluator_key = None
+
+    def __getstate__(self):
+        # The worker pool belongs to the current process; the evaluator is registered again after unpickling.
+        state = self.__dict__.copy()
+        state['worker_pool'], state['evaluator_key'] = None, None
+        return state
+
+    def _register_evaluator(self, n_workers=1):
+        """
+            Send the evaluator to the shared worker pool, once per pool.
+        """
+        worker_pool = get_worker_pool(n_workers=n_workers)
+        if worker_pool is not self.worker_pool:
+            # The first trial, or the pool was shut down and started again.
+            if hasattr(self.evaluator, 'share_data'):
+                self.evaluator.share_data()
+            self.worker_pool = worker_pool
+            self.evaluator_key = self.worker_pool.register(self.evaluator)
 
     @abc.abstractmethod
     def run(self):
@@ -31,27 +51,13 @@ class BaseOptimizer(object):
     def iterate(self, budget=MAX_INT):
         pass
 
-    def combine_tmp_config_path(self):
-        sorted_list_path = self.evaluator.topk_model_saver.sorted_list_path
-        path_list = os.path.split(sorted_list_path)
-        tmp_path = 'tmp_' + path_list[-1]
-        tmp_filepath = os.path.join(os.path.dirname(sorted_list_path), tmp_path)
-
-        # TODO: How to merge when using multi-process
-        try:
-            if os.path.exists(tmp_filepath):
-                self.logger.info('Temporary config path detected!')
-                with open(tmp_filepath, 'rb') as f1:
-                    sorted_file_replica = pkl.load(f1)
-                with open(sorted_list_path, 'wb') as f2:
-                    pkl.dump(sorted_file_replica, f2)
-                self.logger.info('Temporary config path merged!')
-        except EOFError:
-            self.logger.error('Temporary config path empty!')
-
-
     def get_evaluation_stats(self):
         return
 
     def gc(self):
-        return
+        """
+            Release the evaluator in the worker pool, e.g., when the optimizer is replaced.
+        """
+        if self.evaluator_key is not None:
+            self.worker_pool.unregister(self.evaluator_key)
+        self.worker_pool, self.evaluator_key = None, None
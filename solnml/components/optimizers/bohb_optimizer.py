@@ -12,12 +12,16 @@ class BohbOptimizer(BaseOptimizer, BohbBase):
                  R=27, eta=3, mode='smac', n_jobs=1):
         BaseOptimizer.__init__(self, evaluator, config_space, name, seed)
         BohbBase.__init__(self, eval_func=self.evaluator, config_generator=mode, config_space=self.config_space,
-                          seed=seed, R=R, eta=eta, n_jobs=n_jobs)
+                          seed=seed, R=R, eta=eta, n_jobs=n_jobs,
+                          per_run_time_limit=per_run_time_limit, per_run_mem_limit=per_run_mem_limit)
         self.time_limit = time_limit
         self.evaluation_num_limit = evaluation_limit
         self.inner_iter_num_per_iter = inner_iter_num_per_iter
-        self.per_run_time_limit = per_run_time_limit
-        self.per_run_mem_limit = per_run_mem_limit
+
+    def gc(self):
+        # The evaluator is resident in the workers through the executor of the brackets.
+        if self.executor is not None:
+            self.executor.close()
 
     def iterate(self, budget=MAX_INT):
         '''
@@ -20,5 +20,6 @@ def build_fe_optimizer(eval_type, evaluator, config_space,
     return optimizer_class(evaluator, config_space, 'fe',
                            output_dir=output_dir,
                            per_run_time_limit=per_run_time_limit,
+                           per_run_mem_limit=per_run_mem_limit,
                            inner_iter_num_per_iter=inner_iter_num_per_iter,
                            seed=seed, n_jobs=n_jobs)
@@ -14,10 +14,11 @@ def build_hpo_optimizer(eval_type, evaluator, config_space,
     elif eval_type == 'holdout_tpe':
         optimizer_class = TPEOptimizer
     else:
-        # TODO: Support asynchronous BO
+        # Asynchronous batch BO if n_jobs > 1.
         optimizer_class = SMACOptimizer
     return optimizer_class(evaluator, config_space, 'hpo',
                            output_dir=output_dir,
                            per_run_time_limit=per_run_time_limit,
+                           per_run_mem_limit=per_run_mem_limit,
                            inner_iter_num_per_iter=inner_iter_num_per_iter,
                            seed=seed, n_jobs=n_jobs)
@@ -11,14 +11,18 @@ class MfseOptimizer(BaseOptimizer, MfseBase):
                  R=27, eta=3, n_jobs=1):
         BaseOptimizer.__init__(self, evaluator, config_space, name, seed)
         MfseBase.__init__(self, eval_func=self.evaluator, config_space=self.config_space,
-                          seed=seed, R=R, eta=eta, n_jobs=n_jobs, output_dir=output_dir)
+                          seed=seed, R=R, eta=eta, n_jobs=n_jobs, output_dir=output_dir,
+                          per_run_time_limit=per_run_time_limit, per_run_mem_limit=per_run_mem_limit)
         self.time_limit = time_limit
         self.evaluation_num_limit = evaluation_limit
 
         # TODO: Specify!
         self.inner_iter_num_per_iter = 5
-        self.per_run_time_limit = per_run_time_limit
-        self.per_run_mem_limit = per_run_mem_limit
+
+    def gc(self):
+        # The evaluator is resident in the workers through the executor of the brackets.
+        if self.executor is not None:
+            self.executor.close()
 
     def iterate(self, budget=MAX_INT):
         '''
@@ -32,7 +36,6 @@ class MfseOptimizer(BaseOptimizer, MfseBase):
                 break
             budget_left = budget - _time_elapsed
             self._iterate(self.s_values[self.inner_iter_id], budget=budget_left)
-            self.combine_tmp_config_path()
             self.inner_iter_id = (self.inner_iter_id + 1) % (self.s_max + 1)
 
             # Remove tmp model
@@ -9,6 +9,7 @@ from smac.facade.smac_facade import SMAC
 from smac.optimizer import pSMAC
 
 from solnml.components.optimizers.base_optimizer import BaseOptimizer
+from solnml.components.utils.configspace_utils import get_config_space_cardinality
 
 
 class PSMACOptimizer(BaseOptimizer):
@@ -36,7 +37,9 @@ class PSMACOptimizer(BaseOptimizer):
                               "shared-model": True,  # PSMAC Entry
                               "runcount-limit": self.evaluation_num_limit,
                               "output_dir": output_dir,
-                              "cutoff_time": self.per_run_time_limit
+                              "cutoff_time": self.per_run_time_limit,
+                              # SMAC runs each trial under both limits (via pynisher) in its own processes.
+                              "memory_limit": self.per_run_mem_limit
                               }
         self.optimizer_list = list()
         for _ in range(self.n_jobs):
@@ -53,9 +56,9 @@ class PSMACOptimizer(BaseOptimizer):
         if hp_num == 0:
             self.config_num_threshold = 0
         else:
-            _threshold = int(len(set(self.config_space.sample_configuration(12500))) * 0.8)
-            self.config_num_threshold = _threshold
-        self.logger.info('HP_THRESHOLD is: %d' % self.config_num_threshold)
+            _threshold = get_config_space_cardinality(self.config_space, sample_size=12500)
+            self.config_num_threshold = _threshold if _threshold == np.inf else int(_threshold * 0.8)
+        self.logger.info('HP_THRESHOLD is: %s' % self.config_num_threshold)
 
     def run(self):
         while True:
@@ -1,8 +1,9 @@
 import time
 import numpy as np
-from litebo.facade.bo_facade import BayesianOptimization as BO
-from litebo.utils.constants import SUCCESS
+from litebo.core.advisor import Advisor
+from litebo.utils.constants import SUCCESS, MAXINT
 from solnml.components.optimizers.base_optimizer import BaseOptimizer, MAX_INT
+from solnml.components.utils.configspace_utils import get_config_space_cardinality
 
 
 class SMACOptimizer(BaseOptimizer):
@@ -16,12 +17,13 @@ class SMACOptimizer(BaseOptimizer):
         self.per_run_time_limit = per_run_time_limit
         self.per_run_mem_limit = per_run_mem_limit
         self.output_dir = output_dir
-        self.optimizer = BO(objective_function=self.evaluator,
-                            config_space=config_space,
-                            max_runs=int(1e10),
-                            task_id=None,
-                            time_limit_per_trial=self.per_run_time_limit,
-                            rng=np.random.RandomState(self.seed))
+        # With n_jobs > 1, trials are evaluated asynchronously with n_jobs trials in flight.
+        self.n_jobs = n_jobs
+        # The trials are evaluated here; litebo's advisor only suggests configurations and records the results.
+        self.rng = np.random.RandomState(self.seed)
+        self.optimizer = self._create_advisor()
+        # Config -> (trial_state, perf).
+        self.evaluated_configs = dict()
 
         self.trial_cnt = 0
         self.configs = list()
@@ -34,11 +36,11 @@ class SMACOptimizer(BaseOptimizer):
         if hp_num == 0:
             self.config_num_threshold = 0
         else:
-            _threshold = int(len(set(self.config_space.sample_configuration(5000))))
-            self.config_num_threshold = _threshold
-        self.logger.debug('The maximum trial number in HPO is: %d' % self.config_num_threshold)
+            self.config_num_threshold = get_config_space_cardinality(self.config_space, sample_size=5000)
+        self.logger.debug('The maximum trial number in HPO is: %s' % self.config_num_threshold)
         self.maximum_config_num = min(600, self.config_num_threshold)
         self.eval_dict = {}
+        self.racing_incumbent_perf = float("-INF")
 
     def run(self):
         while True:
@@ -53,29 +55,38 @@ class SMACOptimizer(BaseOptimizer):
     def iterate(self, budget=MAX_INT):
         _start_time = time.time()
 
+        self._register_evaluator(n_workers=self.n_jobs)
+
         if len(self.configs) == 0 and self.init_hpo_iter_num is not None:
             inner_iter_num = self.init_hpo_iter_num
             print('initial hpo trial num is set to %d' % inner_iter_num)
         else:
             inner_iter_num = self.inner_iter_num_per_iter
 
-        for _ in range(inner_iter_num):
-            if len(self.configs) >= self.maximum_config_num:
-                self.early_stopped_flag = True
-                self.logger.warning('Already explored 70 percentage of the '
-                                    'hyperspace or maximum configuration number met: %d!' % self.maximum_config_num)
-                break
-            if time.time() - _start_time > budget:
-                self.logger.warning('Time limit exceeded!')
-                break
-            _config, _status, _perf, _ = self.optimizer.iterate()
+        if self.n_jobs > 1:
+            # Keep all the workers busy even if few trials are requested per iteration.
+            trial_results = self._iterate_async(max(inner_iter_num, self.n_jobs), budget)
+        else:
+            trial_results = list()
+            for _ in range(inner_iter_num):
+                if len(self.configs) + len(trial_results) >= self.maximum_config_num:
+                    self.early_stopped_flag = True
+                    self.logger.warning('Already explored 70 percentage of the '
+                                        'hyperspace or maximum configuration number met: %d!' % self.maximum_config_num)
+                    break
+                if time.time() - _start_time > budget:
+                    self.logger.warning('Time limit exceeded!')
+                    break
+                trial_results.append(self._iterate())
+                self._update_incumbent(*trial_results[-1])
+
+        for _config, _status, _perf, _ in trial_results:
             if _status == SUCCESS:
                 self.exp_output[time.time()] = (_config, _perf)
                 self.configs.append(_config)
                 self.perfs.append(-_perf)
-                self.combine_tmp_config_path()
 
-        runhistory = self.optimizer.get_history()
+        runhistory = self.optimizer.history_container
         if self.name == 'hpo':
             if hasattr(self.evaluator, 'fe_config'):
                 fe_config = self.evaluator.fe_config
@@ -97,3 +108,117 @@ class SMACOptimizer(BaseOptimizer):
         iteration_cost = time.time() - _start_time
         # incumbent_perf: the large the better
         return self.incumbent_perf, iteration_cost, self.incumbent_config
+
+    def _create_advisor(self):
+        return Advisor(self.config_space,
+                       initial_trials=3,
+                       init_strategy='random',
+                       surrogate_type='prf',
+                       output_dir=self.output_dir,
+                       rng=self.rng)
+
+    def _suggest(self, advisor):
+        if len(advisor.history_container.get_incumbents()) == 0 and \
+                len(advisor.failed_configurations) >= len(advisor.initial_configurations):
+            # The surrogate cannot be fitted before the first successful trial.
+            return advisor.sample_random_configs(1)[0]
+        return advisor.get_suggestion()
+
+    def _choose_next(self, pending_configs=None):
+        """
+            Suggest the next configuration; the pending ones are handled with the constant liar strategy.
+        :param pending_configs: configurations being evaluated.
+        """
+        if not pending_configs:
+            return self._suggest(self.optimizer)
+
+        # Pretend the pending trials return the worst observed performance, so that the acquisition function
+        # moves away from them: the advisor fits its failed configurations with the worst successful performance.
+        # The lies are told to the advisor for this suggestion only, without refitting on a copy of the history.
+        failed_num = len(self.optimizer.failed_configurations)
+        self.optimizer.failed_configurations.extend(pending_configs)
+        try:
+            config = self._suggest(self.optimizer)
+        finally:
+            del self.optimizer.failed_configurations[failed_num:]
+        _sample_cnt = 0
+        while config in pending_configs and _sample_cnt < 100:
+            config = self.optimizer.sample_random_configs(1)[0]
+            _sample_cnt += 1
+        return config
+
+    def _update_observation(self, config, trial_state, perf, trial_info):
+        """
+            Report a trial result to the advisor.
+        """
+        if trial_state != SUCCESS or perf is None:
+            perf = MAXINT
+            self.logger.error(trial_info)
+        self.optimizer.update_observation([config, perf, trial_state])
+        self.evaluated_configs[config] = (trial_state, perf)
+        return perf
+
+    def _update_incumbent(self, config, trial_state, perf, trial_info):
+        if trial_state == SUCCESS:
+            # The incumbent is used by fold-level racing in cross-validation.
+            self.racing_incumbent_perf = max(self.racing_incumbent_perf, -perf)
+
+    def _submit(self, config):
+        return self.worker_pool.submit(self.evaluator_key, (config,),
+                                       attributes={'incumbent_perf': self.racing_incumbent_perf},
+                                       time_limit=self.per_run_time_limit,
+                                       mem_limit=self.per_run_mem_limit)
+
+    def _iterate(self):
+        """
+            One iteration of BO, where the trial runs in the sandboxed worker pool with hard time and memory limits.
+        """
+        config = self._choose_next()
+
+        trial_state, trial_info = SUCCESS, None
+        if config not in self.evaluated_configs:
+            task_id = self._submit(config)
+            self.worker_pool.wait([task_id])
+            trial_state, perf, trial_info, _ = self.worker_pool.get_result(task_id)
+            perf = self._update_observation(config, trial_state, perf, trial_info)
+        else:
+            self.logger.debug('This configuration has been evaluated! Skip it.')
+            trial_state, perf = self.evaluated_configs[config]
+        return config, trial_state, perf, trial_info
+
+    def _iterate_async(self, trial_num, budget=MAX_INT):
+        """
+            Asynchronous batch BO: keep n_jobs trials in flight and suggest a new configuration
+            (with the surrogate updated) as soon as one of them finishes.
+        :return: list of (config, trial_state, perf, trial_info) in the order of completion.
+        """
+        _start_time = time.time()
+        running_trials = dict()
+        trial_results = list()
+        suggested_num = 0
+        while True:
+            while suggested_num < trial_num and len(running_trials) < self.n_jobs:
+                if len(self.configs) + len(trial_results) + len(running_trials) >= self.maximum_config_num:
+                    self.early_stopped_flag = True
+                    self.logger.warning('Already explored 70 percentage of the '
+                                        'hyperspace or maximum configuration number met: %d!' % self.maximum_config_num)
+                    break
+                if time.time() - _start_time > budget:
+                    self.logger.warning('Time limit exceeded!')
+                    break
+                suggested_num += 1
+                config = self._choose_next(list(running_trials.values()))
+                if config in self.evaluated_configs:
+                    self.logger.debug('This configuration has been evaluated! Skip it.')
+                    continue
+                running_trials[self._submit(config)] = config
+
+            if len(running_trials) == 0:
+                break
+            for task_id in self.worker_pool.wait(list(running_trials.keys()), first_completed=True):
+                config = running_trials.pop(task_id)
+                trial_state, perf, trial_info, _ = self.worker_pool.get_result(task_id)
+                perf = self._update_observation(config, trial_state, perf, trial_info)
+                trial_results.append((config, trial_state, perf, trial_info))
+                self._update_incumbent(*trial_results[-1])
+        return trial_results
@@ -5,9 +5,10 @@ import pickle as pkl
 import re
 from collections import OrderedDict
 
-from litebo.utils.constants import SUCCESS
+from litebo.utils.constants import SUCCESS, FAILED, MAXINT
 from litebo.optimizer.smbo import SMBO
 from solnml.components.optimizers.base_optimizer import BaseOptimizer, MAX_INT
+from solnml.components.utils.configspace_utils import get_config_space_cardinality
 
 cur_dir = os.path.dirname(__file__)
 source_dir = os.path.join('%s', '..', 'transfer_learning', 'tlbo', 'runhistory') % cur_dir
@@ -53,9 +54,9 @@ class TlboOptimizer(BaseOptimizer):
         if hp_num == 0:
             self.config_num_threshold = 0
         else:
-            _threshold = int(len(set(self.config_space.sample_configuration(10000))) * 0.75)
-            self.config_num_threshold = _threshold
-        self.logger.debug('The maximum trial number in HPO is: %d' % self.config_num_threshold)
+            _threshold = get_config_space_cardinality(self.config_space, sample_size=10000)
+            self.config_num_threshold = _threshold if _threshold == np.inf else int(_threshold * 0.75)
+        self.logger.debug('The maximum trial number in HPO is: %s' % self.config_num_threshold)
         self.maximum_config_num = min(600, self.config_num_threshold)
         self.early_stopped_flag = False
         self.eval_dict = {}
@@ -81,12 +82,11 @@ class TlboOptimizer(BaseOptimizer):
             if time.time() - _start_time > budget:
                 self.logger.warning('Time limit exceeded!')
                 break
-            _config, _status, _perf, _ = self.optimizer.iterate()
+            _config, _status, _perf, _ = self._iterate()
             if _status == SUCCESS:
                 self.exp_output[time.time()] = (_config, _perf)
                 self.configs.append(_config)
                 self.perfs.append(-_perf)
-                self.combine_tmp_config_path()
 
         runhistory = self.optimizer.get_history()
         if self.name == 'hpo':
@@ -110,6 +110,32 @@ class TlboOptimizer(BaseOptimizer):
         # incumbent_perf: the large the better
         return self.incumbent_perf, iteration_cost, self.incumbent_config
 
+    def _iterate(self):
+        """
+            One iteration of SMBO, where the trial runs in the sandboxed worker pool with hard time and memory limits.
+        """
+        advisor = self.optimizer.config_advisor
+        config = advisor.get_suggestion()
+
+        trial_state, trial_info = SUCCESS, None
+        if config not in (advisor.configurations + advisor.failed_configurations):
+            self._register_evaluator()
+            trial_state, perf, trial_info, _ = self.worker_pool.run(self.evaluator_key, (config,),
+                                                                    time_limit=self.per_run_time_limit,
+                                                                    mem_limit=self.per_run_mem_limit)
+            if trial_state != SUCCESS or perf is None:
+                perf = MAXINT
+                self.logger.error(trial_info)
+            advisor.update_observation([config, perf, trial_state])
+        else:
+            self.logger.debug('This configuration has been evaluated! Skip it.')
+            if config in advisor.configurations:
+                trial_state, perf = SUCCESS, advisor.perfs[advisor.configurations.index(config)]
+            else:
+                trial_state, perf = FAILED, MAXINT
+        self.optimizer.iteration_id += 1
+        return config, trial_state, perf, trial_info
+
 
 def get_metafeature_vector(metafeature_dict):
     sorted_keys = sorted(metafeature_dict.keys())
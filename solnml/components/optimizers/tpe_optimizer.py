@@ -1,7 +1,8 @@
 import time
 import numpy as np
-from litebo.utils.constants import SUCCESS, FAILED
+from litebo.utils.constants import SUCCESS
 from solnml.components.optimizers.base_optimizer import BaseOptimizer
+from solnml.components.utils.configspace_utils import get_config_space_cardinality
 from solnml.components.transfer_learning.tlbo.models.kde import TPE
 
 
@@ -30,9 +31,9 @@ class TPEOptimizer(BaseOptimizer):
         if hp_num == 0:
             self.config_num_threshold = 0
         else:
-            _threshold = int(len(set(self.config_space.sample_configuration(10000))) * 0.75)
-            self.config_num_threshold = _threshold
-        self.logger.debug('The maximum trial number in HPO is: %d' % self.config_num_threshold)
+            _threshold = get_config_space_cardinality(self.config_space, sample_size=10000)
+            self.config_num_threshold = _threshold if _threshold == np.inf else int(_threshold * 0.75)
+        self.logger.debug('The maximum trial number in HPO is: %s' % self.config_num_threshold)
         self.maximum_config_num = min(600, self.config_num_threshold)
         self.early_stopped_flag = False
         self.eval_dict = {}
@@ -56,18 +57,19 @@ class TPEOptimizer(BaseOptimizer):
                                     'hyperspace or maximum configuration number met: %d!' % self.maximum_config_num)
                 break
             _config = self.config_gen.get_config()[0]
-            try:
-                _perf = self.evaluator(_config)
-                _status = SUCCESS
-            except:
+            # The trial runs in the sandboxed worker pool with hard time and memory limits.
+            self._register_evaluator()
+            _status, _perf, _info, _ = self.worker_pool.run(self.evaluator_key, (_config,),
+                                                            time_limit=self.per_run_time_limit,
+                                                            mem_limit=self.per_run_mem_limit)
+            if _status != SUCCESS:
+                self.logger.error(_info)
                 _perf = np.inf
-                _status = FAILED
             self.config_gen.new_result(_config, _perf, 1)
             if _status == SUCCESS:
                 self.exp_output[time.time()] = (_config, _perf)
                 self.configs.append(_config)
                 self.perfs.append(-_perf)
-                self.combine_tmp_config_path()
 
         if self.name == 'hpo':
             if hasattr(self.evaluator, 'fe_config'):
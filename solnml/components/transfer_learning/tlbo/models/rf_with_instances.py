@@ -9,6 +9,16 @@ from ..utils.constants import N_TREES
 from ..utils.util_funcs import get_types
 
 
+def _log_mean_exp_per_tree(preds_per_tree):
+    """
+    :param preds_per_tree: the leaf values of each tree.
+    :return: log of the arithmetic mean of exp(values) in each tree.
+    """
+    lengths = np.array([len(preds) for preds in preds_per_tree])
+    sums = np.add.reduceat(np.exp(np.concatenate(preds_per_tree)), np.concatenate(([0], np.cumsum(lengths)[:-1])))
+    return np.log(sums / lengths)
+
+
 class RandomForestWithInstances(AbstractModel):
 
     """Random forest that takes instance features into account.
@@ -193,25 +203,23 @@ class RandomForestWithInstances(AbstractModel):
         if X.shape[1] != self.types.shape[0]:
             raise ValueError('Rows in X should have %d entries but have %d!' % (self.types.shape[0], X.shape[1]))
 
-        means, vars_ = [], []
-        for row_X in X:
-            if self.log_y:
-                preds_per_tree = self.rf.all_leaf_values(row_X)
-                means_per_tree = []
-                for preds in preds_per_tree:
-                    # within one tree, we want to use the
-                    # arithmetic mean and not the geometric mean
-                    means_per_tree.append(np.log(np.mean(np.exp(preds))))
-                mean = np.mean(means_per_tree)
-                var = np.var(means_per_tree) # variance over trees as uncertainty estimate
-            else:
-                mean, var = self.rf.predict_mean_var(row_X)
-            means.append(mean)
-            vars_.append(var)
-        means = np.array(means)
-        vars_ = np.array(vars_)
+        # pyrfr predicts one row per call: the duplicated candidates (e.g., of the local search
+        # and the random sampling) are predicted once, without per-row array allocations.
+        X_unique, inverse = np.unique(X, axis=0, return_inverse=True)
+        rows = X_unique.tolist()
+        if self.log_y:
+            all_leaf_values = self.rf.all_leaf_values
+            # within one tree, we want to use the
+            # arithmetic mean and not the geometric mean
+            means_per_tree = np.array([_log_mean_exp_per_tree(all_leaf_values(row_X)) for row_X in rows])
+            # variance over trees as uncertainty estimate
+            stats = np.stack((np.mean(means_per_tree, axis=1), np.var(means_per_tree, axis=1)), axis=1)
+        else:
+            predict_mean_var = self.rf.predict_mean_var
+            stats = np.array([predict_mean_var(row_X) for row_X in rows], dtype=np.float64).reshape((-1, 2))
+        stats = stats[inverse.reshape(-1)]
 
-        return means.reshape((-1, 1)), vars_.reshape((-1, 1))
+        return stats[:, :1], stats[:, 1:]
 
     def predict_marginalized_over_instances(self, X: np.ndarray):
         """Predict mean and variance marginalized over all instances.
@@ -255,6 +263,15 @@ class RandomForestWithInstances(AbstractModel):
                              (self.bounds.shape[0],
                               X.shape[1]))
 
+        if hasattr(self.rf, 'predict_marginalized_over_instances_batch'):
+            # One native call for all the candidates (pyrfr>=0.8): steps 1 and 2 below,
+            # i.e., the predictions of each tree marginalized over the instances.
+            preds_trees = np.array(self.rf.predict_marginalized_over_instances_batch(
+                X, self.instance_features, self.log_y), dtype=np.float64)
+            mean, var = np.mean(preds_trees, axis=1), np.var(preds_trees, axis=1)
+            var[var < self.var_threshold] = self.var_threshold
+            return mean.reshape((-1, 1)), var.reshape((-1, 1))
+
         mean = np.zeros(X.shape[0])
         var = np.zeros(X.shape[0])
         for i, x in enumerate(X):
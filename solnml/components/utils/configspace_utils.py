@@ -1,5 +1,11 @@
+import numpy as np
 from typing import List
 from ConfigSpace import Configuration, ConfigurationSpace
+from ConfigSpace.hyperparameters import CategoricalHyperparameter, OrdinalHyperparameter, Constant, \
+    IntegerHyperparameter, FloatHyperparameter
+from ConfigSpace.conditions import AndConjunction, OrConjunction, EqualsCondition, NotEqualsCondition, \
+    InCondition, LessThanCondition, GreaterThanCondition
+from ConfigSpace.forbidden import ForbiddenAndConjunction, ForbiddenEqualsClause, ForbiddenInClause
 
 
 def sample_configurations(configuration_space: ConfigurationSpace,
@@ -7,6 +13,8 @@ def sample_configurations(configuration_space: ConfigurationSpace,
     configuration_space.seed(seed)
     result = []
     sample_cnt = 0
+    # Do not search for more configurations than the unseen ones in the space.
+    sample_size = min(sample_size, get_config_space_cardinality(configuration_space) - len(historical_configs))
     if len(historical_configs) == 0:
         result.append(configuration_space.get_default_configuration())
 
@@ -28,6 +36,231 @@ def sample_configurations(configuration_space: ConfigurationSpace,
     return result
 
 
+class _UnsupportedSpace(Exception):
+    pass
+
+
+# str(space) -> number of configurations.
+_cardinality_cache = dict()
+
+
+def _get_values(hp):
+    """
+    :return: the values of a hyperparameter, or the number of its values if there are infinitely many.
+    """
+    if isinstance(hp, CategoricalHyperparameter):
+        return list(hp.choices)
+    elif isinstance(hp, OrdinalHyperparameter):
+        return list(hp.sequence)
+    elif isinstance(hp, Constant):
+        return [hp.value]
+    lower, upper = getattr(hp, 'lower', None), getattr(hp, 'upper', None)
+    q = getattr(hp, 'q', None)
+    if lower is None or upper is None:
+        return np.inf
+    if isinstance(hp, IntegerHyperparameter):
+        return range(int(lower), int(upper) + 1, int(q) if q else 1)
+    elif isinstance(hp, FloatHyperparameter):
+        return np.inf if q is None else list(lower + q * np.arange(int(np.floor((upper - lower) / q + 1e-8)) + 1))
+    raise _UnsupportedSpace(type(hp).__name__)
+
+
+def _get_condition_parents(condition):
+    if isinstance(condition, (AndConjunction, OrConjunction)):
+        return [name for component in condition.components for name in _get_condition_parents(component)]
+    return [condition.parent.name]
+
+
+def _get_condition_child(condition):
+    if isinstance(condition, (AndConjunction, OrConjunction)):
+        return _get_condition_child(condition.components[0])
+    return condition.child.name
+
+
+def _is_satisfied(condition, values):
+    if isinstance(condition, AndConjunction):
+        return all(_is_satisfied(component, values) for component in condition.components)
+    elif isinstance(condition, OrConjunction):
+        return any(_is_satisfied(component, values) for component in condition.components)
+    value = values.get(condition.parent.name)
+    # A condition on an inactive parent is not satisfied.
+    if value is None:
+        return False
+    if isinstance(condition, EqualsCondition):
+        return value == condition.value
+    elif isinstance(condition, NotEqualsCondition):
+        return value != condition.value
+    elif isinstance(condition, InCondition):
+        return value in condition.values
+    elif isinstance(condition, LessThanCondition):
+        return value < condition.value
+    elif isinstance(condition, GreaterThanCondition):
+        return value > condition.value
+    raise _UnsupportedSpace(type(condition).__name__)
+
+
+def _get_forbidden_names(clause):
+    if isinstance(clause, ForbiddenAndConjunction):
+        return [name for component in clause.components for name in _get_forbidden_names(component)]
+    elif isinstance(clause, (ForbiddenEqualsClause, ForbiddenInClause)):
+        return [clause.hyperparameter.name]
+    raise _UnsupportedSpace(type(clause).__name__)
+
+
+def _is_forbidden(clause, values):
+    if isinstance(clause, ForbiddenAndConjunction):
+        return all(_is_forbidden(component, values) for component in clause.components)
+    value = values.get(clause.hyperparameter.name)
+    # A clause on an inactive hyperparameter does not forbid the configuration.
+    if value is None:
+        return False
+    if isinstance(clause, ForbiddenEqualsClause):
+        return value == clause.value
+    return value in clause.values
+
+
+def _get_size(values):
+    return values if isinstance(values, float) else len(values)
+
+
+def _count_configurations(configuration_space: ConfigurationSpace, max_enumeration=100000):
+    """
+        The hyperparameters are split into independent groups, linked by the conditions and the forbidden clauses,
+        and the counts of the groups are multiplied. In a group, only the hyperparameters in the forbidden clauses,
+        the parents of the hyperparameters with several parents, and their ancestors are enumerated; the others form
+        condition trees, where the count of a parent is the sum over its values of the product of the counts of
+        the active children.
+    :param max_enumeration: the enumeration stops with _UnsupportedSpace after visiting that many assignments.
+    """
+    # The hyperparameters are sorted topologically: the parents come before their children.
+    hps = configuration_space.get_hyperparameters()
+    forbiddens = configuration_space.get_forbiddens()
+    values = {hp.name: _get_values(hp) for hp in hps}
+    conditions = dict()
+    for condition in configuration_space.get_conditions():
+        conditions.setdefault(_get_condition_child(condition), list()).append(condition)
+    parents = {hp.name: set(name for condition in conditions.get(hp.name, list())
+                            for name in _get_condition_parents(condition)) for hp in hps}
+    children = {hp.name: list() for hp in hps}
+    for name, parent_names in parents.items():
+        for parent_name in parent_names:
+            children[parent_name].append(name)
+
+    # Group the hyperparameters with union-find.
+    group_of = {hp.name: hp.name for hp in hps}
+
+    def find(name):
+        while group_of[name] != name:
+            group_of[name] = group_of[group_of[name]]
+            name = group_of[name]
+        return name
+
+    def union(names):
+        names = [find(name) for name in names]
+        for name in names[1:]:
+            group_of[name] = names[0]
+
+    for name, parent_names in parents.items():
+        union([name] + list(parent_names))
+    clause_names = list()
+    for clause in forbiddens:
+        clause_names.append(_get_forbidden_names(clause))
+        union(clause_names[-1])
+
+    # The hyperparameters to enumerate, closed under the ancestors.
+    enumerated_names = set(name for names in clause_names for name in names)
+    for name, parent_names in parents.items():
+        if len(parent_names) > 1:
+            enumerated_names.update(parent_names)
+    for hp in reversed(hps):
+        if hp.name in enumerated_names:
+            enumerated_names.update(parents[hp.name])
+
+    def is_active(name, assignment):
+        return all(_is_satisfied(condition, assignment) for condition in conditions.get(name, list()))
+
+    tree_counts = dict()
+
+    def count_tree(name):
+        # Children have a single parent outside of the enumerated hyperparameters.
+        if name not in tree_counts:
+            if len(children[name]) == 0 or isinstance(values[name], float):
+                tree_counts[name] = _get_size(values[name])
+            else:
+                result = 0
+                for value in values[name]:
+                    product = 1
+                    for child in children[name]:
+                        if is_active(child, {name: value}):
+                            product *= count_tree(child)
+                    result += product
+                tree_counts[name] = result
+        return tree_counts[name]
+
+    groups = dict()
+    for hp in hps:
+        groups.setdefault(find(hp.name), list()).append(hp.name)
+    n_visited = 0
+    cardinality = 1
+    for names in groups.values():
+        group_enumerated = [name for name in names if name in enumerated_names]
+        # The roots of the condition trees: all their parents (if any) are enumerated.
+        roots = [name for name in names if name not in enumerated_names and parents[name] <= enumerated_names]
+        group_forbiddens = [clause for clause, clause_name_list in zip(forbiddens, clause_names)
+                            if clause_name_list[0] in names]
+        if any(isinstance(values[name], float) for name in group_enumerated):
+            return np.inf
+
+        def count(idx, assignment):
+            nonlocal n_visited
+            n_visited += 1
+            if n_visited > max_enumeration:
+                raise _UnsupportedSpace('More than %d assignments to enumerate.' % max_enumeration)
+            if idx == len(group_enumerated):
+                if any(_is_forbidden(clause, assignment) for clause in group_forbiddens):
+                    return 0
+                result = 1
+                for root in roots:
+                    if is_active(root, assignment):
+                        result *= count_tree(root)
+                return result
+            name = group_enumerated[idx]
+            if not is_active(name, assignment):
+                return count(idx + 1, assignment)
+            result = 0
+            for value in values[name]:
+                assignment[name] = value
+                result += count(idx + 1, assignment)
+                if result == np.inf:
+                    break
+            assignment.pop(name)
+            return result
+
+        group_count = count(0, dict())
+        if group_count == 0:
+            return 0
+        cardinality *= group_count
+    return cardinality
+
+
+def get_config_space_cardinality(configuration_space: ConfigurationSpace, sample_size=5000):
+    """
+        Number of the distinct configurations in the space, counted from its hyperparameters, conditions and
+        forbidden clauses, and memoized per space.
+    :param sample_size: the spaces with clauses the count does not support, or with too many assignments to
+        enumerate, are estimated from sample_size random configurations.
+    :return: int, or np.inf if an active hyperparameter has infinitely many values (e.g., a float without q).
+    """
+    key = str(configuration_space)
+    if key not in _cardinality_cache:
+        try:
+            cardinality = _count_configurations(configuration_space)
+        except _UnsupportedSpace:
+            cardinality = len(set(configuration_space.sample_configuration(sample_size)))
+        _cardinality_cache[key] = cardinality
+    return _cardinality_cache[key]
+
+
 def check_true(p):
     if p in ("True", "true", 1, True):
         return True
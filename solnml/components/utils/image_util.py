@@ -1,12 +1,4 @@
 import numpy as np
-import warnings
-
-try:
-    from PIL import Image
-    import torch
-    import torchvision
-except ImportError:
-    warnings.warn("Pillow, torch or torchvision not installed! Image2Vector will fail!")
 
 
 class Image2vector():
@@ -3,6 +3,7 @@ import pkgutil
 import inspect
 import importlib
 import numpy as np
+import scipy.sparse as sp
 from collections import OrderedDict
 
 
@@ -12,6 +13,62 @@ def collect_fields(feature_types, target_type):
     return [idx for idx, type in enumerate(feature_types) if type in target_type]
 
 
+def get_float_dtype(X):
+    """
+        Float dtype of the computations on X: float32 for float32 data (the float32 mode of AutoML),
+        float64 otherwise.
+    """
+    return np.float32 if getattr(X, 'dtype', None) == np.float32 else np.float64
+
+
+def match_float_dtype(_X, X):
+    """
+        Cast the floating array _X (e.g., the output of a sklearn transformer) to the float dtype of the data X.
+    """
+    dtype = get_float_dtype(X)
+    if _X.dtype != dtype and np.issubdtype(_X.dtype, np.floating):
+        return _X.astype(dtype)
+    return _X
+
+
+def densify(X):
+    """
+        Convert a scipy.sparse matrix to a dense array; other inputs are returned as they are.
+    """
+    return X.toarray() if sp.issparse(X) else X
+
+
+def hstack_columns(blocks, sparse_threshold=None):
+    """
+        Concatenate the column blocks; the result is a CSR matrix if any block is sparse.
+    :param sparse_threshold: if set, the result is sparse only if its density (the non-zero entries of
+        the sparse blocks and all the entries of the dense ones) is below sparse_threshold.
+    """
+    sparse_blocks = [block for block in blocks if sp.issparse(block)]
+    if not sparse_blocks:
+        return np.hstack(blocks)
+    if sparse_threshold is not None:
+        n_rows = blocks[0].shape[0]
+        n_entries = sum(block.nnz if sp.issparse(block) else block.size for block in blocks)
+        n_cols = sum(block.shape[1] for block in blocks)
+        if n_entries >= sparse_threshold * n_rows * n_cols:
+            return np.hstack([densify(block) for block in blocks])
+    # Sparse matrices hold numbers only (e.g., the remaining columns of a DataFrame may be of object dtype).
+    blocks = [block.astype(np.float64) if not sp.issparse(block) and block.dtype.hasobject else block
+              for block in blocks]
+    return sp.hstack(blocks, format='csr')
+
+
+def delete_columns(X, fields):
+    """
+        Remove the columns in fields; a CSR matrix stays sparse.
+    """
+    if sp.issparse(X):
+        keep_fields = np.setdiff1d(np.arange(X.shape[1]), fields)
+        return X.tocsr()[:, keep_fields]
+    return np.delete(X, fields, axis=1)
+
+
 def find_components(package, directory, base_class):
     components = OrderedDict()
 
@@ -3,9 +3,12 @@ from sklearn.utils.multiclass import type_of_target
 from solnml.base_estimator import BaseEstimator, BaseDLEstimator
 from solnml.components.utils.constants import type_dict, MULTILABEL_CLS, IMG_CLS, TEXT_CLS, OBJECT_DET
 from solnml.components.feature_engineering.transformation_graph import DataNode
-from solnml.datasets.image_dataset import ImageDataset
-from solnml.datasets.text_dataset import TextDataset
-from solnml.datasets.od_dataset import ODDataset
+from solnml.utils.lazy_import import lazy_import
+
+# The DL datasets import torch: they are loaded by the first DL estimator only.
+image_dataset = lazy_import('solnml.datasets.image_dataset')
+text_dataset = lazy_import('solnml.datasets.text_dataset')
+od_dataset = lazy_import('solnml.datasets.od_dataset')
 
 
 class Classifier(BaseEstimator):
@@ -31,34 +34,36 @@ class Classifier(BaseEstimator):
 
         return self
 
-    def predict(self, X, batch_size=None, n_jobs=1):
+    def predict(self, X, batch_size=None, n_jobs=1, out=None):
         """
         Predict classes for X.
         :param X: Datanode
-        :param batch_size: int
-        :param n_jobs: int
+        :param batch_size: int, number of samples predicted at once (None for all the samples)
+        :param n_jobs: int, number of batches predicted concurrently
+        :param out: array or path of a .npy file to write the predictions into
         :return: y : array of shape = [n_samples]
             The predicted classes.
         """
         if not isinstance(X, DataNode):
             raise ValueError("X is supposed to be a Data Node, but get %s" % type(X))
-        return super().predict(X, batch_size=batch_size, n_jobs=n_jobs)
+        return super().predict(X, batch_size=batch_size, n_jobs=n_jobs, out=out)
 
     def refit(self):
         return super().refit()
 
-    def predict_proba(self, X, batch_size=None, n_jobs=1):
+    def predict_proba(self, X, batch_size=None, n_jobs=1, out=None):
         """
         Predict probabilities of classes for all samples X.
         :param X: Datanode
-        :param batch_size: int
-        :param n_jobs: int
+        :param batch_size: int, number of samples predicted at once (None for all the samples)
+        :param n_jobs: int, number of batches predicted concurrently
+        :param out: array or path of a .npy file to write the predictions into
         :return: y : array of shape = [n_samples, n_classes]
             The predicted class probabilities.
         """
         if not isinstance(X, DataNode):
             raise ValueError("X is supposed to be a Data Node, but get %s" % type(X))
-        pred_proba = super().predict_proba(X, batch_size=batch_size, n_jobs=n_jobs)
+        pred_proba = super().predict_proba(X, batch_size=batch_size, n_jobs=n_jobs, out=out)
 
         if self.task_type != MULTILABEL_CLS:
             assert (
@@ -137,18 +142,19 @@ class Regressor(BaseEstimator):
 
         return self
 
-    def predict(self, X, batch_size=None, n_jobs=1):
+    def predict(self, X, batch_size=None, n_jobs=1, out=None):
         """
         Make predictions for X.
         :param X: DataNode
-        :param batch_size: int
-        :param n_jobs: int
+        :param batch_size: int, number of samples predicted at once (None for all the samples)
+        :param n_jobs: int, number of batches predicted concurrently
+        :param out: array or path of a .npy file to write the predictions into
         :return: y : array of shape = [n_samples] or [n_samples, n_labels]
             The predicted classes.
         """
         if not isinstance(X, DataNode):
             raise ValueError("X is supposed to be a Data Node, but get %s" % type(X))
-        return super().predict(X, batch_size=batch_size, n_jobs=n_jobs)
+        return super().predict(X, batch_size=batch_size, n_jobs=n_jobs, out=out)
 
     def get_tree_importance(self, data: DataNode):
         from lightgbm import LGBMRegressor
@@ -207,7 +213,7 @@ class ImageClassifier(BaseDLEstimator):
                          output_dir=output_dir)
         self.image_size = None
 
-    def fit(self, data: ImageDataset, **kwargs):
+    def fit(self, data: 'ImageDataset', **kwargs):
         """
         Fit the classifier to given training data.
         :param data: instance of Image Dataset
@@ -234,7 +240,7 @@ class ImageClassifier(BaseDLEstimator):
         :return: y : array of shape = [n_samples, n_classes]
             The predicted class probabilities.
         """
-        if not isinstance(dataset, ImageDataset):
+        if not isinstance(dataset, image_dataset.ImageDataset):
             raise ValueError("X is supposed to be an ImageDataset, but get %s" % type(dataset))
         pred_proba = super().predict_proba(dataset, mode=mode, batch_size=batch_size, n_jobs=n_jobs)
 
@@ -256,7 +262,7 @@ class ImageClassifier(BaseDLEstimator):
 class TextClassifier(BaseDLEstimator):
     """This class implements the text classification task. """
 
-    def fit(self, data: TextDataset, **kwargs):
+    def fit(self, data: 'TextDataset', **kwargs):
         """
         Fit the classifier to given training data.
         :param data: instance of Image Dataset
@@ -282,7 +288,7 @@ class TextClassifier(BaseDLEstimator):
         :return: y : array of shape = [n_samples, n_classes]
             The predicted class probabilities.
         """
-        if not isinstance(dataset, TextDataset):
+        if not isinstance(dataset, text_dataset.TextDataset):
             raise ValueError("X is supposed to be a TextDataset, but get %s" % type(dataset))
         pred_proba = super().predict_proba(dataset, mode='test', batch_size=batch_size, n_jobs=n_jobs)
 
@@ -304,7 +310,7 @@ class TextClassifier(BaseDLEstimator):
 class ObjectionDetecter(BaseDLEstimator):
     """This class implements the text classification task. """
 
-    def fit(self, data: ODDataset, **kwargs):
+    def fit(self, data: 'ODDataset', **kwargs):
         """
         Fit the classifier to given training data.
         :param data: instance of Image Dataset
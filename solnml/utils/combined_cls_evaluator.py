@@ -10,9 +10,12 @@ from sklearn.preprocessing import OneHotEncoder
 
 from solnml.utils.logging_utils import get_logger
 from solnml.components.evaluators.base_evaluator import _BaseEvaluator
+from solnml.components.evaluators.transform_cache import TransformCache
+from solnml.components.evaluators.split_plan import SplitPlan
+from solnml.components.evaluators.prediction_store import remove_predictions
+from solnml.components.computation.parallel_fold import ParallelFoldExecutor
 from solnml.components.evaluators.evaluate_func import validation
 from solnml.components.fe_optimizers.task_space import get_task_hyperparameter_space
-from solnml.components.fe_optimizers.parse import parse_config, construct_node
 from solnml.components.evaluators.base_evaluator import CombinedTopKModelSaver
 from solnml.components.utils.class_loader import get_combined_candidtates
 from solnml.components.models.classification import _classifiers, _addons
@@ -82,7 +85,8 @@ def get_combined_cs(estimator_id, task_type=0, include_image=False,
 
 class CombinedClassificationEvaluator(_BaseEvaluator):
     def __init__(self, estimator_id, scorer=None, data_node=None, task_type=0, resampling_strategy='cv',
-                 resampling_params=None, timestamp=None, output_dir=None, seed=1, if_imbal=False):
+                 resampling_params=None, timestamp=None, output_dir=None, seed=1, if_imbal=False,
+                 transform_cache=None, split_plan=None, n_jobs=1):
         self.resampling_strategy = resampling_strategy
         self.resampling_params = resampling_params
 
@@ -97,8 +101,15 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
         self.logger = get_logger(self.__module__ + "." + self.__class__.__name__)
         self.continue_training = False
 
+        # The data of train/val nodes is replaced by each evaluation, so they share the original arrays.
         self.train_node = data_node.copy_()
         self.val_node = data_node.copy_()
+        # Fitted FE pipelines and transformed splits shared across evaluations.
+        self.transform_cache = transform_cache if transform_cache is not None else TransformCache()
+        # Resampling splits shared across evaluations.
+        self.split_plan = split_plan if split_plan is not None else SplitPlan(data_node, task_type=self.task_type)
+        # Folds in cross-validation are evaluated in n_jobs processes.
+        self.fold_executor = ParallelFoldExecutor(n_jobs=n_jobs)
 
         self.timestamp = timestamp
         # TODO: Top-k k?
@@ -110,6 +121,45 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
             y, estimator, None, {}, {})
         return _init_params, _fit_params
 
+    def _evaluate_fold(self, split_id, config):
+        """
+            Fit the pipeline on the training part of one fold and score it on the validation part.
+        """
+        train_data, val_data = self.split_plan.get_data(split_id)
+        self.train_node.data = list(train_data)
+        self.val_node.data = list(val_data)
+
+        data_node, _val_node, op_list = self.transform_nodes(config, split_id,
+                                                             self.train_node, self.val_node,
+                                                             if_imbal=self.if_imbal)
+
+        _x_train, _y_train = data_node.data
+        _x_val, _y_val = _val_node.data
+
+        config_dict = config.get_dictionary().copy()
+        # Prepare training and initial params for classifier.
+        init_params, fit_params = {}, {}
+        if data_node.enable_balance == 1:
+            init_params, fit_params = self.get_fit_params(_y_train, self.estimator_id)
+            for key, val in init_params.items():
+                config_dict[key] = val
+
+        if data_node.data_balance == 1:
+            fit_params['data_balance'] = True
+
+        _, clf = get_estimator(config_dict, self.estimator_id)
+
+        if self.onehot_encoder is None:
+            self.onehot_encoder = OneHotEncoder(categories='auto')
+            y = np.reshape(_y_train, (len(_y_train), 1))
+            self.onehot_encoder.fit(y)
+
+        return validation(clf, self.scorer, _x_train, _y_train, _x_val, _y_val,
+                          random_state=self.seed,
+                          onehot=self.onehot_encoder if isinstance(self.scorer,
+                                                                   _ThresholdScorer) else None,
+                          fit_params=fit_params)
+
     def __call__(self, config, **kwargs):
         start_time = time.time()
         return_dict = dict()
@@ -122,22 +172,14 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
                 with warnings.catch_warnings():
                     warnings.filterwarnings("ignore")
 
-                    if self.resampling_params is None or 'test_size' not in self.resampling_params:
-                        test_size = 0.33
-                    else:
-                        test_size = self.resampling_params['test_size']
-
-                    from sklearn.model_selection import StratifiedShuffleSplit
-                    ss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
-                    for train_index, test_index in ss.split(self.data_node.data[0], self.data_node.data[1]):
-                        _x_train, _x_val = self.data_node.data[0][train_index], self.data_node.data[0][test_index]
-                        _y_train, _y_val = self.data_node.data[1][train_index], self.data_node.data[1][test_index]
-                    self.train_node.data = [_x_train, _y_train]
-                    self.val_node.data = [_x_val, _y_val]
+                    split_id = self.split_plan.get_split_ids(self.resampling_strategy, self.resampling_params)[0]
+                    train_data, val_data = self.split_plan.get_data(split_id)
+                    self.train_node.data = list(train_data)
+                    self.val_node.data = list(val_data)
 
-                    data_node, op_list = parse_config(self.train_node, config, record=True, if_imbal=self.if_imbal)
-                    _val_node = self.val_node.copy_()
-                    _val_node = construct_node(_val_node, op_list)
+                    data_node, _val_node, op_list = self.transform_nodes(config, split_id,
+                                                                         self.train_node, self.val_node,
+                                                                         if_imbal=self.if_imbal)
 
                 _x_train, _y_train = data_node.data
                 _x_val, _y_val = _val_node.data
@@ -177,12 +219,14 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
                         with open(model_path, 'wb') as f:
                             pkl.dump([op_list, clf], f)
                         self.logger.info("Model saved to %s" % model_path)
+                        self.save_val_predictions(model_path, clf, _x_val, _y_val, proba=True)
 
                     self.topk_model_saver.save_topk_config()
 
                     try:
                         if delete_flag and os.path.exists(model_path_deleted):
                             os.remove(model_path_deleted)
+                            remove_predictions(model_path_deleted)
                             self.logger.info("Model deleted from %s" % model_path_deleted)
                     except:
                         pass
@@ -203,53 +247,15 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
                 with warnings.catch_warnings():
                     warnings.filterwarnings("ignore")
 
-                    if 'cv' in self.resampling_strategy:
-                        if self.resampling_params is None or 'folds' not in self.resampling_params:
-                            folds = 5
-                        else:
-                            folds = self.resampling_params['folds']
-
-                    from sklearn.model_selection import StratifiedKFold
-                    skfold = StratifiedKFold(n_splits=folds, random_state=self.seed, shuffle=False)
-                    scores = list()
-
-                    for train_index, test_index in skfold.split(self.data_node.data[0], self.data_node.data[1]):
-                        _x_train, _x_val = self.data_node.data[0][train_index], self.data_node.data[0][test_index]
-                        _y_train, _y_val = self.data_node.data[1][train_index], self.data_node.data[1][test_index]
-                        self.train_node.data = [_x_train, _y_train]
-                        self.val_node.data = [_x_val, _y_val]
-
-                        data_node, op_list = parse_config(self.train_node, config, record=True, if_imbal=self.if_imbal)
-                        _val_node = self.val_node.copy_()
-                        _val_node = construct_node(_val_node, op_list)
-
-                        _x_train, _y_train = data_node.data
-                        _x_val, _y_val = _val_node.data
-
-                        config_dict = config.get_dictionary().copy()
-                        # Prepare training and initial params for classifier.
-                        init_params, fit_params = {}, {}
-                        if data_node.enable_balance == 1:
-                            init_params, fit_params = self.get_fit_params(_y_train, self.estimator_id)
-                            for key, val in init_params.items():
-                                config_dict[key] = val
-
-                        if data_node.data_balance == 1:
-                            fit_params['data_balance'] = True
-
-                        classifier_id, clf = get_estimator(config_dict, self.estimator_id)
-
-                        if self.onehot_encoder is None:
-                            self.onehot_encoder = OneHotEncoder(categories='auto')
-                            y = np.reshape(_y_train, (len(_y_train), 1))
-                            self.onehot_encoder.fit(y)
-
-                        _score = validation(clf, self.scorer, _x_train, _y_train, _x_val, _y_val,
-                                            random_state=self.seed,
-                                            onehot=self.onehot_encoder if isinstance(self.scorer,
-                                                                                     _ThresholdScorer) else None,
-                                            fit_params=fit_params)
-                        scores.append(_score)
+                    split_ids = self.split_plan.get_split_ids(self.resampling_strategy, self.resampling_params)
+                    scores, time_costs = self.fold_executor.execute(
+                        self._evaluate_fold, split_ids, stop_func=self.race_to_stop,
+                        fold_kwargs={'config': config})
+                    self.logger.debug('Fold time costs: %s' % str(time_costs))
+                    # An evaluation pruned by racing is reported as a censored observation: the mean of its
+                    # evaluated folds, which already falls short of the incumbent. It is kept out of the top-k models.
+                    pruned = len(scores) < len(split_ids)
+                    classifier_id = self.estimator_id
                     score = np.mean(scores)
 
                 # TODO: Don't save models for cv
@@ -257,7 +263,9 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
                     self.logger.info('rw_lock not defined! Possible read-write conflicts may happen!')
                 lock = kwargs.get('rw_lock', Lock())
                 lock.acquire()
-                if np.isfinite(score):
+                if pruned:
+                    self.logger.info('Racing: pruned after %d folds, partial score %.4f.' % (len(scores), score))
+                elif np.isfinite(score):
                     _ = self.topk_model_saver.add(config, score, classifier_id)
                     self.topk_model_saver.save_topk_config()
                 lock.release()
@@ -274,26 +282,19 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
                 with warnings.catch_warnings():
                     warnings.filterwarnings("ignore")
 
-                    if self.resampling_params is None or 'test_size' not in self.resampling_params:
-                        test_size = 0.33
-                    else:
-                        test_size = self.resampling_params['test_size']
+                    split_id = self.split_plan.get_split_ids(self.resampling_strategy, self.resampling_params)[0]
+                    train_data, val_data = self.split_plan.get_data(split_id)
+                    self.train_node.data = list(train_data)
+                    self.val_node.data = list(val_data)
 
-                    from sklearn.model_selection import StratifiedShuffleSplit
-                    ss = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=self.seed)
-                    for train_index, test_index in ss.split(self.data_node.data[0], self.data_node.data[1]):
-                        _x_train, _x_val = self.data_node.data[0][train_index], self.data_node.data[0][test_index]
-                        _y_train, _y_val = self.data_node.data[1][train_index], self.data_node.data[1][test_index]
-                    self.train_node.data = [_x_train, _y_train]
-                    self.val_node.data = [_x_val, _y_val]
-
-                    data_node, op_list = parse_config(self.train_node, config, record=True, if_imbal=self.if_imbal)
-                    _val_node = self.val_node.copy_()
-                    _val_node = construct_node(_val_node, op_list)
+                    data_node, _val_node, op_list = self.transform_nodes(config, split_id,
+                                                                         self.train_node, self.val_node,
+                                                                         if_imbal=self.if_imbal)
 
                 _x_train, _y_train = data_node.data
 
                 if downsample_ratio != 1:
+                    from sklearn.model_selection import StratifiedShuffleSplit
                     down_ss = StratifiedShuffleSplit(n_splits=1, test_size=downsample_ratio,
                                                      random_state=self.seed)
                     for _, _val_index in down_ss.split(_x_train, _y_train):
@@ -340,12 +341,14 @@ class CombinedClassificationEvaluator(_BaseEvaluator):
                         with open(model_path, 'wb') as f:
                             pkl.dump([op_list, clf], f)
                         self.logger.info("Model saved to %s" % model_path)
+                        self.save_val_predictions(model_path, clf, _x_val, _y_val, proba=True)
 
                     self.topk_model_saver.save_topk_config()
 
                     try:
                         if delete_flag and os.path.exists(model_path_deleted):
                             os.remove(model_path_deleted)
+                            remove_predictions(model_path_deleted)
                             self.logger.info("Model deleted from %s" % model_path_deleted)
                     except:
                         pass
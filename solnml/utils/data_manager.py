@@ -17,8 +17,11 @@ class DataManager(object):
     """
 
     # X,y should be None if using DataManager().load_csv(...)
-    def __init__(self, X=None, y=None, na_values=default_missing_values, feature_types=None, feature_names=None):
+    # dtype: float dtype of the numerical features, e.g., 'float32' to halve the memory; None keeps the loaded dtypes.
+    def __init__(self, X=None, y=None, na_values=default_missing_values, feature_types=None, feature_names=None,
+                 dtype=None):
         self.na_values = na_values
+        self.dtype = dtype
         self.feature_types = feature_types
         self.feature_names = feature_names
         self.missing_flags = None
@@ -31,6 +34,20 @@ class DataManager(object):
             self.train_y = np.array(y)
             if feature_types is None:
                 self.set_feat_types(pd.DataFrame(self.train_X), [])
+            self.train_X = self.cast_float_features(self.train_X)
+
+    def cast_float_features(self, X):
+        """
+            Cast the float features to self.dtype; the other columns (e.g., integers and strings) are kept.
+        """
+        if self.dtype is None:
+            return X
+        if isinstance(X, pd.DataFrame):
+            float_cols = X.select_dtypes(include=['floating']).columns
+            return X.astype({col: self.dtype for col in float_cols}) if len(float_cols) > 0 else X
+        if np.issubdtype(X.dtype, np.number):
+            return X.astype(self.dtype, copy=False)
+        return X
 
     def set_feat_types(self, df, columns_missed):
         self.missing_flags = list()
@@ -69,7 +86,7 @@ class DataManager(object):
     def get_data_node(self, X, y):
         if self.feature_types is None:
             raise ValueError("Feature type missing")
-        return DataNode([X, y], self.feature_types, feature_names=self.feature_names)
+        return DataNode([self.cast_float_features(X), y], self.feature_types, feature_names=self.feature_names)
 
     def clean_data_with_nan(self, df, label_col, phase='train', drop_index=None, has_label=True):
         columns_missed = df.columns[df.isnull().any()].tolist()
@@ -132,7 +149,7 @@ class DataManager(object):
         # Identify the feature types
         self.set_feat_types(df, columns_missed)
 
-        self.train_X = df
+        self.train_X = self.cast_float_features(df)
         data = [self.train_X, self.train_y]
         return DataNode(data, self.feature_types, feature_names=self.train_X.columns.values)
 
@@ -144,7 +161,7 @@ class DataManager(object):
         # Drop the row with all NaNs.
         df.dropna(how='all')
         self.clean_data_with_nan(df, label_col, phase='test', drop_index=drop_index, has_label=has_label)
-        self.test_X = df
+        self.test_X = self.cast_float_features(df)
 
         data = [self.test_X, self.test_y]
         return DataNode(data, self.feature_types, feature_names=self.test_X.columns.values)
@@ -0,0 +1,24 @@
+import sys
+import importlib
+import importlib.util
+
+
+def lazy_import(name):
+    """
+        Import a module on its first attribute access, e.g., the DL datasets used by the tabular API
+        only in isinstance checks: importing them would load torch at startup.
+    :param name: full name of the module.
+    :return: the module, loaded or not yet.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    # The parent packages are imported now, so they should be light.
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named %s!' % name, name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
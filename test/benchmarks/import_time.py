@@ -0,0 +1,58 @@
+"""
+    Import-time benchmark of the tabular API.
+
+    Each run imports the module in a fresh interpreter, and reports the wall time and the peak memory.
+    It fails if the import loads one of the heavy optional modules (torch, lightgbm, ...), which should
+    only be loaded on their first use, or if the best time exceeds --max-seconds.
+
+    Usage: python test/benchmarks/import_time.py [--module solnml.estimators] [--repeat 5] [--max-seconds 5]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+sys.path.append(os.getcwd())
+
+HEAVY_MODULES = ['torch', 'torchvision', 'transformers', 'lightgbm', 'xgboost', 'catboost', 'PIL',
+                 'solnml.autodl', 'solnml.components.meta_learning.algorithm_recomendation.ranknet_advisor_torch']
+
+PROBE = """
+import sys, time, json, resource, importlib.util
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+print(json.dumps({'time': elapsed,
+                  'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  # The modules of lazy_import are in sys.modules before their first use.
+                  'loaded': [name for name in %r if name in sys.modules and
+                             not isinstance(sys.modules[name], importlib.util._LazyModule)]}))
+"""
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--module', type=str, default='solnml.estimators')
+parser.add_argument('--repeat', type=int, default=5)
+parser.add_argument('--max-seconds', type=float, default=None)
+args = parser.parse_args()
+
+results = list()
+for _ in range(args.repeat):
+    output = subprocess.run([sys.executable, '-c', PROBE % (args.module, HEAVY_MODULES)],
+                            stdout=subprocess.PIPE, check=True, env=dict(os.environ, PYTHONPATH=os.getcwd()))
+    results.append(json.loads(output.stdout.decode().strip().splitlines()[-1]))
+
+best_time = min(result['time'] for result in results)
+print('import %s: best %.3fs, mean %.3fs, max rss %.1fMB' % (
+    args.module, best_time, sum(result['time'] for result in results) / len(results),
+    max(result['max_rss_mb'] for result in results)))
+
+failed = False
+loaded = results[0]['loaded']
+if loaded:
+    print('Heavy modules loaded at import time: %s' % ', '.join(loaded))
+    failed = True
+if args.max_seconds is not None and best_time > args.max_seconds:
+    print('Import time exceeds %.3fs!' % args.max_seconds)
+    failed = True
+sys.exit(1 if failed else 0)
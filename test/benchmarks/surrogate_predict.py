@@ -0,0 +1,47 @@
+"""
+    Benchmark of the random forest surrogate: candidates scored per second by
+    predict_marginalized_over_instances, as in the acquisition optimization.
+
+    Usage: python test/benchmarks/surrogate_predict.py [--n_history 500] [--n_candidates 5000] [--dim 20]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.getcwd())
+from solnml.components.optimizers.base.prob_rf import RandomForestWithInstances
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--n_history', type=int, default=500)
+parser.add_argument('--n_candidates', type=int, default=5000)
+parser.add_argument('--dim', type=int, default=20)
+parser.add_argument('--duplicate_ratio', type=float, default=0.2)
+parser.add_argument('--repeat', type=int, default=3)
+args = parser.parse_args()
+
+rng = np.random.RandomState(1)
+types = np.zeros(args.dim, dtype=np.uint64)
+bounds = np.array([[0., 1.]] * args.dim)
+X = rng.rand(args.n_history, args.dim)
+y = np.sum(np.sin(3 * X), axis=1) + 0.1 * rng.randn(args.n_history)
+
+model = RandomForestWithInstances(types=types, bounds=bounds, seed=1)
+start_time = time.time()
+model.train(X, y.reshape((-1, 1)))
+print('Train on %d configurations: %.3fs' % (args.n_history, time.time() - start_time))
+
+# The local search proposes some of the candidates more than once.
+candidates = rng.rand(args.n_candidates, args.dim)
+n_duplicates = int(args.n_candidates * args.duplicate_ratio)
+candidates[:n_duplicates] = candidates[rng.randint(n_duplicates, args.n_candidates, n_duplicates)]
+
+costs = list()
+for _ in range(args.repeat):
+    start_time = time.time()
+    mean, var = model.predict_marginalized_over_instances(candidates)
+    costs.append(time.time() - start_time)
+assert mean.shape == (args.n_candidates, 1) and var.shape == (args.n_candidates, 1)
+print('Predict %d candidates: best %.3fs, %.0f candidates/s' % (
+    args.n_candidates, min(costs), args.n_candidates / min(costs)))